@@ -0,0 +1,318 @@
+"""Pluggable data backends for the stock/lunar analysis.
+
+Every backend returns the same thing: {ticker: DataFrame} with columns
+Date, Open, High, Low, Close, Volume, Phase, sorted by date, i.e. the result
+of joining each ticker's prices with the lunar phases. Frames use the compact
+schema of frame_schema.py (datetime64 dates, float64/float32 prices, int64
+volume, categorical phase).
+
+Backends (selected with ANALYSIS_DATA_SOURCE):
+
+- "sql": Azure SQL / SQL Server (one chunked join query per ticker, read
+  concurrently over a data_access.py connection pool when one is given)
+- "duckdb": embedded DuckDB engine over the local columnar store, or over the
+  CSVs in latest_files.txt when no store exists (one vectorized join)
+- "store": pandas join over the local columnar store
+- "csv": pandas join over the CSVs in latest_files.txt
+
+With LUNAR_PHASE_SOURCE=index the pandas backends skip the daily phase table
+and look each trading date up in the phase interval index (phase_index.py)
+instead of joining on the date. The index gives the same phases as a daily
+table generated by the phase engine (extract_moon_data.py's local
+calculation); a table from another source keeps its own labels in "table"
+mode, so switching sources relabels the days on which the two disagree.
+
+The pandas backends load shards of tickers in parallel worker processes
+(sharding.py); DuckDB already parallelizes its join internally and the SQL
+backend waits on the database, so those run in-process (the SQL backend on
+threads, one pooled connection each).
+
+``source_fingerprints`` digests each ticker's input data without loading it,
+for the analysis result cache (result_cache.py).
+"""
+from functools import partial
+import os
+
+import pandas as pd
+
+from frame_schema import PHASE_DTYPE, normalize_frame, read_phases_csv, read_prices_csv
+from instrumentation import span
+from sharding import map_shards, merge_dicts
+
+LATEST_FILES_PATH = "latest_files.txt"
+LUNAR_FILE_PATH = "data/lunar_phases.csv"
+
+JOIN_COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume", "Phase"]
+
+# Daily phases for the pandas backends: "table" (join the daily phase table) or "index"
+PHASE_SOURCE = os.getenv("LUNAR_PHASE_SOURCE", "table")
+
+
+def _latest_files(tickers):
+    """Map tickers to their CSV path from latest_files.txt."""
+    with open(LATEST_FILES_PATH, "r") as f:
+        paths = [line.strip() for line in f if line.strip()]
+    by_ticker = {os.path.basename(path).split("_")[0]: path for path in paths}
+    return {ticker: by_ticker[ticker] for ticker in tickers if ticker in by_ticker}
+
+
+def _store_root(store_root):
+    """Default to the columnar store root (imported lazily: it pulls in pyarrow)."""
+    if store_root is None:
+        from columnar_store import STORE_ROOT
+        store_root = STORE_ROOT
+    return store_root
+
+
+def _attribute_phases(prices):
+    """Add the day-level Phase of every price row from the phase interval index.
+
+    Rows outside the index coverage are dropped, like dates missing from the
+    phase table in a join.
+    """
+    from phase_index import get_phase_index, phase_on
+
+    dates = prices["Date"].to_numpy(dtype="datetime64[ns]")
+    codes = phase_on(get_phase_index(dates), dates)
+    return prices.assign(Phase=pd.Categorical.from_codes(codes, dtype=PHASE_DTYPE))[codes >= 0]
+
+
+def _split_by_ticker(df, tickers):
+    """Split a long joined frame into {ticker: frame} in the requested order."""
+    groups = {ticker: rows for ticker, rows in df.groupby("ticker", sort=False)}
+    return {
+        ticker: groups[ticker][JOIN_COLUMNS].sort_values("Date").reset_index(drop=True)
+        for ticker in tickers if ticker in groups
+    }
+
+
+def join_query(ticker, dialect="mssql", since=False):
+    """The price/phase join for one ticker's table.
+
+    With ``since`` the query takes one parameter, the first date to return.
+    """
+    from sql_pushdown import _date_expr
+
+    where = f"WHERE {_date_expr('s.[Date]', dialect)} >= ?" if since else ""
+    return f"""
+        SELECT s.[Date], s.[Open], s.[High], s.[Low], s.[Close], s.[Volume], l.[Phase]
+        FROM {ticker}_StockPrices s
+        JOIN LunarPhases l ON {_date_expr('s.[Date]', dialect)} = {_date_expr('l.[Date]', dialect)}
+        {where}
+        ORDER BY s.[Date]
+        """
+
+
+def _read_sql_ticker(conn, ticker):
+    """One ticker's joined frame read in typed chunks (None on error)."""
+    from data_access import read_frame
+    from sql_upsert import detect_dialect
+
+    query = join_query(ticker, detect_dialect(conn))
+    try:
+        with span("sql_read", ticker=ticker) as metrics:
+            data = read_frame(conn, query, convert=normalize_frame)
+            metrics["rows"] = len(data)
+        return data
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        print(f"Query: {query}")
+        return None
+
+
+def load_sql(tickers, conn=None, pool=None):
+    """Join prices and phases in the database, one query per ticker.
+
+    With a ``data_access.ConnectionPool`` the tickers are read concurrently,
+    one pooled connection each; otherwise one after another over ``conn``.
+    """
+    tickers = list(tickers)
+    if pool is not None:
+        from data_access import map_pooled
+
+        frames = map_pooled(pool, _read_sql_ticker, tickers)
+    else:
+        frames = [_read_sql_ticker(conn, ticker) for ticker in tickers]
+    return {ticker: data for ticker, data in zip(tickers, frames) if data is not None}
+
+
+def load_duckdb(tickers, conn=None, store_root=None):
+    """Join prices and phases for all tickers in one embedded DuckDB query."""
+    import duckdb
+
+    store_root = _store_root(store_root)
+
+    db = duckdb.connect()
+    try:
+        if os.path.isdir(os.path.join(store_root, "prices")):
+            prices = (f"read_parquet('{store_root}/prices/*/*/*.parquet', hive_partitioning = true)")
+            phases = (f"read_parquet('{store_root}/lunar_phases/*/*.parquet', hive_partitioning = true)")
+        else:
+            files = list(_latest_files(tickers).values())
+            file_list = ", ".join(f"'{path}'" for path in files)
+            prices = (f"(SELECT regexp_extract(filename, '([^/\\\\]+)_stock_', 1) AS ticker, * "
+                      f"FROM read_csv_auto([{file_list}], filename = true))")
+            phases = f"read_csv_auto('{LUNAR_FILE_PATH}')"
+
+        df = db.execute(f"""
+            SELECT p.ticker, CAST(p."Date" AS DATE) AS "Date", p."Open", p."High", p."Low",
+                   p."Close", p."Volume", CAST(l."Phase" AS VARCHAR) AS "Phase"
+            FROM {prices} p
+            JOIN {phases} l ON CAST(p."Date" AS DATE) = CAST(l."Date" AS DATE)
+            WHERE p.ticker IN (SELECT unnest(?))
+            ORDER BY p.ticker, "Date"
+        """, [list(tickers)]).df()
+    finally:
+        db.close()
+
+    return _split_by_ticker(normalize_frame(df), tickers)
+
+
+def load_store(tickers, conn=None, store_root=None):
+    """Join prices and phases from the columnar store with pandas."""
+    from columnar_store import read_lunar_phases, read_prices
+
+    store_root = _store_root(store_root)
+
+    prices = read_prices(tickers, columns=JOIN_COLUMNS[:-1], root=store_root)
+    if PHASE_SOURCE == "index":
+        return _split_by_ticker(_attribute_phases(prices), tickers)
+    phases = read_lunar_phases(columns=["Date", "Phase"], root=store_root)
+    return _split_by_ticker(normalize_frame(prices.merge(phases, on="Date", how="inner")), tickers)
+
+
+def load_csv(tickers, conn=None):
+    """Join prices and phases from the local CSVs with pandas."""
+    phases = read_phases_csv(LUNAR_FILE_PATH) if PHASE_SOURCE == "table" else None
+    stock_data = {}
+    for ticker, path in _latest_files(tickers).items():
+        prices = read_prices_csv(path, columns=JOIN_COLUMNS[:-1])
+        data = prices.merge(phases, on="Date", how="inner") if phases is not None else _attribute_phases(prices)
+        stock_data[ticker] = data[JOIN_COLUMNS].sort_values("Date").reset_index(drop=True)
+    return stock_data
+
+
+def _table_fingerprint(conn, table, dialect):
+    """Digest of a table's row count, date range and content checksum (None when it cannot be read)."""
+    from result_cache import digest
+
+    if dialect == "mssql":
+        query = f"SELECT COUNT_BIG(*), MIN([Date]), MAX([Date]), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM {table}"
+    else:
+        # SQLite has no checksum aggregate: position-weighted sums of every column's values and lengths
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+            columns = [description[0] for description in cursor.description]
+        except Exception:
+            return None
+        finally:
+            cursor.close()
+        weighted = ", ".join(f"TOTAL(CAST([{column}] AS REAL) * (rowid % 1009 + 1)), "
+                             f"TOTAL(length([{column}]) * (rowid % 1009 + 1))" for column in columns)
+        query = f"SELECT COUNT(*), MIN([Date]), MAX([Date]), {weighted} FROM {table}"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+        return digest(repr(tuple(cursor.fetchone())))
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+
+def _fingerprint_sql(tickers, conn, pool):
+    """{ticker: price table fingerprint} plus the LunarPhases fingerprint."""
+    from sql_upsert import detect_dialect
+
+    tables = [f"{ticker}_StockPrices" for ticker in tickers] + ["LunarPhases"]
+    if pool is not None:
+        from data_access import map_pooled
+
+        fingerprints = map_pooled(pool, lambda c, table: _table_fingerprint(c, table, detect_dialect(c)), tables)
+    else:
+        dialect = detect_dialect(conn)
+        fingerprints = [_table_fingerprint(conn, table, dialect) for table in tables]
+    return dict(zip(tickers, fingerprints)), fingerprints[-1]
+
+
+def _fingerprint_files(ticker_files, phase_files, cache_dir):
+    """{ticker: digest of its files} plus the digest of the phase files, from file contents."""
+    from result_cache import code_version, digest, file_digests
+
+    paths = [path for files in ticker_files.values() for path in files] + list(phase_files)
+    digests = file_digests(paths, cache_dir)
+    if phase_files:
+        phases = digest([digests[path] for path in phase_files])
+    else:
+        # Phases come from the interval index, which is derived from the phase engine
+        phases = code_version("phase_index", "lunar_phase_engine")
+    return {ticker: digest([digests[path] for path in files]) if files else None
+            for ticker, files in ticker_files.items()}, phases
+
+
+def _store_files(tickers, store_root):
+    import glob
+
+    ticker_files = {ticker: sorted(glob.glob(os.path.join(store_root, "prices", f"ticker={ticker}", "*", "*.parquet")))
+                    for ticker in tickers}
+    return ticker_files, sorted(glob.glob(os.path.join(store_root, "lunar_phases", "*", "*.parquet")))
+
+
+def source_fingerprints(tickers, source="sql", conn=None, pool=None, cache_dir=None):
+    """Digest of each ticker's input data for ``source`` ({ticker: digest}, None when it has no data).
+
+    A ticker's digest covers its prices and the lunar phases, so it changes
+    whenever either does. Local sources hash file contents
+    (``result_cache.file_digests``); the sql source asks the database for a
+    per-table row count, date range and checksum instead of reading rows.
+    """
+    from result_cache import CACHE_DIR, digest
+
+    cache_dir = cache_dir or CACHE_DIR
+    tickers = list(tickers)
+    csv_phase_files = [LUNAR_FILE_PATH] if PHASE_SOURCE == "table" else []
+    if source == "sql":
+        ticker_digests, phases = _fingerprint_sql(tickers, conn, pool)
+    elif source == "store" or (source == "duckdb" and os.path.isdir(os.path.join(_store_root(None), "prices"))):
+        ticker_files, phase_files = _store_files(tickers, _store_root(None))
+        if source == "store" and PHASE_SOURCE == "index":
+            phase_files = []
+        ticker_digests, phases = _fingerprint_files(ticker_files, phase_files, cache_dir)
+    elif source in BACKENDS:
+        latest = _latest_files(tickers)
+        ticker_files = {ticker: [latest[ticker]] if ticker in latest else [] for ticker in tickers}
+        ticker_digests, phases = _fingerprint_files(
+            ticker_files, [LUNAR_FILE_PATH] if source == "duckdb" else csv_phase_files, cache_dir)
+    else:
+        raise ValueError(f"Unknown analysis data source '{source}', expected one of {sorted(BACKENDS)}")
+    return {ticker: digest(source, value, phases) if value is not None and phases is not None else None
+            for ticker, value in ticker_digests.items()}
+
+
+BACKENDS = {
+    "sql": load_sql,
+    "duckdb": load_duckdb,
+    "store": load_store,
+    "csv": load_csv,
+}
+
+SHARDED_SOURCES = ("store", "csv")
+
+
+def _load_shard(source, tickers):
+    return BACKENDS[source](tickers)
+
+
+def load_stock_lunar(tickers, source="sql", conn=None, max_workers=None, pool=None):
+    """Load joined price/phase frames for ``tickers`` from the chosen backend.
+
+    ``pool`` (a ``data_access.ConnectionPool``) lets the sql backend read tickers concurrently.
+    """
+    if source not in BACKENDS:
+        raise ValueError(f"Unknown analysis data source '{source}', expected one of {sorted(BACKENDS)}")
+    if source in SHARDED_SOURCES:
+        return merge_dicts(map_shards(partial(_load_shard, source), tickers, max_workers))
+    if source == "sql":
+        return load_sql(tickers, conn=conn, pool=pool)
+    return BACKENDS[source](tickers, conn=conn)
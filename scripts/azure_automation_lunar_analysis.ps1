@@ -1,8 +1,10 @@
 # Azure Automation Runbook for Stock and Lunar Phase Analysis
-# This PowerShell script runs the Python analysis script in Azure Automation
+# This PowerShell script runs the Python pipeline (extract, upload, load, analyze,
+# render, report) in Azure Automation. pipeline.py schedules the stages as a
+# dependency graph and writes per-stage logs and a timeline under data/pipeline/.
 
 # Define variables
-$pythonScriptPath = "azure_stock_lunar_analysis.py"
+$pythonScriptPath = "pipeline.py"
 $reportPath = "lunar_stock_analysis_report.md"
 $correlationImagePath = "correlation_heatmap.png"
 $returnsImagePath = "returns_by_lunar_phase.png"
@@ -12,13 +14,16 @@ Write-Output "Starting Stock and Lunar Phase Analysis at $(Get-Date)"
 
 # Make sure Python modules are installed
 Write-Output "Installing required Python packages..."
-pip install pyodbc pandas matplotlib seaborn scipy python-dotenv tabulate
+pip install -r requirements.txt
 
-# Run the analysis script
-Write-Output "Running the analysis script..."
+# Run the pipeline (retry failed stages of the previous run with: python pipeline.py --resume)
+Write-Output "Running the pipeline..."
 try {
     python $pythonScriptPath
-    Write-Output "Analysis completed successfully!"
+    if ($LASTEXITCODE -ne 0) {
+        throw "Pipeline failed with exit code $LASTEXITCODE (rerun with --resume to retry the failed stages)"
+    }
+    Write-Output "Pipeline completed successfully!"
     
     # Read and output the report
     if (Test-Path $reportPath) {
@@ -0,0 +1,87 @@
+"""Benchmark the analysis data backends on a synthetic ticker universe.
+
+Times the price/phase join for the local backends (pandas over CSVs, DuckDB
+over CSVs, pandas over the columnar store, DuckDB over the columnar store) and,
+when SQL_ODBC_CONNECTION_STRING is set, the SQL Server backend on the real
+tables.
+
+Usage:
+    python scripts/benchmark_analysis_backends.py [--tickers 200] [--years 5]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import analysis_backends
+from benchmark_columnar_store import synthetic_prices
+from columnar_store import import_csv_files
+from lunar_phase_engine import compute_lunar_phases, phase_names
+
+
+def timed(label, func, baseline=None):
+    """Run ``func`` once, print its wall time and return it."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    rows = sum(len(df) for df in result.values())
+    speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+    print(f"⏱️ {label:<22}: {elapsed:8.3f} s, {rows} joined rows{speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=200, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=5, help="Years of daily bars per ticker")
+    args = parser.parse_args()
+
+    conn_str = os.getenv("SQL_ODBC_CONNECTION_STRING")
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="backend_bench_")
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2025-03-11", periods=args.years * 252)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+
+    try:
+        os.chdir(work_dir)
+        os.makedirs("data")
+        print(f"🔧 Writing {args.tickers} tickers x {len(dates)} days...")
+        paths = []
+        for ticker in tickers:
+            path = f"data/{ticker}_stock_2025-03-11.csv"
+            synthetic_prices(rng, dates).to_csv(path, index=False)
+            paths.append(path)
+        with open("latest_files.txt", "w") as f:
+            f.write("\n".join(paths) + "\n")
+        calendar = pd.date_range(dates[0], dates[-1], freq="D")
+        pd.DataFrame({
+            "Date": calendar.strftime("%Y-%m-%d"),
+            "Phase": phase_names(compute_lunar_phases(calendar.values).code),
+        }).to_csv("data/lunar_phases.csv", index=False)
+
+        baseline = timed("pandas over CSVs", lambda: analysis_backends.load_csv(tickers))
+        timed("duckdb over CSVs", lambda: analysis_backends.load_duckdb(tickers), baseline)
+
+        import_csv_files(paths)
+        timed("pandas over store", lambda: analysis_backends.load_store(tickers), baseline)
+        timed("duckdb over store", lambda: analysis_backends.load_duckdb(tickers), baseline)
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir)
+
+    if conn_str:
+        import pyodbc
+
+        conn = pyodbc.connect(conn_str)
+        etfs = ["SPY", "QQQ", "DIA", "IWM"]
+        timed("sql server (4 ETFs)", lambda: analysis_backends.load_sql(etfs, conn))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
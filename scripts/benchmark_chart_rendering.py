@@ -0,0 +1,104 @@
+"""Benchmark per-ticker chart rendering for a synthetic ticker universe.
+
+Builds returns-by-phase and phase-distribution chart jobs from synthetic
+per-phase aggregates (the same inputs the render step takes) and times:
+
+- a new pyplot figure per chart with tight_layout (the way the summary
+  charts are drawn), measured on a sample and extrapolated
+- the render pipeline in one process (cached figure per chart kind, only
+  the per-ticker artists redrawn)
+- the render pipeline across worker processes
+
+Usage:
+    python scripts/benchmark_chart_rendering.py [--tickers 500] [--workers 4] [--sample 40]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from lunar_analysis.compute import PHASE_ORDER
+from lunar_analysis.render import ChartJob, _phase_colors, _pyplot, render_chart_jobs
+from phase_stats import HISTOGRAM_EDGES
+from sharding import default_workers
+
+
+def synthetic_jobs(n_tickers, directory, seed=0):
+    """Returns and distribution chart jobs for ``n_tickers`` synthetic tickers."""
+    rng = np.random.default_rng(seed)
+    n_phases, n_bins = len(PHASE_ORDER), len(HISTOGRAM_EDGES) - 1
+    jobs = []
+    for i in range(n_tickers):
+        ticker = f"T{i:04d}"
+        mean = rng.normal(0.05, 0.1, n_phases)
+        half_width = rng.uniform(0.1, 0.3, n_phases)
+        jobs.append(ChartJob("returns", ticker, os.path.join(directory, f"{ticker}_returns_by_phase.png"),
+                             (-0.5, 0.5), {"mean": mean, "low": mean - half_width, "high": mean + half_width}))
+        counts = rng.poisson(40 * np.exp(-0.5 * ((np.arange(n_bins) - n_bins / 2) / 4) ** 2), (n_phases, n_bins))
+        jobs.append(ChartJob("distribution", ticker, os.path.join(directory, f"{ticker}_phase_distribution.png"),
+                             (HISTOGRAM_EDGES[0], HISTOGRAM_EDGES[-1]), {"counts": counts}))
+    return jobs
+
+
+def render_new_figure(job):
+    """Draw one job on a fresh pyplot figure and save it."""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(8, 5))
+    if job.kind == "returns":
+        mean = job.data["mean"]
+        plt.bar(range(len(PHASE_ORDER)), mean, color=_phase_colors())
+        plt.errorbar(range(len(PHASE_ORDER)), mean, yerr=[mean - job.data["low"], job.data["high"] - mean],
+                     fmt="none", ecolor="#333333")
+        plt.xticks(range(len(PHASE_ORDER)), PHASE_ORDER, rotation=45, ha="right")
+    else:
+        counts = job.data["counts"]
+        plt.imshow(counts / counts.sum(axis=1, keepdims=True), aspect="auto", cmap="viridis")
+        plt.yticks(range(len(PHASE_ORDER)), PHASE_ORDER)
+    plt.title(job.ticker)
+    plt.tight_layout()
+    fig.savefig(job.path)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500, help="Number of synthetic tickers (2 charts each)")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Worker processes")
+    parser.add_argument("--sample", type=int, default=40, help="Charts drawn with a new figure per chart")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="chart_bench_")
+    try:
+        jobs = synthetic_jobs(args.tickers, work_dir)
+        print(f"🔧 {len(jobs)} charts for {args.tickers} tickers")
+
+        sample = jobs[:args.sample]
+        start = time.perf_counter()
+        for job in sample:
+            render_new_figure(job)
+        baseline = (time.perf_counter() - start) / len(sample) * len(jobs)
+        print(f"⏱️ {'new figure per chart':<22}: {baseline:8.2f} s (extrapolated from {len(sample)} charts)")
+
+        start = time.perf_counter()
+        render_chart_jobs(jobs, max_workers=1)
+        elapsed = time.perf_counter() - start
+        print(f"⏱️ {'cached figures, 1 proc':<22}: {elapsed:8.2f} s  ({baseline / elapsed:,.1f}x)")
+
+        if args.workers > 1:
+            start = time.perf_counter()
+            render_chart_jobs(jobs, max_workers=args.workers)
+            elapsed = time.perf_counter() - start
+            label = f"{args.workers} processes"
+            print(f"⏱️ {label:<22}: {elapsed:8.2f} s  ({baseline / elapsed:,.1f}x)")
+
+        written = sum(name.endswith(".png") for name in os.listdir(work_dir))
+        print(f"{'✅' if written == len(jobs) else '❌'} {written} charts written")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
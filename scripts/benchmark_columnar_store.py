@@ -0,0 +1,89 @@
+"""Benchmark the columnar store against dated CSVs for a synthetic ticker universe.
+
+Usage:
+    python scripts/benchmark_columnar_store.py [--tickers 1000] [--years 5]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import read_prices, write_prices
+
+
+def synthetic_prices(rng, dates):
+    """Generate one ticker's daily bars shaped like the yfinance CSVs."""
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    spread = np.abs(rng.normal(0, 0.005, len(dates))) * close
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Adj Close": close * 0.97,
+        "Close": close,
+        "High": close + spread,
+        "Low": close - spread,
+        "Open": close + rng.normal(0, 0.002, len(dates)) * close,
+        "Volume": rng.integers(1_000_000, 100_000_000, len(dates)),
+    })
+
+
+def directory_size(path):
+    """Total size in bytes of the files under ``path``."""
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=1000, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=5, help="Years of daily bars per ticker")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2025-03-11", periods=args.years * 252)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    work_dir = tempfile.mkdtemp(prefix="columnar_bench_")
+    csv_dir = os.path.join(work_dir, "csv")
+    store_root = os.path.join(work_dir, "store")
+    os.makedirs(csv_dir)
+
+    try:
+        print(f"🔧 Writing {args.tickers} tickers x {len(dates)} days...")
+        for ticker in tickers:
+            df = synthetic_prices(rng, dates)
+            df.to_csv(os.path.join(csv_dir, f"{ticker}_stock_2025-03-11.csv"), index=False)
+            write_prices(df, ticker, store_root)
+
+        start = time.perf_counter()
+        frames = []
+        for ticker in tickers:
+            df = pd.read_csv(os.path.join(csv_dir, f"{ticker}_stock_2025-03-11.csv"))
+            df["Date"] = pd.to_datetime(df["Date"])
+            frames.append(df)
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_prices(root=store_root)
+        store_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_prices(columns=["Date", "Close"], start=dates[-252], root=store_root)
+        projected_time = time.perf_counter() - start
+
+        csv_size = directory_size(csv_dir)
+        store_size = directory_size(store_root)
+
+        print(f"⏱️ CSV load (read_csv + parse dates): {csv_time:8.3f} s")
+        print(f"⏱️ store load (all columns)         : {store_time:8.3f} s  ({csv_time / store_time:,.1f}x)")
+        print(f"⏱️ store load (Close, last year)    : {projected_time:8.3f} s  ({csv_time / projected_time:,.1f}x)")
+        print(f"💾 CSV size  : {csv_size / 1e6:8.2f} MB")
+        print(f"💾 store size: {store_size / 1e6:8.2f} MB  ({csv_size / store_size:,.1f}x smaller)")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
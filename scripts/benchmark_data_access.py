@@ -0,0 +1,125 @@
+"""Benchmark pooled, chunked SQL reads against one-by-one ``pd.read_sql``.
+
+Builds a SQLite stand-in with the Azure SQL table layout (one
+``{TICKER}_StockPrices`` table per ticker plus ``LunarPhases``) for a
+synthetic ticker universe and times the per-ticker price/phase join of the
+sql analysis backend:
+
+- ``pd.read_sql`` per ticker, one after another over one connection
+- ``data_access.read_frame`` (typed chunks) one after another
+- ``data_access.map_pooled`` over a pool of connections
+
+Peak traced memory (tracemalloc) of reading one ticker into the compact
+frame schema is compared for ``pd.read_sql`` and the chunked reads. SQLite runs in-process, so the
+pooled read scales with the cores available; against a remote server the
+reads overlap network and server time as well.
+
+Usage:
+    python scripts/benchmark_data_access.py [--tickers 200] [--years 20] [--pool-size 4] [--chunk-rows 5000]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analysis_backends import join_query
+from benchmark_columnar_store import synthetic_prices
+from data_access import close_pool, connection_factory, create_pool, map_pooled, read_frame
+from frame_schema import normalize_frame
+from lunar_phase_engine import compute_lunar_phases, phase_names
+
+
+def build_database(path, tickers, years):
+    """Write the synthetic prices and the daily phases into a SQLite database."""
+    dates = pd.bdate_range(end="2025-03-11", periods=years * 252)
+    calendar = np.arange(dates[0].to_datetime64().astype("datetime64[D]"),
+                         dates[-1].to_datetime64().astype("datetime64[D]") + 1)
+    conn = sqlite3.connect(path)
+    try:
+        pd.DataFrame({"Date": calendar.astype(str), "Phase": phase_names(compute_lunar_phases(calendar).code)}) \
+            .to_sql("LunarPhases", conn, index=False)
+        # The SQLite join compares date() expressions
+        conn.execute("CREATE UNIQUE INDEX UX_LunarPhases_Date ON LunarPhases (date([Date]))")
+        rng = np.random.default_rng(0)
+        for ticker in tickers:
+            prices = synthetic_prices(rng, dates).rename(columns={"Adj Close": "Adj_Close"})
+            prices.to_sql(f"{ticker}_StockPrices", conn, index=False)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(dates)
+
+
+def timed(label, func, baseline=None):
+    """Run ``func`` once, print its wall time and return ``(elapsed, result)``."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+    print(f"⏱️ {label:<28}: {elapsed:8.2f} s{speedup}")
+    return elapsed, result
+
+
+def traced_peak(func):
+    """Peak traced memory of one call, in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=200, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=20, help="Years of daily bars per ticker")
+    parser.add_argument("--pool-size", type=int, default=4, help="Pooled connections")
+    parser.add_argument("--chunk-rows", type=int, default=5000, help="Rows per fetched chunk")
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    work_dir = tempfile.mkdtemp(prefix="data_access_bench_")
+    try:
+        path = os.path.join(work_dir, "standin.db")
+        days = build_database(path, tickers, args.years)
+        print(f"🔧 {args.tickers} tickers x {days} days in a SQLite stand-in")
+        factory = connection_factory(f"sqlite:{path}")
+
+        conn = factory()
+        baseline, expected = timed("pd.read_sql, one by one", lambda: [
+            normalize_frame(pd.read_sql(join_query(ticker, "sqlite"), conn)) for ticker in tickers])
+        timed("chunked, one by one", lambda: [
+            read_frame(conn, join_query(ticker, "sqlite"), chunk_rows=args.chunk_rows, convert=normalize_frame)
+            for ticker in tickers], baseline)
+
+        pool = create_pool(factory, args.pool_size)
+        try:
+            _, pooled = timed(f"chunked, pool of {args.pool_size}", lambda: map_pooled(
+                pool, lambda pooled_conn, ticker: read_frame(pooled_conn, join_query(ticker, "sqlite"),
+                                                             chunk_rows=args.chunk_rows, convert=normalize_frame),
+                tickers), baseline)
+        finally:
+            close_pool(pool)
+
+        query = join_query(tickers[0], "sqlite")
+        unchunked = traced_peak(lambda: normalize_frame(pd.read_sql(query, conn)))
+        chunked = traced_peak(lambda: read_frame(conn, query, chunk_rows=args.chunk_rows, convert=normalize_frame))
+        conn.close()
+        print(f"💾 peak memory per ticker read: pd.read_sql {unchunked / 2 ** 20:,.1f} MiB, "
+              f"chunked {chunked / 2 ** 20:,.1f} MiB ({unchunked / chunked:,.1f}x less)")
+
+        same = all(a.equals(b) for a, b in zip(expected, pooled))
+        print(f"{'✅' if same else '❌'} pooled frames identical to pd.read_sql")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
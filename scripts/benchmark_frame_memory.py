@@ -0,0 +1,84 @@
+"""Benchmark the compact frame schema on a synthetic ticker universe.
+
+Builds joined price/phase frames the way the SQL backend used to return them
+(object ``datetime.date`` dates, float64 prices, phase names as Python
+strings) and the same frames in the frame_schema.py layout with float64 and
+float32 prices, then reports:
+
+- resident memory of each representation (``memory_usage(deep=True)``)
+- the time to turn the Phase column into numeric codes: a per-row dictionary
+  lookup, factorizing the name strings, and reading the categorical codes
+
+Usage:
+    python scripts/benchmark_frame_memory.py [--tickers 500] [--years 10]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_columnar_store import synthetic_prices
+from frame_schema import format_bytes, frame_memory, normalize_frame
+from lunar_phase_engine import MOON_PHASES, compute_lunar_phases, phase_names
+from phase_stats import phase_codes
+
+
+def legacy_frames(tickers, dates, seed=0):
+    """{ticker: DataFrame} with object dates and phase names, as read_sql returned them."""
+    rng = np.random.default_rng(seed)
+    phases = phase_names(compute_lunar_phases(dates.values).code)
+    day = dates.date
+    frames = {}
+    for ticker in tickers:
+        df = synthetic_prices(rng, dates).drop(columns="Adj Close")
+        df["Date"] = day
+        # Each row holds its own str object, like rows fetched from a database
+        df["Phase"] = [str(name) for name in phases]
+        frames[ticker] = df[["Date", "Open", "High", "Low", "Close", "Volume", "Phase"]]
+    return frames
+
+
+def timed(label, func, baseline=None):
+    """Run ``func`` once, print its wall time and return it."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+    print(f"⏱️ {label:<22}: {elapsed:8.3f} s{speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=500, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars per ticker")
+    args = parser.parse_args()
+
+    dates = pd.bdate_range(end="2025-03-11", periods=args.years * 252)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    print(f"🔧 {args.tickers} tickers x {len(dates)} days")
+
+    legacy = legacy_frames(tickers, dates)
+    compact = {ticker: normalize_frame(df.copy(), "float64") for ticker, df in legacy.items()}
+    compact32 = {ticker: normalize_frame(df.copy(), "float32") for ticker, df in legacy.items()}
+
+    legacy_bytes = sum(frame_memory(df) for df in legacy.values())
+    print(f"💾 {'object dates/phases':<22}: {format_bytes(legacy_bytes):>12}")
+    for label, frames in (("compact, float64", compact), ("compact, float32", compact32)):
+        size = sum(frame_memory(df) for df in frames.values())
+        print(f"💾 {label:<22}: {format_bytes(size):>12}  ({legacy_bytes / size:,.1f}x smaller)")
+
+    lookup = {name: code for code, name in enumerate(MOON_PHASES)}
+    baseline = timed("per-row phase lookup", lambda: [df["Phase"].map(lookup) for df in legacy.values()])
+    timed("factorize names", lambda: [phase_codes(df["Phase"].to_numpy(dtype=object))
+                                      for df in legacy.values()], baseline)
+    timed("categorical codes", lambda: [phase_codes(df["Phase"]) for df in compact.values()], baseline)
+
+    same = all(np.array_equal(phase_codes(legacy[t]["Phase"].to_numpy(dtype=object)), phase_codes(compact[t]["Phase"]))
+               for t in tickers)
+    print(f"{'✅' if same else '❌'} phase codes identical")
+
+
+if __name__ == "__main__":
+    main()
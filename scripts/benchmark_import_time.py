@@ -0,0 +1,63 @@
+"""Benchmark the start-up (import) time of the analysis subcommands.
+
+Each case runs in a fresh interpreter so nothing is cached in-process, and
+the median of several runs is reported against the exact import block of
+the former single-file analysis script (pandas, numpy, matplotlib.pyplot,
+seaborn, scipy.stats, python-dotenv and pyodbc, skipped where the driver
+is not installed).
+
+Usage:
+    python scripts/benchmark_import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CASES = [
+    ("monolithic script", "import os\n"
+                          "try:\n    import pyodbc\nexcept ImportError:\n    pass\n"
+                          "import pandas, numpy, matplotlib.pyplot, seaborn\n"
+                          "from scipy import stats\n"
+                          "from datetime import datetime\n"
+                          "from dotenv import load_dotenv"),
+    ("cli --help", "from lunar_analysis.cli import main\n"
+                   "try:\n    main(['--help'])\nexcept SystemExit:\n    pass"),
+    ("compute subcommand", "from lunar_analysis import cli, compute, database, settings\n"
+                           "from scipy.special import fdtrc"),
+    ("report subcommand", "from lunar_analysis import cli, compute, report\nimport tabulate"),
+    ("render subcommand", "from lunar_analysis import cli, render\nrender._pyplot()\nimport seaborn"),
+]
+
+
+def time_import(code):
+    """Wall-clock seconds for a fresh interpreter to run ``code``."""
+    env = {**os.environ, "PYTHONPATH": SCRIPTS_DIR, "MPLBACKEND": "Agg"}
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, env=env, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per case")
+    args = parser.parse_args()
+
+    bare = statistics.median(time_import("pass") for _ in range(args.repeat))
+    print(f"🔧 Median of {args.repeat} cold starts; bare interpreter: {bare:.3f} s")
+
+    baseline = None
+    for label, code in CASES:
+        time_import(code)  # warm the OS file cache
+        elapsed = statistics.median(time_import(code) for _ in range(args.repeat))
+        speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+        print(f"⏱️ {label:<20}: {elapsed:8.3f} s{speedup}")
+        baseline = baseline or elapsed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark the vectorized lunar phase engine against the per-date loop.
+
+Usage:
+    python scripts/benchmark_lunar_phase.py [--years 30] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lunar_phase_engine import MOON_PHASES, compute_lunar_phases
+
+
+def legacy_calculate_lunar_phase(date):
+    """Previous per-date calculation (two Time objects, fixed mean month)."""
+    from astropy.time import Time
+
+    moon_phase_number = int((Time(date).mjd - Time("2000-01-06").mjd) % 29.53 // 3.69)
+    return MOON_PHASES[moon_phase_number]
+
+
+def best_of(func, repeat):
+    """Return the best wall-clock time of ``repeat`` calls and the last result."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=30, help="Years of daily dates")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    dates = np.datetime64("2000-01-01") + np.arange(args.years * 365) * np.timedelta64(1, "D")
+    print(f"📅 {len(dates)} daily dates ({args.years} years)")
+
+    legacy_time, legacy = best_of(
+        lambda: [legacy_calculate_lunar_phase(str(d)) for d in dates], 1)
+    meeus_time, meeus = best_of(lambda: compute_lunar_phases(dates), args.repeat)
+    astropy_time, reference = best_of(
+        lambda: compute_lunar_phases(dates, method="astropy"), 1)
+
+    legacy_codes = np.array([MOON_PHASES.index(p) for p in legacy])
+    angle_error = np.abs((meeus.angle - reference.angle + 180) % 360 - 180)
+
+    print(f"⏱️ per-date loop      : {legacy_time:8.3f} s")
+    print(f"⏱️ vectorized (meeus) : {meeus_time:8.3f} s  ({legacy_time / meeus_time:,.1f}x)")
+    print(f"⏱️ vectorized (astropy): {astropy_time:8.3f} s  ({legacy_time / astropy_time:,.1f}x)")
+    print(f"🎯 meeus max elongation error vs astropy: {angle_error.max():.4f} deg")
+    print(f"🎯 phase code agreement, meeus vs astropy: {np.mean(meeus.code == reference.code):.4%}")
+    print(f"🎯 phase code agreement, per-date loop vs astropy: {np.mean(legacy_codes == reference.code):.4%}")
+
+
+if __name__ == "__main__":
+    main()
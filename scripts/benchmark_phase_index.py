@@ -0,0 +1,82 @@
+"""Benchmark the lunar phase interval index against the daily phase table.
+
+For a span of years, compares:
+
+- size: the daily table (one Date/Phase row per calendar day, as in
+  data/lunar_phases.csv) against the transition index in memory and on disk
+- day-level attribution of trading dates: pandas join on the daily table
+  against ``phase_on``
+- timestamp-level attribution of minute bars: the position model per bar
+  against ``phase_at``
+
+Usage:
+    python scripts/benchmark_phase_index.py [--years 200] [--bars 2000000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from frame_schema import format_bytes, frame_memory
+from lunar_phase_engine import compute_lunar_phases, phase_names
+from phase_index import build_phase_index, index_nbytes, phase_at, phase_on, save_phase_index
+
+
+def timed(label, func, baseline=None):
+    """Run ``func`` once, print its wall time and return ``(elapsed, result)``."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+    print(f"⏱️ {label:<24}: {elapsed:8.3f} s{speedup}")
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=200, help="Years covered, starting 1900")
+    parser.add_argument("--bars", type=int, default=2_000_000, help="Random minute timestamps to attribute")
+    args = parser.parse_args()
+
+    start = np.datetime64("1900-01-01")
+    end = (start.astype("datetime64[Y]") + np.timedelta64(args.years, "Y")).astype("datetime64[D]")
+    calendar = np.arange(start, end)
+    rng = np.random.default_rng(0)
+
+    _, table = timed("daily table (engine)", lambda: pd.DataFrame({
+        "Date": calendar.astype("datetime64[ns]"), "Phase": phase_names(compute_lunar_phases(calendar).code)}))
+    _, index = timed("interval index build", lambda: build_phase_index(start, end))
+
+    work_dir = tempfile.mkdtemp(prefix="phase_index_bench_")
+    try:
+        table_path, index_path = os.path.join(work_dir, "lunar_phases.csv"), os.path.join(work_dir, "index.npz")
+        table.to_csv(table_path, index=False)
+        save_phase_index(index, index_path)
+        print(f"💾 daily table : {len(table):>9} rows, {format_bytes(frame_memory(table)):>10} in memory, "
+              f"{format_bytes(os.path.getsize(table_path)):>10} CSV")
+        print(f"💾 phase index : {len(index.boundaries):>9} rows, {format_bytes(index_nbytes(index)):>10} in memory, "
+              f"{format_bytes(os.path.getsize(index_path)):>10} npz")
+    finally:
+        shutil.rmtree(work_dir)
+
+    trading_days = pd.DataFrame({"Date": pd.bdate_range(start, end - np.timedelta64(1, "D"))})
+    baseline, joined = timed("day-level: table join", lambda: trading_days.merge(table, on="Date", how="inner"))
+    _, codes = timed("day-level: index lookup", lambda: phase_on(index, trading_days["Date"].to_numpy()), baseline)
+    same_days = np.array_equal(phase_names(codes), joined["Phase"].to_numpy())
+
+    span_minutes = int((end - start).astype("timedelta64[m]").astype(np.int64))
+    bars = start.astype("datetime64[m]") + np.sort(rng.integers(0, span_minutes, args.bars)).astype("timedelta64[m]")
+    baseline, engine = timed("bars: position model", lambda: compute_lunar_phases(bars).code)
+    _, looked_up = timed("bars: index lookup", lambda: phase_at(index, bars), baseline)
+
+    print(f"{'✅' if same_days else '❌'} day-level phases identical to the daily table")
+    print(f"🎯 bar-level agreement with the position model: {np.mean(engine == looked_up):.5%} "
+          f"(differences are bars within the bisection tolerance of a transition)")
+
+
+if __name__ == "__main__":
+    main()
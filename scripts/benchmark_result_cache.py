@@ -0,0 +1,103 @@
+"""Benchmark the analysis result cache on a synthetic ticker universe.
+
+Writes synthetic price CSVs and the daily phases into a temporary working
+directory and times the compute step (csv source) of the analysis:
+
+- cold: empty cache, everything is loaded and computed
+- warm: nothing changed, the cached ``AnalysisResult`` is returned
+- one ticker changed: one price is revised in one CSV, so only that ticker
+  is reloaded and resampled
+
+The last result is compared with an uncached run on the same data.
+
+Usage:
+    python scripts/benchmark_result_cache.py [--tickers 100] [--years 5] [--permutations 2000]
+"""
+import argparse
+from contextlib import redirect_stdout
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmark_columnar_store import synthetic_prices
+from lunar_analysis.compute import compute
+from lunar_analysis.settings import load_settings
+from lunar_phase_engine import compute_lunar_phases, phase_names
+
+
+def write_inputs(tickers, years):
+    """Write the price CSVs, latest_files.txt and data/lunar_phases.csv into the working directory."""
+    dates = pd.bdate_range(end="2025-03-11", periods=years * 252)
+    calendar = np.arange(dates[0].to_datetime64().astype("datetime64[D]"),
+                         dates[-1].to_datetime64().astype("datetime64[D]") + 1)
+    os.makedirs("data")
+    pd.DataFrame({"Date": calendar.astype(str), "Phase": phase_names(compute_lunar_phases(calendar).code)}) \
+        .to_csv(os.path.join("data", "lunar_phases.csv"), index=False)
+    rng = np.random.default_rng(0)
+    paths = []
+    for ticker in tickers:
+        path = os.path.join("data", f"{ticker}_stock_2025-03-11.csv")
+        synthetic_prices(rng, dates).to_csv(path, index=False)
+        paths.append(path)
+    with open("latest_files.txt", "w") as f:
+        f.write("\n".join(paths) + "\n")
+    return paths
+
+
+def timed(label, func, baseline=None):
+    """Run ``func`` once (its output silenced), print its wall time and return ``(elapsed, result)``."""
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:,.1f}x)" if baseline else ""
+    print(f"⏱️ {label:<20}: {elapsed:8.3f} s{speedup}")
+    return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=100, help="Number of synthetic tickers")
+    parser.add_argument("--years", type=int, default=5, help="Years of daily bars per ticker")
+    parser.add_argument("--permutations", type=int, default=2000, help="Permutations (and bootstrap resamples / 5)")
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    work_dir = tempfile.mkdtemp(prefix="result_cache_bench_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(work_dir)
+        paths = write_inputs(tickers, args.years)
+        print(f"🔧 {args.tickers} tickers x {args.years * 252} days in {work_dir}")
+        settings = load_settings()._replace(data_source="csv", sql_pushdown=False,
+                                            n_permutations=args.permutations,
+                                            n_bootstrap=max(args.permutations // 5, 1),
+                                            cache_dir=os.path.join(work_dir, "cache"))
+
+        baseline, _ = timed("cold cache", lambda: compute(settings, tickers))
+        timed("unchanged inputs", lambda: compute(settings, tickers), baseline)
+
+        # Revise one bar of one ticker
+        prices = pd.read_csv(paths[-1])
+        prices.loc[len(prices) // 2, "Close"] *= 1.01
+        prices.to_csv(paths[-1], index=False)
+        _, cached = timed("one ticker changed", lambda: compute(settings, tickers), baseline)
+        _, expected = timed("without the cache", lambda: compute(settings._replace(cache_dir=None), tickers))
+
+        same = (cached.phase_stats.groups.equals(expected.phase_stats.groups)
+                and cached.resampling.anova.equals(expected.resampling.anova)
+                and cached.resampling.groups.equals(expected.resampling.groups)
+                and cached.correlation_matrix.equals(expected.correlation_matrix))
+        print(f"{'✅' if same else '❌'} partially cached results identical to an uncached run")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Benchmark suite: time and memory of every pipeline stage on synthetic data.
+
+A deterministic generator writes N tickers x M years of daily bars as
+``data/{TICKER}_stock_2025-03-11.csv`` plus ``latest_files.txt`` into a work
+directory (same seed, same files; an existing matching data set is reused).
+The stages then run in order, each feeding the next, the way the pipeline
+runs them:
+
+    moon_phases   extract_moon_data local phase generation -> data/lunar_phases.csv
+    csv_parse     parse the price and phase CSVs (frame_schema.py)
+    sql_load      staged upserts of every ticker and the phases (sql_upsert.py) into a SQLite stand-in
+    join          lunar_analysis.compute.fetch_stock_data on the csv source: the analysis'
+                  own load (analysis_backends.load_csv), phase join and daily returns
+    phase_stats   per-phase statistics, ANOVA, the returns-by-phase table and per-phase
+                  histograms, as lunar_analysis.compute builds them
+    correlation   lunar_analysis.compute.compute_correlations (phase correlations, and the
+                  cross-ticker matrix only when the heatmap will be drawn)
+    event_study   CAR around new and full moons on the return panel, as compute runs it
+    render        lunar_analysis.render.render_charts (summary and per-ticker charts)
+    report        markdown report (lunar_analysis.report)
+
+Every analysis stage calls the production functions, so a regression in the
+real code path shows up here.
+
+Each stage records wall time and peak traced memory (tracemalloc, which
+includes NumPy buffers; worker processes of the render stage are not
+included, and tracing adds some overhead to the timings, see --no-memory).
+Results are written as JSON to data/benchmarks/<scale>.json and compared
+against data/benchmarks/baseline_<scale>.json when it exists: a stage
+regresses when it is more than BENCHMARK_TOLERANCE slower (or larger) than
+the baseline and the difference exceeds the noise floor. The exit code is 1
+on regressions.
+
+Usage:
+    python scripts/benchmark_suite.py [--scale current|small|medium|large] [--tickers N --years M]
+                                      [--stages join phase_stats ...] [--save-baseline] [--work-dir DIR]
+"""
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmark_columnar_store import synthetic_prices
+
+# (tickers, years) per named scale; "current" is today's four ETFs
+SCALES = {
+    "current": (4, 5),
+    "small": (100, 10),
+    "medium": (1000, 20),
+    "large": (5000, 30),
+}
+CURRENT_TICKERS = ["SPY", "QQQ", "DIA", "IWM"]
+
+END_DATE = "2025-03-11"
+SEED = 42
+
+RESULTS_DIR = "data/benchmarks"
+
+# Relative slowdown / growth that counts as a regression, and absolute noise floors
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.25"))
+MIN_SECONDS = 0.1
+MIN_MEMORY_MIB = 8.0
+
+STAGES = ["moon_phases", "csv_parse", "sql_load", "join", "phase_stats", "correlation", "event_study",
+          "render", "report"]
+
+
+def scale_tickers(n_tickers):
+    """Ticker symbols for a scale: the real ETFs for four tickers, T0000... otherwise."""
+    return CURRENT_TICKERS[:n_tickers] if n_tickers <= len(CURRENT_TICKERS) else \
+        [f"T{i:04d}" for i in range(n_tickers)]
+
+
+def generate_data(work_dir, tickers, years, seed=SEED):
+    """Write the synthetic price CSVs and latest_files.txt; reuse them when already generated."""
+    manifest_path = os.path.join(work_dir, "manifest.json")
+    manifest = {"tickers": len(tickers), "years": years, "seed": seed, "end": END_DATE}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                print(f"🗂️ Reusing synthetic data in {work_dir}")
+                return
+
+    dates = pd.bdate_range(end=END_DATE, periods=years * 252)
+    os.makedirs(os.path.join(work_dir, "data"), exist_ok=True)
+    paths = []
+    print(f"🔧 Writing {len(tickers)} tickers x {len(dates)} days to {work_dir}...")
+    for i, ticker in enumerate(tickers):
+        path = f"data/{ticker}_stock_{END_DATE}.csv"
+        # One stream per ticker, so a ticker's bars do not depend on the universe size
+        synthetic_prices(np.random.default_rng([seed, i]), dates).to_csv(os.path.join(work_dir, path), index=False)
+        paths.append(path)
+    with open(os.path.join(work_dir, "latest_files.txt"), "w") as f:
+        f.write("\n".join(paths) + "\n")
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+
+def run_stage(name, func, state, measure_memory=True):
+    """Run one stage on the shared state; return its record of seconds, peak memory and rows."""
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    rows = func(state)
+    seconds = time.perf_counter() - start
+    peak_mib = None
+    if measure_memory:
+        peak_mib = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    memory = f", peak {peak_mib:9,.1f} MiB" if peak_mib is not None else ""
+    print(f"⏱️ {name:<12}: {seconds:8.2f} s{memory}, {rows:,} rows")
+    return {"stage": name, "seconds": round(seconds, 4),
+            "peak_mib": round(peak_mib, 2) if peak_mib is not None else None, "rows": int(rows)}
+
+
+def build_stages(tickers, years, workers):
+    """{stage: function(state) -> rows processed}; stages pass their outputs on through ``state``."""
+    from analysis_backends import LUNAR_FILE_PATH, _latest_files
+    from frame_schema import read_phases_csv, read_prices_csv
+    from lunar_analysis.settings import load_settings
+
+    # The analysis settings on the csv source, without the result cache
+    settings = load_settings()._replace(data_source="csv", sql_pushdown=False, cache_dir=None)
+
+    def moon_phases(state):
+        from extract_moon_data import generate_local_moon_data
+
+        start = pd.Timestamp(END_DATE) - pd.DateOffset(years=years)
+        days = (pd.Timestamp(END_DATE) - start).days + 1
+        df = pd.DataFrame(generate_local_moon_data(start_date=start.to_pydatetime(), days=days))
+        df.to_csv(LUNAR_FILE_PATH, index=False)
+        return len(df)
+
+    def csv_parse(state):
+        state["phases"] = read_phases_csv(LUNAR_FILE_PATH)
+        state["prices"] = {ticker: read_prices_csv(path) for ticker, path in _latest_files(tickers).items()}
+        return sum(len(df) for df in state["prices"].values()) + len(state["phases"])
+
+    def sql_load(state):
+        from sql_upsert import bulk_upsert
+
+        db_path = "standin.db"
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = sqlite3.connect(db_path)
+        rows = 0
+        try:
+            conn.execute("CREATE TABLE LunarPhases ([Date] DATE PRIMARY KEY, [Phase] VARCHAR(50))")
+            phases = state["phases"].assign(Date=state["phases"]["Date"].dt.date,
+                                            Phase=state["phases"]["Phase"].astype(str))
+            rows += bulk_upsert(conn, "LunarPhases", ["Date"], ["Phase"],
+                                phases[["Date", "Phase"]].itertuples(index=False, name=None)).inserted
+            for ticker, prices in state["prices"].items():
+                table = f"{ticker}_StockPrices"
+                conn.execute(f"CREATE TABLE {table} ([Date] DATE PRIMARY KEY, [Open] FLOAT, [High] FLOAT, "
+                             f"[Low] FLOAT, [Close] FLOAT, [Adj_Close] FLOAT, [Volume] BIGINT)")
+                # Same conversion as upload_stock_sql.py: plain dates, tuples in key + value order
+                df = prices.rename(columns={"Adj Close": "Adj_Close"}).assign(Date=prices["Date"].dt.date)
+                tuples = df[["Date", "Open", "High", "Low", "Close", "Adj_Close", "Volume"]].itertuples(
+                    index=False, name=None)
+                rows += bulk_upsert(conn, table, ["Date"], ["Open", "High", "Low", "Close", "Adj_Close", "Volume"],
+                                    tuples).inserted
+        finally:
+            conn.close()
+        return rows
+
+    def join(state):
+        from lunar_analysis.compute import fetch_stock_data
+
+        state["stock_data"], _ = fetch_stock_data(settings, tickers)
+        return sum(len(df) for df in state["stock_data"].values())
+
+    def phase_stats(state):
+        from lunar_analysis.compute import returns_by_phase_table
+        from phase_stats import compute_phase_histograms, compute_phase_stats
+
+        state["phase_stats"] = compute_phase_stats(state["stock_data"])
+        state["analysed"] = list(state["stock_data"])
+        state["returns_by_phase"] = returns_by_phase_table(state["phase_stats"], state["analysed"])
+        state["histograms"] = compute_phase_histograms(state["stock_data"])
+        return len(state["phase_stats"].groups)
+
+    def correlation(state):
+        from lunar_analysis.compute import compute_correlations
+
+        state["phase_correlation"], state["lunar_correlations"], state["correlation_matrix"] = \
+            compute_correlations(state["stock_data"], None)
+        return sum(len(df) for df in state["stock_data"].values())
+
+    def event_study(state):
+        from event_study import run_event_study
+        from price_panel import build_panel
+
+        state["event_study"] = run_event_study(build_panel(state["stock_data"], fields=["Return"]),
+                                               window=settings.event_window, baseline=settings.event_baseline,
+                                               estimation_days=settings.event_estimation_days)
+        return int(state["event_study"].summary["n"].sum())
+
+    def result(state):
+        from lunar_analysis.compute import AnalysisResult
+
+        return AnalysisResult(
+            tickers=state["analysed"], analysed=state["analysed"], phase_stats=state["phase_stats"],
+            phase_correlation=state["phase_correlation"], lunar_correlations=state["lunar_correlations"],
+            correlation_matrix=state["correlation_matrix"],
+            all_returns_by_phase=state["returns_by_phase"], resampling=None,
+            return_histograms=state["histograms"], event_study=state.get("event_study"), n_permutations=0)
+
+    def render(state):
+        from lunar_analysis.render import render_charts
+
+        render_charts(result(state), max_workers=workers)
+        return sum(len(files) for _, _, files in os.walk("visualizations"))
+
+    def report(state):
+        from lunar_analysis.report import write_report
+
+        write_report(result(state))
+        return len(state["analysed"])
+
+    return {"moon_phases": moon_phases, "csv_parse": csv_parse, "sql_load": sql_load, "join": join,
+            "phase_stats": phase_stats, "correlation": correlation, "event_study": event_study,
+            "render": render, "report": report}
+
+
+def compare(records, baseline, tolerance=TOLERANCE):
+    """Print each stage against the baseline; return the names of regressed stages."""
+    previous = {record["stage"]: record for record in baseline["stages"]}
+    regressions = []
+    print(f"\n📏 Against baseline of {baseline['created']} (tolerance {tolerance:.0%}):")
+    for record in records:
+        base = previous.get(record["stage"])
+        if base is None:
+            print(f"   {record['stage']:<12}: no baseline")
+            continue
+        checks = [("time", record["seconds"], base["seconds"], MIN_SECONDS, "s")]
+        if record["peak_mib"] is not None and base.get("peak_mib") is not None:
+            checks.append(("memory", record["peak_mib"], base["peak_mib"], MIN_MEMORY_MIB, "MiB"))
+        for label, value, reference, floor, unit in checks:
+            ratio = value / reference if reference else float("inf")
+            regressed = value > reference * (1 + tolerance) and value - reference > floor
+            regressions += [f"{record['stage']} {label}"] if regressed else []
+            print(f"{'❌' if regressed else '✅'} {record['stage']:<12} {label:<6}: {value:10,.2f} {unit} "
+                  f"vs {reference:10,.2f} ({ratio:5.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="current", help="Named tickers x years scale")
+    parser.add_argument("--tickers", type=int, help="Override the number of tickers")
+    parser.add_argument("--years", type=int, help="Override the years of daily bars")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, help="Run up to and report only these stages")
+    parser.add_argument("--workers", type=int, default=1, help="Chart worker processes (1 keeps runs comparable)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (timings without its overhead)")
+    parser.add_argument("--work-dir", help="Keep the synthetic data here and reuse it on the next run")
+    parser.add_argument("--output", help=f"Results JSON (default {RESULTS_DIR}/<scale>.json)")
+    parser.add_argument("--baseline", help=f"Baseline JSON (default {RESULTS_DIR}/baseline_<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    n_tickers, years = SCALES[args.scale]
+    n_tickers, years = args.tickers or n_tickers, args.years or years
+    name = args.scale if not (args.tickers or args.years) else f"{n_tickers}x{years}"
+    output = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{name}.json"))
+    baseline_path = os.path.abspath(args.baseline or os.path.join(RESULTS_DIR, f"baseline_{name}.json"))
+    tickers = scale_tickers(n_tickers)
+
+    original_dir = os.getcwd()
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="benchmark_suite_")
+    os.makedirs(work_dir, exist_ok=True)
+    records = []
+    try:
+        generate_data(work_dir, tickers, years)
+        os.chdir(work_dir)
+        stages = build_stages(tickers, years, args.workers)
+        # Later stages need the outputs of the earlier ones, so selected stages run with their prerequisites
+        last = max(STAGES.index(stage) for stage in args.stages) if args.stages else len(STAGES) - 1
+        state = {}
+        print(f"🏁 {name}: {n_tickers} tickers x {years} years")
+        for stage in STAGES[:last + 1]:
+            record = run_stage(stage, stages[stage], state, not args.no_memory)
+            if not args.stages or stage in args.stages:
+                records.append(record)
+    finally:
+        os.chdir(original_dir)
+        if not args.work_dir:
+            shutil.rmtree(work_dir)
+
+    results = {
+        "name": name, "tickers": n_tickers, "years": years, "seed": SEED,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                        "platform": platform.platform(), "cpus": os.cpu_count()},
+        "memory_traced": not args.no_memory,
+        "stages": records,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+
+    regressions = []
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        shutil.copyfile(output, baseline_path)
+        print(f"✅ Baseline saved to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            regressions = compare(records, json.load(f))
+    else:
+        print(f"ℹ️ No baseline at {baseline_path}; run with --save-baseline to store one")
+
+    if regressions:
+        print(f"❌ Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Parallel, chunked, content-hash-aware uploads to Azure Blob Storage.
+
+Files are uploaded concurrently; large files are split into blocks uploaded in
+parallel. Each blob records the SHA-256 of the local (uncompressed) file in its
+metadata, and files whose stored hash matches are skipped. The skip needs a
+stable blob name per data set: dated files (``SPY_stock_2025-03-11.csv``) are
+stored under their ticker (``stock_blob_name``), so the daily rename does not
+create a new blob; the source file name is kept in the metadata. Files can optionally
+be gzip-compressed on the fly (stored with ``Content-Encoding: gzip``).
+
+Works against Azure Storage or a local Azurite emulator
+(``AZURE_STORAGE_CONNECTION_STRING="UseDevelopmentStorage=true"``).
+
+Usage:
+    python scripts/blob_uploader.py <container> <file> [<file> ...] [--gzip]
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import shutil
+import sys
+import tempfile
+
+from azure.storage.blob import BlobServiceClient, ContentSettings
+from dotenv import load_dotenv
+
+from instrumentation import span
+
+# Block size for chunked uploads (files above this are uploaded as parallel blocks)
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Files uploaded at once, and blocks uploaded at once per file
+MAX_WORKERS = int(os.getenv("BLOB_UPLOAD_MAX_WORKERS", "8"))
+MAX_BLOCK_CONCURRENCY = 4
+
+# Compressed payloads are spooled in memory up to this size, then on disk
+SPOOL_SIZE = 64 * 1024 * 1024
+
+HASH_METADATA_KEY = "content_sha256"
+ENCODING_METADATA_KEY = "upload_encoding"
+SOURCE_METADATA_KEY = "source_file"
+
+
+def file_sha256(file_path):
+    """Return the hex SHA-256 digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stock_blob_name(file_path):
+    """Stable blob name for a dated stock file: ``data/SPY_stock_2025-03-11.csv`` -> ``SPY_stock.csv``."""
+    return f"{os.path.basename(file_path).split('_')[0]}_stock.csv"
+
+
+def stored_metadata(container_client):
+    """Return {blob name: metadata} for the container in a single listing."""
+    return {blob.name: blob.metadata or {} for blob in container_client.list_blobs(include=["metadata"])}
+
+
+def upload_file(container_client, file_path, blob_name, stored, compress=False,
+                max_concurrency=MAX_BLOCK_CONCURRENCY):
+    """Upload one file unless the blob already holds the same content.
+
+    Returns "uploaded" or "skipped".
+    """
+    with span("upload_blob", blob=blob_name, bytes=os.path.getsize(file_path), compress=compress) as metrics:
+        metrics["outcome"] = _upload_file(container_client, file_path, blob_name, stored, compress, max_concurrency)
+    return metrics["outcome"]
+
+
+def _upload_file(container_client, file_path, blob_name, stored, compress, max_concurrency):
+    digest = file_sha256(file_path)
+    encoding = "gzip" if compress else "identity"
+
+    existing = stored.get(blob_name, {})
+    if existing.get(HASH_METADATA_KEY) == digest and existing.get(ENCODING_METADATA_KEY) == encoding:
+        return "skipped"
+
+    metadata = {HASH_METADATA_KEY: digest, ENCODING_METADATA_KEY: encoding,
+                SOURCE_METADATA_KEY: os.path.basename(file_path)}
+    content_settings = ContentSettings(
+        content_type=mimetypes.guess_type(file_path)[0] or "application/octet-stream",
+        content_encoding="gzip" if compress else None,
+    )
+
+    with open(file_path, "rb") as f:
+        if compress:
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+                with gzip.GzipFile(fileobj=spool, mode="wb") as gz:
+                    shutil.copyfileobj(f, gz, BLOCK_SIZE)
+                spool.seek(0)
+                container_client.upload_blob(blob_name, spool, overwrite=True, metadata=metadata,
+                                             content_settings=content_settings,
+                                             max_concurrency=max_concurrency)
+        else:
+            container_client.upload_blob(blob_name, f, overwrite=True, metadata=metadata,
+                                         content_settings=content_settings,
+                                         max_concurrency=max_concurrency)
+    return "uploaded"
+
+
+def upload_files(connection_string, container, file_paths, compress=False, max_workers=MAX_WORKERS,
+                 blob_name=os.path.basename):
+    """Upload files to a container concurrently, skipping unchanged content.
+
+    Blobs are named ``blob_name(file_path)`` (the file's basename by default).
+    Returns a dict of counts for "uploaded", "skipped", "missing" and "failed".
+    """
+    blob_service_client = BlobServiceClient.from_connection_string(
+        connection_string, max_single_put_size=BLOCK_SIZE, max_block_size=BLOCK_SIZE)
+    container_client = blob_service_client.get_container_client(container)
+    if not container_client.exists():
+        container_client.create_container()
+
+    with span("list_blobs", container=container) as metrics:
+        stored = stored_metadata(container_client)
+        metrics["rows"] = len(stored)
+    counts = {"uploaded": 0, "skipped": 0, "missing": 0, "failed": 0}
+
+    existing_paths = []
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            existing_paths.append(file_path)
+        else:
+            print(f"⚠️ Skipping missing file: {file_path}")
+            counts["missing"] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(existing_paths)))) as pool:
+        futures = {
+            pool.submit(upload_file, container_client, file_path, blob_name(file_path),
+                        stored, compress): file_path
+            for file_path in existing_paths
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                status = future.result()
+                counts[status] += 1
+                if status == "skipped":
+                    print(f"⏭️ Unchanged, skipped {file_path}")
+                else:
+                    print(f"✅ Uploaded {file_path} to {container}")
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"❌ Error uploading {file_path}: {e}")
+
+    print(f"📦 {container}: {counts['uploaded']} uploaded, {counts['skipped']} unchanged, "
+          f"{counts['missing']} missing, {counts['failed']} failed")
+    return counts
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Upload files to Azure Blob Storage.")
+    parser.add_argument("container", help="Target blob container")
+    parser.add_argument("files", nargs="+", help="Files to upload")
+    parser.add_argument("--gzip", action="store_true", help="Compress files on the fly")
+    args = parser.parse_args()
+
+    result = upload_files(os.getenv("AZURE_STORAGE_CONNECTION_STRING"), args.container, args.files,
+                          compress=args.gzip)
+    sys.exit(1 if result["failed"] else 0)
@@ -0,0 +1,181 @@
+"""Partitioned columnar (Parquet) storage for prices and lunar phases.
+
+Layout under ``STORE_ROOT`` (hive-style partitions):
+
+    prices/ticker=SPY/year=2024/part-0.parquet
+    lunar_phases/year=2024/part-0.parquet
+
+Files are typed (date32 dates, float64 prices, int64 volume, dictionary-encoded
+phases), zstd-compressed and sorted by date so row-group statistics can skip
+data. Reads support column projection, predicate pushdown on ticker/date and
+memory-mapped I/O.
+
+Usage:
+    python scripts/columnar_store.py import   # load latest_files.txt CSVs and lunar_phases.csv
+"""
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from frame_schema import normalize_frame
+
+STORE_ROOT = os.getenv("COLUMNAR_STORE_ROOT", "data/store")
+COMPRESSION = "zstd"
+
+PRICE_SCHEMA = pa.schema([
+    ("Date", pa.date32()),
+    ("Open", pa.float64()),
+    ("High", pa.float64()),
+    ("Low", pa.float64()),
+    ("Close", pa.float64()),
+    ("Adj Close", pa.float64()),
+    ("Volume", pa.int64()),
+])
+
+LUNAR_SCHEMA = pa.schema([
+    ("Date", pa.date32()),
+    ("Phase", pa.dictionary(pa.int8(), pa.string())),
+])
+
+PRICE_PARTITIONING = ds.partitioning(
+    pa.schema([("ticker", pa.string()), ("year", pa.int32())]), flavor="hive")
+LUNAR_PARTITIONING = ds.partitioning(pa.schema([("year", pa.int32())]), flavor="hive")
+
+
+def _column_encodings(schema):
+    """Pick Parquet encodings per column: delta for dates/integers, byte-split for floats."""
+    encodings = {}
+    for field in schema:
+        if pa.types.is_floating(field.type):
+            encodings[field.name] = "BYTE_STREAM_SPLIT"
+        elif pa.types.is_date(field.type) or pa.types.is_integer(field.type):
+            encodings[field.name] = "DELTA_BINARY_PACKED"
+    return encodings
+
+
+def _write_partition(table, directory):
+    """Write one partition file atomically."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "part-0.parquet")
+    encodings = _column_encodings(table.schema)
+    pq.write_table(table, path + ".tmp", compression=COMPRESSION,
+                   use_dictionary=[name for name in table.schema.names if name not in encodings],
+                   column_encoding=encodings)
+    os.replace(path + ".tmp", path)
+
+
+def _upsert_partitions(df, schema, base_dir):
+    """Merge rows into year partitions under ``base_dir``, newest row per date wins."""
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"]).dt.date
+    years = pd.to_datetime(df["Date"]).dt.year
+
+    for year, rows in df.groupby(years.values):
+        directory = os.path.join(base_dir, f"year={year}")
+        path = os.path.join(directory, "part-0.parquet")
+        if os.path.exists(path):
+            existing = pq.read_table(path, schema=schema).to_pandas()
+            rows = pd.concat([existing, rows], ignore_index=True)
+        rows = rows.drop_duplicates("Date", keep="last").sort_values("Date")
+        table = pa.Table.from_pandas(rows[schema.names], schema=schema, preserve_index=False)
+        _write_partition(table, directory)
+
+
+def write_prices(df, ticker, root=STORE_ROOT):
+    """Write daily bars for one ticker into its year partitions."""
+    _upsert_partitions(df, PRICE_SCHEMA, os.path.join(root, "prices", f"ticker={ticker}"))
+
+
+def write_lunar_phases(df, root=STORE_ROOT):
+    """Write daily lunar phases into year partitions."""
+    _upsert_partitions(df, LUNAR_SCHEMA, os.path.join(root, "lunar_phases"))
+
+
+def _dataset(path, partitioning):
+    """Open a partitioned dataset with memory-mapped file access."""
+    return ds.dataset(path, format="parquet", partitioning=partitioning,
+                      filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+
+def _date_filter(start, end):
+    """Build a pushdown filter for start <= Date <= end (and the matching years)."""
+    condition = None
+    for bound, op in ((start, "ge"), (end, "le")):
+        if bound is None:
+            continue
+        bound = pd.Timestamp(bound)
+        date_cond = getattr(ds.field("Date"), f"__{op}__")(pa.scalar(bound.date(), pa.date32()))
+        year_cond = getattr(ds.field("year"), f"__{op}__")(bound.year)
+        both = date_cond & year_cond
+        condition = both if condition is None else condition & both
+    return condition
+
+
+def read_prices(tickers=None, columns=None, start=None, end=None, root=STORE_ROOT, dtype=None):
+    """Read daily bars as a DataFrame with a ``ticker`` column.
+
+    ``tickers`` restricts the partitions scanned, ``columns`` projects the
+    columns read and ``start``/``end`` filter dates (inclusive). Prices are
+    returned as ``dtype`` (default PRICE_DTYPE, see frame_schema.py).
+    """
+    dataset = _dataset(os.path.join(root, "prices"), PRICE_PARTITIONING)
+
+    condition = _date_filter(start, end)
+    if tickers is not None:
+        ticker_cond = ds.field("ticker").isin(list(tickers))
+        condition = ticker_cond if condition is None else condition & ticker_cond
+
+    if columns is None:
+        columns = PRICE_SCHEMA.names
+    columns = ["ticker"] + [c for c in columns if c != "ticker"]
+
+    table = dataset.to_table(columns=columns, filter=condition)
+    df = normalize_frame(table.to_pandas(date_as_object=False), dtype)
+    return df.sort_values([c for c in ("ticker", "Date") if c in df.columns], ignore_index=True)
+
+
+def read_lunar_phases(columns=None, start=None, end=None, root=STORE_ROOT):
+    """Read daily lunar phases as a DataFrame (Phase is a frame_schema.PHASE_DTYPE categorical)."""
+    dataset = _dataset(os.path.join(root, "lunar_phases"), LUNAR_PARTITIONING)
+    table = dataset.to_table(columns=columns or LUNAR_SCHEMA.names, filter=_date_filter(start, end))
+    df = normalize_frame(table.to_pandas(date_as_object=False))
+    return df.sort_values("Date", ignore_index=True) if "Date" in df.columns else df
+
+
+def list_tickers(root=STORE_ROOT):
+    """Return the tickers present in the store."""
+    prices_dir = os.path.join(root, "prices")
+    if not os.path.isdir(prices_dir):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(prices_dir) if name.startswith("ticker="))
+
+
+def import_csv_files(file_paths, lunar_file="data/lunar_phases.csv", root=STORE_ROOT):
+    """Load the dated stock CSVs and the lunar phase CSV into the store."""
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            print(f"⚠️ Skipping missing file: {file_path}")
+            continue
+
+        ticker = os.path.basename(file_path).split("_")[0]
+        write_prices(pd.read_csv(file_path), ticker, root)
+        print(f"✅ Stored {file_path} as {ticker} partitions")
+
+    if os.path.exists(lunar_file):
+        write_lunar_phases(pd.read_csv(lunar_file), root)
+        print(f"✅ Stored {lunar_file} as lunar phase partitions")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["import"]:
+        print(__doc__)
+        sys.exit(1)
+
+    with open("latest_files.txt", "r") as f:
+        paths = [line.strip() for line in f if line.strip()]
+    import_csv_files(paths)
@@ -0,0 +1,218 @@
+"""Shared pooled data access for Azure SQL / SQL Server and SQLite stand-ins.
+
+- Connections: ``connection_factory`` opens pyodbc connections for an ODBC
+  connection string, or sqlite3 connections for ``sqlite:<path>``.
+  ``connect_with_retry`` retries failed connects with exponential backoff.
+- Pooling: ``create_pool`` keeps up to POOL_SIZE connections open.
+  ``pooled_connection`` checks one out and returns it afterwards. A
+  connection that has been idle longer than HEALTH_CHECK_IDLE_SECONDS is
+  health-checked first (``SELECT 1``). A connection that fails the check, or
+  cannot roll back failed work, is replaced.
+- Chunked reads: ``read_batches`` streams a query with ``cursor.fetchmany``
+  in CHUNK_ROWS chunks and turns each chunk straight into typed NumPy columns,
+  so only one chunk of driver row objects is alive at a time.
+  ``read_frame`` builds a DataFrame from those columns, optionally converting
+  each chunk to the compact frame schema as it arrives.
+- Concurrent reads: ``map_pooled`` runs ``func(conn, item)`` for many items
+  (usually tickers) on threads, each on its own pooled connection. The
+  drivers release the GIL while they wait on the server, so read time scales
+  with the number of connections.
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import datetime
+import decimal
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "4"))
+CHUNK_ROWS = int(os.getenv("SQL_CHUNK_ROWS", "50000"))
+
+CONNECT_RETRIES = 3
+BACKOFF_SECONDS = 1.0
+HEALTH_CHECK_IDLE_SECONDS = 30.0
+
+SQLITE_PREFIX = "sqlite:"
+SQLITE_LOCK_TIMEOUT = 30.0
+
+# factory: callable returning a new DB-API connection; idle: LIFO queue of (connection, time
+# returned) so the most recently used connection is reused first; slots: bounds checked-out connections
+ConnectionPool = namedtuple("ConnectionPool", ["factory", "size", "idle", "slots"])
+
+
+def connection_factory(target):
+    """Return a callable opening a connection to an ODBC connection string or ``sqlite:<path>``."""
+    if target and target.startswith(SQLITE_PREFIX):
+        path = target[len(SQLITE_PREFIX):]
+        # Pooled connections move between threads (one thread at a time); concurrent
+        # writers (upload shards) wait for the database lock instead of failing
+        return lambda: sqlite3.connect(path, timeout=SQLITE_LOCK_TIMEOUT, check_same_thread=False)
+
+    def connect():
+        import pyodbc
+        return pyodbc.connect(target)
+    return connect
+
+
+def connect_with_retry(factory, retries=CONNECT_RETRIES, backoff=BACKOFF_SECONDS):
+    """Open a connection, retrying failures with exponential backoff; raise the last error."""
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        try:
+            return factory()
+        except Exception as e:
+            error = e
+            print(f"⚠️ Connection attempt {attempt + 1} of {retries + 1} failed: {e}")
+    raise error
+
+
+def is_healthy(conn):
+    """Whether a connection still answers a trivial query."""
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def create_pool(factory, size=POOL_SIZE):
+    """Return an empty ``ConnectionPool``; connections are opened on demand, at most ``size`` at once."""
+    return ConnectionPool(factory=factory, size=max(1, size), idle=queue.LifoQueue(),
+                          slots=threading.BoundedSemaphore(max(1, size)))
+
+
+def _checkout(pool):
+    """An idle connection that passes its health check, or a new one."""
+    while True:
+        try:
+            conn, returned_at = pool.idle.get_nowait()
+        except queue.Empty:
+            return connect_with_retry(pool.factory)
+        if time.monotonic() - returned_at < HEALTH_CHECK_IDLE_SECONDS or is_healthy(conn):
+            return conn
+        _close(conn)
+
+
+@contextmanager
+def pooled_connection(pool):
+    """Check a connection out of the pool for the enclosed block."""
+    pool.slots.acquire()
+    try:
+        conn = _checkout(pool)
+        reusable = True
+        try:
+            yield conn
+        except Exception:
+            # Undo the failed work; a connection that cannot even roll back is dropped
+            try:
+                conn.rollback()
+            except Exception:
+                reusable = False
+            raise
+        finally:
+            if reusable:
+                pool.idle.put((conn, time.monotonic()))
+            else:
+                _close(conn)
+    finally:
+        pool.slots.release()
+
+
+def close_pool(pool):
+    """Close the idle connections of a pool."""
+    while True:
+        try:
+            conn, _ = pool.idle.get_nowait()
+        except queue.Empty:
+            return
+        _close(conn)
+
+
+def map_pooled(pool, func, items, max_workers=None):
+    """Call ``func(conn, item)`` for every item on threads, each with a pooled connection; results in item order."""
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item):
+        with pooled_connection(pool) as conn:
+            return func(conn, item)
+
+    workers = max(1, min(max_workers or pool.size, len(items)))
+    if workers == 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, items))
+
+
+def _column(values):
+    """Typed array for one column of a chunk: float64 for numbers with NULLs, datetime64 for dates."""
+    array = np.asarray(values)
+    if array.dtype != object:
+        return array
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, (int, float, decimal.Decimal)) and not isinstance(sample, bool):
+        # NULL becomes NaN
+        return np.array(values, dtype=np.float64)
+    if isinstance(sample, (datetime.date, datetime.datetime)):
+        return np.array(values, dtype="datetime64[ns]")
+    return array
+
+
+def read_batches(conn, query, params=None, chunk_rows=CHUNK_ROWS):
+    """Yield a query's result as {column: NumPy array} chunks of up to ``chunk_rows`` rows.
+
+    Always yields at least one (possibly empty) chunk, so the column names
+    are known for empty results.
+    """
+    cursor = conn.cursor()
+    try:
+        if params is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        empty = True
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            empty = False
+            yield {name: _column(values) for name, values in zip(columns, zip(*rows))}
+        if empty:
+            yield {name: np.empty(0) for name in columns}
+    finally:
+        cursor.close()
+
+
+def read_frame(conn, query, params=None, chunk_rows=CHUNK_ROWS, convert=None):
+    """Read a query into a DataFrame through typed chunks (instead of one list of row objects).
+
+    ``convert`` (e.g. ``frame_schema.normalize_frame``) is applied to each
+    chunk's frame as it arrives, so only the converted columns accumulate.
+    """
+    frames = []
+    for chunk in read_batches(conn, query, params, chunk_rows):
+        frame = pd.DataFrame(chunk)
+        frames.append(convert(frame) if convert is not None else frame)
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
@@ -0,0 +1,144 @@
+"""Event study of returns around new and full moons.
+
+Every exact new and full moon (``phase_index.principal_phases``, the instants
+the Moon-Sun elongation crosses 0 and 180 degrees) is an event. Day 0 is the first trading day on or after the event's UTC calendar
+date, and the window runs from -N to +N trading days. For all tickers and
+events at once, the window returns are gathered from the date-aligned
+return panel (price_panel.py) through a ``sliding_window_view``, so there is
+no loop over events or tickers.
+
+Abnormal returns are the window returns minus a baseline (EVENT_BASELINES):
+
+- "mean": the ticker's mean return over the ESTIMATION_DAYS trading days
+  before the window (constant-mean model)
+- "market": the equal-weighted cross-sectional mean return of that day
+- "raw": no adjustment
+
+Cumulative abnormal returns (CAR) accumulate from day -N. Averages,
+dispersion (standard deviation) and t statistics are taken across all
+(event, ticker) pairs, per event type and day.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from lunar_phase_engine import MOON_PHASES
+from phase_index import principal_phases
+
+# Principal phases that are events
+EVENT_PHASES = {"New Moon": 0, "Full Moon": 4}
+
+EVENT_BASELINES = ("mean", "market", "raw")
+WINDOW_DAYS = 5
+ESTIMATION_DAYS = 120
+
+EventStudy = namedtuple("EventStudy", [
+    "window",      # N: days -N..+N around each event
+    "baseline",    # abnormal return baseline (EVENT_BASELINES)
+    "estimation_days",
+    "events",      # DataFrame of event, instant and day-0 trading date for the events used
+    "summary",     # DataFrame indexed by (event, day): mean_ar, mean_car, std_car, n, t_car
+    "ticker_car",  # DataFrame ticker x event: mean CAR over the whole window
+])
+
+
+def event_instants(dates):
+    """Instants (datetime64[s]) and phase codes of the new and full moons on the calendar days of ``dates``."""
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    instants, codes = principal_phases(dates[0], dates[-1] + np.timedelta64(1, "D"))
+    wanted = np.isin(codes, list(EVENT_PHASES.values()))
+    return instants[wanted], codes[wanted]
+
+
+def event_positions(dates, moons=None, window=WINDOW_DAYS):
+    """Events whose whole window falls inside ``dates``.
+
+    ``moons`` is ``(instants, codes)`` from ``event_instants`` (located when
+    not given). Returns ``(events, positions)``: a DataFrame of event name,
+    instant and day-0 date, and the day-0 row of each event in ``dates``.
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    instants, codes = moons if moons is not None else event_instants(dates)
+
+    positions = np.searchsorted(dates, instants.astype("datetime64[D]").astype("datetime64[ns]"), side="left")
+    inside = (positions - window >= 0) & (positions + window < len(dates))
+    instants, codes, positions = instants[inside], codes[inside], positions[inside]
+
+    events = pd.DataFrame({
+        "event": pd.Categorical(np.asarray(MOON_PHASES)[codes], categories=list(EVENT_PHASES)),
+        "instant": instants.astype("datetime64[ns]"),
+        "date": dates[positions],
+    })
+    return events, positions
+
+
+def _baseline(returns, positions, window, baseline, estimation_days):
+    """Expected return per (event, day, ticker), broadcastable against the window returns."""
+    if baseline == "raw":
+        return 0.0
+    if baseline == "market":
+        market = _moments(returns, axis=1)[1]
+        return sliding_window_view(market, 2 * window + 1)[positions - window][:, :, None]
+
+    # Constant mean over [start - estimation_days, start) from running sums, O(1) per event and ticker
+    valid = ~np.isnan(returns)
+    sums = np.vstack([np.zeros((1, returns.shape[1])), np.cumsum(np.where(valid, returns, 0.0), axis=0)])
+    counts = np.vstack([np.zeros((1, returns.shape[1])), np.cumsum(valid, axis=0)])
+    end = positions - window
+    start = np.maximum(end - estimation_days, 0)
+    n = counts[end] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n >= max(estimation_days // 2, 2), (sums[end] - sums[start]) / n, np.nan)
+    return mean[:, None, :]
+
+
+def abnormal_returns(returns, positions, window=WINDOW_DAYS, baseline="mean", estimation_days=ESTIMATION_DAYS):
+    """Abnormal returns of shape (events, 2 * window + 1, tickers) for a (dates, tickers) return array."""
+    if baseline not in EVENT_BASELINES:
+        raise ValueError(f"Unknown event study baseline '{baseline}', expected one of {EVENT_BASELINES}")
+    # (dates - 2N, tickers, 2N + 1) view without copying, then one gather of the event rows
+    windows = sliding_window_view(returns, 2 * window + 1, axis=0)[positions - window].transpose(0, 2, 1)
+    return windows - _baseline(returns, positions, window, baseline, estimation_days)
+
+
+def _moments(values, axis):
+    """Count, mean and sample standard deviation over ``axis``, ignoring NaN."""
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, values, 0.0).sum(axis=axis) / n
+        deviation = np.where(valid, values - np.expand_dims(mean, axis), 0.0)
+        std = np.sqrt((deviation ** 2).sum(axis=axis) / (n - 1))
+    return n, mean, std
+
+
+def summarize(abnormal, events, tickers, window):
+    """Cross-sectional averages, dispersion and t statistics per event type and day."""
+    car = np.cumsum(abnormal, axis=1)
+    days = np.arange(-window, window + 1)
+    frames, ticker_car = [], {}
+    for name in EVENT_PHASES:
+        selected = (events["event"] == name).to_numpy()
+        _, mean_ar, _ = _moments(abnormal[selected], axis=(0, 2))
+        n, mean_car, std_car = _moments(car[selected], axis=(0, 2))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t_car = mean_car / (std_car / np.sqrt(n))
+        frames.append(pd.DataFrame({"event": name, "day": days, "mean_ar": mean_ar, "mean_car": mean_car,
+                                    "std_car": std_car, "n": n, "t_car": t_car}))
+        ticker_car[name] = _moments(car[selected][:, -1, :], axis=0)[1]
+
+    summary = pd.concat(frames, ignore_index=True).set_index(["event", "day"])
+    return summary, pd.DataFrame(ticker_car, index=pd.Index(tickers, name="ticker"))
+
+
+def run_event_study(panel, field="Return", window=WINDOW_DAYS, baseline="mean",
+                    estimation_days=ESTIMATION_DAYS, moons=None):
+    """Event study on a ``price_panel.PricePanel`` field; returns an ``EventStudy``."""
+    returns = panel.values[:, :, list(panel.fields).index(field)]
+    events, positions = event_positions(panel.dates.to_numpy(), moons, window)
+    abnormal = abnormal_returns(returns, positions, window, baseline, estimation_days)
+    summary, ticker_car = summarize(abnormal, events, panel.tickers, window)
+    return EventStudy(window=window, baseline=baseline, estimation_days=estimation_days, events=events,
+                      summary=summary, ticker_car=ticker_car)
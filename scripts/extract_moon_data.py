@@ -1,11 +1,26 @@
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from astropy.time import Time
+import numpy as np
+import json
 import os
+import time
 
-# Define USNO API endpoint
-USNO_API_URL = "https://aa.usno.navy.mil/api/moon/phases/year/{year}"
+from instrumentation import span
+from lunar_phase_engine import compute_lunar_phases, phase_names
+from phase_index import DAY_ATTRIBUTION_TIME
+
+# Define USNO API endpoint (override with USNO_API_URL, e.g. for a local stand-in server)
+USNO_API_URL = os.getenv("USNO_API_URL", "https://aa.usno.navy.mil/api/moon/phases/year/{year}")
+
+# Per-year cache of raw USNO responses
+USNO_CACHE_DIR = "data/raw/usno"
+
+# Concurrency and retry settings for USNO requests
+MAX_WORKERS = 4
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0
 
 # Set date range (last 5 years)
 start_year = datetime.today().year - 5
@@ -14,57 +29,150 @@ end_year = datetime.today().year
 # Create a list to store lunar data
 lunar_data = []
 
-def fetch_from_usno(year):
-    """Fetch lunar phases from the USNO API."""
-    try:
-        print(f"📡 Fetching lunar data for {year} from USNO API...")
-        response = requests.get(USNO_API_URL.format(year=year), timeout=10)
+def fetch_from_usno(year, api_url=USNO_API_URL, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, timeout=10):
+    """Fetch raw lunar phase data for one year from the USNO API, retrying transient failures."""
+    for attempt in range(retries + 1):
+        if attempt:
+            # Exponential backoff between retries
+            time.sleep(backoff * 2 ** (attempt - 1))
+
+        try:
+            print(f"📡 Fetching lunar data for {year} from USNO API...")
+            with span("usno_request", year=year, attempt=attempt) as metrics:
+                response = requests.get(api_url.format(year=year), timeout=timeout)
+                metrics.update(http_status=response.status_code, bytes=len(response.content))
+
+            if response.status_code == 429 or response.status_code >= 500:
+                print(f"⚠️ USNO API returned status {response.status_code} for {year}, retrying...")
+                continue  # Transient failure
+
+            if response.status_code != 200 or not response.text.strip():
+                print(f"❌ USNO API returned status {response.status_code} for {year}")
+                return None  # API failed
+
+            data = response.json()
+            if "phasedata" not in data:
+                print(f"⚠️ Unexpected USNO API response for {year}")
+                return None  # Unexpected response
+
+            return data["phasedata"]
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ Network error for {year}: {e}")
+
+    return None  # Retries exhausted
+
+def usno_cache_path(year, cache_dir=USNO_CACHE_DIR):
+    """Return the cache file path for a year of USNO data."""
+    return os.path.join(cache_dir, f"usno_phases_{year}.json")
+
+def load_cached_year(year, cache_dir=USNO_CACHE_DIR):
+    """Return cached USNO phase data for a year, or None if it is not cached."""
+    path = usno_cache_path(year, cache_dir)
+    if not os.path.exists(path):
+        return None
 
-        if response.status_code != 200 or not response.text.strip():
-            print(f"❌ USNO API returned status {response.status_code} for {year}")
-            return None  # API failed
+    with open(path, "r") as f:
+        return json.load(f)
 
-        data = response.json()
-        if "phasedata" not in data:
-            print(f"⚠️ Unexpected USNO API response for {year}")
-            return None  # Unexpected response
+def save_cached_year(year, phasedata, cache_dir=USNO_CACHE_DIR):
+    """Write USNO phase data for a year to the cache atomically."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = usno_cache_path(year, cache_dir)
+    with open(path + ".tmp", "w") as f:
+        json.dump(phasedata, f)
+    os.replace(path + ".tmp", path)
 
-        return [{"Date": entry["date"], "Phase": entry["phase"]} for entry in data["phasedata"]]
+def fetch_lunar_years(years, api_url=USNO_API_URL, cache_dir=USNO_CACHE_DIR, max_workers=MAX_WORKERS):
+    """Fetch USNO phase data for several years concurrently, backed by the per-year cache.
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Network error for {year}: {e}")
-        return None  # API failure
+    Past years never change, so once cached they are not requested again. The
+    current year (and any later one) is always refreshed, falling back to its
+    cached copy if the request fails. Returns {year: phasedata} for every year
+    that could be fetched or loaded.
+    """
+    current_year = datetime.today().year
+    results = {}
+    to_fetch = []
+
+    for year in years:
+        cached = load_cached_year(year, cache_dir) if year < current_year else None
+        if cached is not None:
+            results[year] = cached
+        else:
+            to_fetch.append(year)
+
+    print(f"🗂️ {len(results)} year(s) loaded from cache, {len(to_fetch)} to fetch from USNO")
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(to_fetch))) as pool:
+            futures = {pool.submit(fetch_from_usno, year, api_url): year for year in to_fetch}
+            for future in as_completed(futures):
+                year = futures[future]
+                phasedata = future.result()
+
+                if phasedata:
+                    save_cached_year(year, phasedata, cache_dir)
+                    results[year] = phasedata
+                else:
+                    # Fall back to a stale copy of the current year if we have one
+                    cached = load_cached_year(year, cache_dir)
+                    if cached is not None:
+                        print(f"⚠️ Using cached lunar data for {year}")
+                        results[year] = cached
+
+    return {year: results[year] for year in sorted(results)}
+
+def usno_records(phasedata):
+    """Convert raw USNO phase entries to Date/Phase records."""
+    records = []
+    for entry in phasedata:
+        if "date" in entry:
+            date = entry["date"]
+        else:
+            date = f"{entry['year']:04d}-{entry['month']:02d}-{entry['day']:02d}"
+        records.append({"Date": date, "Phase": entry["phase"]})
+    return records
 
 def calculate_lunar_phase(date):
-    """Compute lunar phase using AstroPy if API fails."""
-    moon_phases = {
-        0: "New Moon", 1: "Waxing Crescent", 2: "First Quarter", 3: "Waxing Gibbous",
-        4: "Full Moon", 5: "Waning Gibbous", 6: "Last Quarter", 7: "Waning Crescent"
-    }
-    moon_phase_number = int((Time(date).mjd - Time("2000-01-06").mjd) % 29.53 // 3.69)
-    return moon_phases[moon_phase_number]
-
-def generate_local_moon_data():
-    """Generate lunar phases locally if the API fails."""
-    print("🔄 Switching to local lunar phase calculation (AstroPy)...")
-    start_date = datetime.today() - timedelta(days=5 * 365)
-    date_range = [start_date + timedelta(days=i) for i in range(5 * 365)]
-    
-    return [{"Date": date.strftime("%Y-%m-%d"), "Phase": calculate_lunar_phase(date)} for date in date_range]
-
-# Fetch data for each year, or fallback to local computation
-for year in range(start_year, end_year + 1):
-    data = fetch_from_usno(year)
-    if data:
-        lunar_data.extend(data)
-
-# If API failed for all years, use local lunar phase calculation
-if not lunar_data:
-    lunar_data = generate_local_moon_data()
-
-# Convert to DataFrame and save to CSV
-df = pd.DataFrame(lunar_data)
-df["Date"] = pd.to_datetime(df["Date"]).dt.date
-df.to_csv("data/lunar_phases.csv", index=False)
-
-print("✅ Lunar phases saved to data/lunar_phases.csv")
\ No newline at end of file
+    """Compute the lunar phase name for a single date (at DAY_ATTRIBUTION_TIME, like the phase index)."""
+    return phase_names(compute_lunar_phases([np.datetime64(date, "D") + DAY_ATTRIBUTION_TIME]).code)[0]
+
+def generate_local_moon_data(start_date=None, days=5 * 365):
+    """Generate lunar phases locally if the API fails (``days`` days from ``start_date``, default 5 years back)."""
+    print("🔄 Switching to local lunar phase calculation...")
+    if start_date is None:
+        start_date = datetime.today() - timedelta(days=days)
+    # Whole days: each date's phase is taken at DAY_ATTRIBUTION_TIME (UTC), as
+    # the phase index does, whatever the time of day of the run
+    start_date = np.datetime64(start_date, "D")
+    date_range = start_date + np.arange(days) * np.timedelta64(1, "D")
+
+    # One vectorized call for the whole range
+    phases = compute_lunar_phases(date_range + DAY_ATTRIBUTION_TIME)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(date_range).strftime("%Y-%m-%d"),
+        "Phase": phase_names(phases.code),
+    }).to_dict("records")
+
+if __name__ == "__main__":
+    # Fetch data for each year, or fallback to local computation
+    with span("fetch_usno", years=end_year - start_year + 1) as metrics:
+        for year, phasedata in fetch_lunar_years(range(start_year, end_year + 1)).items():
+            lunar_data.extend(usno_records(phasedata))
+        metrics["rows"] = len(lunar_data)
+
+    # If API failed for all years, use local lunar phase calculation
+    if not lunar_data:
+        with span("generate_local") as metrics:
+            lunar_data = generate_local_moon_data()
+            metrics["rows"] = len(lunar_data)
+
+    # Convert to DataFrame and save to CSV
+    with span("write_phases", rows=len(lunar_data)) as metrics:
+        df = pd.DataFrame(lunar_data)
+        df["Date"] = pd.to_datetime(df["Date"]).dt.date
+        df.to_csv("data/lunar_phases.csv", index=False)
+        metrics["bytes"] = os.path.getsize("data/lunar_phases.csv")
+
+    print("✅ Lunar phases saved to data/lunar_phases.csv")
\ No newline at end of file
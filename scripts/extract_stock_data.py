@@ -1,54 +1,216 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 from datetime import datetime
+from functools import partial
+import argparse
+import glob
 import os
 
-# Define ETFs for the major indices
-etfs = {
-    "SPY": "S&P 500",
-    "QQQ": "NASDAQ",
-    "DIA": "Dow Jones",
-    "IWM": "Russell 2000"  
-}
+from instrumentation import span
+from sharding import map_items
+from ticker_registry import load_registry
 
 # Define date range (5 years back)
 START_DATE = (datetime.today().replace(year=datetime.today().year - 5)).strftime('%Y-%m-%d')
 END_DATE = datetime.today().strftime('%Y-%m-%d')
 
-# Ensure output directory exists
-os.makedirs("data", exist_ok=True)
+LATEST_FILES_PATH = "latest_files.txt"
 
-# Store latest file paths
-latest_files = []
+# Date ranges already requested per ETF (start,end rows, end exclusive); missing
+# business days inside them are exchange closures and are not requested again
+REQUESTED_RANGES_PATH = "data/{}_requested_ranges.csv"
 
-for etf, index_name in etfs.items():
-    try:
-        print(f"📥 Fetching data for {index_name} ({etf})...")
+def download_prices(etf, start, end):
+    """Download daily bars for one ticker as a flat DataFrame with a Date column."""
+    with span("download", ticker=etf, start=start, end=end) as metrics:
+        data = yf.download(etf, start=start, end=end, auto_adjust=False)
+        metrics["rows"] = len(data)
+
+    # Newer yfinance versions return (field, ticker) column pairs
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+
+    # Reset index to make "Date" a column
+    data.reset_index(inplace=True)
+
+    # Remove any empty rows
+    return data[data["Date"].notna()]
+
+def find_stored_file(etf):
+    """Return the current data file for an ETF, or None if there is none yet."""
+    if os.path.exists(LATEST_FILES_PATH):
+        with open(LATEST_FILES_PATH, "r") as f:
+            for line in f:
+                path = line.strip()
+                if os.path.basename(path).split("_")[0] == etf and os.path.exists(path):
+                    return path
+
+    # Fall back to the most recent dated file on disk
+    candidates = sorted(glob.glob(f"data/{etf}_stock_*.csv"))
+    return candidates[-1] if candidates else None
+
+def read_requested_ranges(etf):
+    """Return the [start, end) date ranges already requested for an ETF."""
+    path = REQUESTED_RANGES_PATH.format(etf)
+    if not os.path.exists(path):
+        return []
+    ranges = pd.read_csv(path, dtype=str)
+    return list(zip(ranges["start"], ranges["end"]))
+
+def record_requested_ranges(etf, ranges, reset=False):
+    """Add [start, end) ranges to an ETF's requested ranges, merging overlaps."""
+    merged = []
+    for start, end in sorted(ranges if reset else read_requested_ranges(etf) + list(ranges)):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    path = REQUESTED_RANGES_PATH.format(etf)
+    pd.DataFrame(merged, columns=["start", "end"]).to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+def missing_ranges(stored_dates, end_date, requested=()):
+    """Return [start, end) date ranges that are missing from the stored dates.
+
+    Business days between stored dates that are neither stored nor inside an
+    already requested range are fetched as one range spanning them all (rows
+    already stored are dropped after the download), followed by the tail from
+    the last stored date up to ``end_date``.
+    """
+    dates = np.unique(np.asarray(stored_dates, dtype="datetime64[D]"))
+    ranges = []
+
+    # Gaps in the middle of the stored history, of any length
+    days = np.arange(dates[0], dates[-1] + 1)
+    missing = np.setdiff1d(days[np.is_busday(days)], dates)
+    for start, end in requested:
+        missing = missing[(missing < np.datetime64(start, "D")) | (missing >= np.datetime64(end, "D"))]
+    if len(missing):
+        ranges.append((str(missing[0]), str(missing[-1] + 1)))
+
+    # Tail after the watermark (last stored date)
+    tail_start = dates[-1] + 1
+    if tail_start < np.datetime64(end_date, "D"):
+        ranges.append((str(tail_start), end_date))
+
+    return ranges
+
+def extract_full(etf, index_name, store=False):
+    """Download the full history for an ETF into a new dated CSV file."""
+    data = download_prices(etf, START_DATE, END_DATE)
 
-        # Fetch data from Yahoo Finance
-        data = yf.download(etf, start=START_DATE, end=END_DATE, auto_adjust=False)
+    if not data.empty:
+        last_date = pd.to_datetime(data["Date"]).max() + pd.Timedelta(days=1)
+        record_requested_ranges(etf, [(START_DATE, last_date.strftime("%Y-%m-%d"))], reset=True)
 
-        # Reset index to make "Date" a column
-        data.reset_index(inplace=True)
+    if store:
+        # Imported lazily: the columnar store pulls in pyarrow, which only --store needs
+        from columnar_store import write_prices
+        write_prices(data, etf)
 
-        # Remove any empty rows
-        data = data[data["Date"].notna()]
+    # Define a separate CSV file for each ETF
+    output_file = f"data/{etf}_stock_{END_DATE}.csv"
+    data.to_csv(output_file, index=False)
 
-        # Define a separate CSV file for each ETF
-        output_file = f"data/{etf}_stock_{END_DATE}.csv"
-        data.to_csv(output_file, index=False)
+    print(f"✅ Saved {index_name} data to: {output_file}")
+    return output_file
 
-        # Store the latest file path for tracking
-        latest_files.append(output_file)
+def extract_incremental(etf, index_name, store=False):
+    """Fetch only the dates missing from the stored file and merge them in."""
+    stored_file = find_stored_file(etf)
+    if stored_file is None:
+        print(f"⚠️ No stored data for {etf}, running a full extraction")
+        return extract_full(etf, index_name, store)
 
-        print(f"✅ Saved {index_name} data to: {output_file}")
+    # Read only the header and the Date column to find the watermark and gaps
+    columns = pd.read_csv(stored_file, nrows=0).columns
+    stored_dates = pd.to_datetime(pd.read_csv(stored_file, usecols=["Date"])["Date"])
+    ranges = missing_ranges(stored_dates.values, END_DATE, read_requested_ranges(etf))
+
+    new_rows = [download_prices(etf, start, end) for start, end in ranges]
+    new_rows = [rows for rows in new_rows if not rows.empty]
+    new_data = pd.concat(new_rows, ignore_index=True) if new_rows else pd.DataFrame(columns=columns)
+    new_data["Date"] = pd.to_datetime(new_data["Date"]).dt.tz_localize(None)
+    new_data = new_data[~new_data["Date"].isin(stored_dates)]
+    new_data["Date"] = new_data["Date"].dt.strftime("%Y-%m-%d")
+    new_data = new_data[columns]
+
+    # Days up to the newest stored row are final, so the requests are recorded up to it
+    last_date = stored_dates.max() if new_data.empty else max(stored_dates.max(), pd.to_datetime(new_data["Date"]).max())
+    final_end = (last_date + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+    record_requested_ranges(etf, [(start, min(end, final_end)) for start, end in ranges if start < final_end])
+
+    if new_data.empty:
+        print(f"✅ {index_name} data already up to date")
+    elif (pd.to_datetime(new_data["Date"]) > stored_dates.max()).all():
+        # New rows all come after the watermark: append without rewriting
+        new_data.to_csv(stored_file, mode="a", header=False, index=False)
+    else:
+        # Gap rows belong in the middle: merge, keep the file sorted by date
+        merged = pd.concat([pd.read_csv(stored_file), new_data], ignore_index=True)
+        merged = merged.sort_values("Date", key=pd.to_datetime)
+        merged.to_csv(stored_file + ".tmp", index=False)
+        os.replace(stored_file + ".tmp", stored_file)
+
+    if store and not new_data.empty:
+        # Only the year partitions touched by the new rows are rewritten
+        from columnar_store import write_prices
+        write_prices(new_data, etf)
+
+    # Rename the file to the new extraction date (no data is rewritten)
+    output_file = f"data/{etf}_stock_{END_DATE}.csv"
+    if output_file != stored_file:
+        os.replace(stored_file, output_file)
+
+    if not new_data.empty:
+        print(f"✅ Added {len(new_data)} new {index_name} rows from {len(ranges)} missing range(s) to: {output_file}")
+    return output_file
+
+def extract_ticker(item, incremental=False, store=False):
+    """Extract one (ticker, name) pair; return the output file or None on error."""
+    etf, index_name = item
+    try:
+        print(f"📥 Fetching data for {index_name} ({etf})...")
+
+        with span("extract_ticker", ticker=etf, incremental=incremental) as metrics:
+            output_file = (extract_incremental if incremental else extract_full)(etf, index_name, store)
+            metrics["bytes"] = os.path.getsize(output_file)
+        return output_file
 
     except Exception as e:
         print(f"❌ Error fetching data for {index_name} ({etf}): {e}")
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract daily ETF prices from Yahoo Finance.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch dates missing from the stored files instead of the full history")
+    parser.add_argument("--store", action="store_true",
+                        help="Also write the extracted rows to the partitioned columnar store")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes the ticker registry is sharded across (default: SHARD_MAX_WORKERS or CPU count)")
+    args = parser.parse_args()
+
+    # Ensure output directory exists
+    os.makedirs("data", exist_ok=True)
+
+    # Tickers from the registry (tickers.csv), extracted in shards across worker processes
+    etfs = load_registry()
+    with span("extract_stock", tickers=len(etfs)):
+        output_files = map_items(partial(extract_ticker, incremental=args.incremental, store=args.store),
+                                 etfs.items(), max_workers=args.workers)
+
+    # Store latest file paths, in registry order
+    latest_files = [output_file for output_file in output_files if output_file]
+
+    # Save all latest file paths in a reference file
+    with open(LATEST_FILES_PATH, "w") as f:
+        for file in latest_files:
+            f.write(file + "\n")
 
-# Save all latest file paths in a reference file
-with open("latest_files.txt", "w") as f:
-    for file in latest_files:
-        f.write(file + "\n")
+    print("✅ All ETF data exported successfully!")
 
-print("✅ All ETF data exported successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
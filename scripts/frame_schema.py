@@ -0,0 +1,110 @@
+"""Compact typed schema for price and lunar phase frames.
+
+Shared by the upload scripts and the analysis backends so every loader hands
+out the same dtypes:
+
+- Date: datetime64[ns] (not object ``datetime.date``)
+- Open/High/Low/Close/Adj Close: float64, or float32 with PRICE_DTYPE=float32
+- Volume: int64, or float64 with NaN where volumes are missing (missing
+  stays missing, never a zero-volume day; ``sql_rows`` sends it as NULL)
+- Phase: an 8-level ordered categorical in MOON_PHASES order, so each row
+  stores an int8 code and ``phase.cat.codes`` is the numeric phase (0 = New
+  Moon ... 7 = Waning Crescent) without any per-row lookup
+
+``frame_memory`` / ``memory_report`` report the resident size of frames.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from lunar_phase_engine import MOON_PHASES
+
+PHASE_DTYPE = pd.CategoricalDtype(categories=list(MOON_PHASES), ordered=True)
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close", "Adj_Close"]
+VOLUME_COLUMN = "Volume"
+
+# float32 halves price memory; returns computed from float32 closes carry ~7 significant digits
+PRICE_DTYPES = ("float64", "float32")
+
+
+def price_dtype(dtype=None):
+    """The configured price dtype (``dtype`` or PRICE_DTYPE, default float64)."""
+    dtype = dtype or os.getenv("PRICE_DTYPE", "float64")
+    if dtype not in PRICE_DTYPES:
+        raise ValueError(f"Unsupported price dtype '{dtype}', expected one of {PRICE_DTYPES}")
+    return np.dtype(dtype)
+
+
+def to_phase(values):
+    """Phase names (or an existing categorical) as a PHASE_DTYPE categorical; unknown names become NaN."""
+    if isinstance(values, pd.Series):
+        return values.astype(PHASE_DTYPE)
+    return pd.Categorical(values, dtype=PHASE_DTYPE)
+
+
+def normalize_frame(df, dtype=None):
+    """Cast the known columns of a price and/or phase frame to the compact schema (in place)."""
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    prices = [column for column in PRICE_COLUMNS if column in df.columns]
+    if prices:
+        df[prices] = df[prices].astype(price_dtype(dtype))
+    if VOLUME_COLUMN in df.columns and df[VOLUME_COLUMN].dtype != np.int64:
+        volume = pd.to_numeric(df[VOLUME_COLUMN], errors="coerce")
+        df[VOLUME_COLUMN] = volume.astype(np.float64) if volume.isna().any() else volume.astype(np.int64)
+    if "Phase" in df.columns and df["Phase"].dtype != PHASE_DTYPE:
+        df["Phase"] = to_phase(df["Phase"])
+    return df
+
+
+def read_prices_csv(path, columns=None, dtype=None):
+    """Read a daily price CSV straight into the compact schema."""
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in (columns or header) if column in header]
+    dtypes = {column: price_dtype(dtype) for column in PRICE_COLUMNS if column in usecols}
+    if VOLUME_COLUMN in usecols:
+        dtypes[VOLUME_COLUMN] = np.float64  # cast after NaN handling in normalize_frame
+    df = pd.read_csv(path, usecols=usecols, dtype=dtypes, parse_dates=["Date"] if "Date" in usecols else False)
+    return normalize_frame(df, dtype)
+
+
+def read_phases_csv(path, columns=("Date", "Phase")):
+    """Read the lunar phase CSV with a datetime Date and categorical Phase."""
+    df = pd.read_csv(path, usecols=list(columns), dtype={"Phase": PHASE_DTYPE} if "Phase" in columns else None,
+                     parse_dates=["Date"] if "Date" in columns else False)
+    return normalize_frame(df)
+
+
+def sql_rows(df, columns):
+    """Rows of ``columns`` as tuples of SQL parameters; missing values (NaN/NaT) become None (NULL)."""
+    values = []
+    for column in columns:
+        # Volumes go to integer columns, also when stored as float64 beside NaN
+        convert = int if column == VOLUME_COLUMN else (lambda value: value)
+        values.append([None if pd.isna(value) else convert(value) for value in df[column].tolist()])
+    return list(zip(*values))
+
+
+def frame_memory(df):
+    """Resident size of a frame in bytes, including the contents of object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(frames):
+    """Rows and resident bytes per frame for {name: DataFrame}, plus a total row."""
+    report = pd.DataFrame(
+        {"rows": [len(df) for df in frames.values()], "bytes": [frame_memory(df) for df in frames.values()]},
+        index=pd.Index(list(frames), name="frame"))
+    report.loc["total"] = report.sum()
+    return report
+
+
+def format_bytes(n_bytes):
+    """Human-readable size (KiB/MiB/GiB)."""
+    size = float(n_bytes)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:,.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
@@ -0,0 +1,327 @@
+"""Structured per-stage metrics shared by every script.
+
+Work is recorded as spans: ``with span("upsert", table=table, rows=len(rows)):``
+measures wall time, CPU time (``time.process_time``, so all threads of the
+process) and the process peak RSS at the end of the span. Rows, bytes and any
+other fields are passed as keyword arguments or set on the yielded dict while
+the span runs. Spans nest per thread (each record names its parent), and a
+span that raises is recorded with ``status: "error"`` before the exception
+propagates.
+
+Every finished span is appended as one JSON line to
+``METRICS_DIR/<run id>.jsonl``. Scripts started by pipeline.py share the
+pipeline's run id (METRICS_RUN_ID), and worker processes inherit it, so one
+file holds the whole run. When the main process exits, its spans (including
+those of its worker processes) are summed per stage into a Prometheus
+textfile ``METRICS_DIR/<script>.prom`` for the node_exporter textfile
+collector.
+
+Profiling is opt-in (METRICS_PROFILE). It applies to the spans named in
+METRICS_PROFILE_SPANS, or to every top-level span when that is empty:
+
+- "cprofile": a cProfile dump per span (``.prof``, for pstats/snakeviz)
+- "sample": a low-overhead sampling profile of the span's thread every
+  METRICS_SAMPLE_INTERVAL seconds, as folded stacks (``.folded``, for
+  flamegraph.pl/speedscope)
+
+With METRICS_TRACEMALLOC_TOP > 0 the same spans also write their top
+allocation sites (``.tracemalloc.txt``). Profiles go to
+``METRICS_DIR/profiles/<run id>/``.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_DIR = os.getenv("METRICS_DIR", "data/metrics")
+
+# Shared by child processes and scripts started by the pipeline (which sets it to its run id)
+RUN_ID = os.environ.setdefault("METRICS_RUN_ID", f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+
+PROFILE_MODES = ("cprofile", "sample")
+PROFILE_MODE = os.getenv("METRICS_PROFILE", "").lower()
+PROFILE_SPANS = [name.strip() for name in os.getenv("METRICS_PROFILE_SPANS", "").split(",") if name.strip()]
+SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "0.005"))
+TRACEMALLOC_TOP = int(os.getenv("METRICS_TRACEMALLOC_TOP", "0"))
+
+PROMETHEUS_PREFIX = "lunar"
+
+# Summed per stage in the Prometheus textfile: (JSON field, metric name, help)
+PROMETHEUS_SUMS = [
+    ("wall_s", "stage_seconds", "Wall time of the stage's spans in the last run"),
+    ("cpu_s", "stage_cpu_seconds", "Process CPU time of the stage's spans in the last run"),
+    ("rows", "stage_rows", "Rows processed by the stage in the last run"),
+    ("bytes", "stage_bytes", "Bytes processed by the stage in the last run"),
+]
+
+_lock = threading.Lock()
+_local = threading.local()
+_profiling = threading.Lock()
+_exit_registered = False
+
+
+def script_name():
+    """The running script's name without extension (``python -m`` runs use the module)."""
+    return os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+
+
+def set_run_id(run_id):
+    """Record the following spans, and those of child processes started afterwards, under ``run_id``."""
+    global RUN_ID
+    RUN_ID = os.environ["METRICS_RUN_ID"] = run_id
+
+
+def metrics_path(run_id=None):
+    """JSON lines file of a run."""
+    return os.path.join(METRICS_DIR, f"{run_id or RUN_ID}.jsonl")
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _write_record(record):
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        # One write per line in append mode, so lines from several processes do not interleave
+        with open(metrics_path(), "a") as f:
+            f.write(line)
+
+
+def _register_exit():
+    global _exit_registered
+    if not _exit_registered and multiprocessing.parent_process() is None:
+        atexit.register(write_prometheus)
+    _exit_registered = True
+
+
+def _profile_path(name, suffix):
+    directory = os.path.join(METRICS_DIR, "profiles", RUN_ID)
+    os.makedirs(directory, exist_ok=True)
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return os.path.join(directory, f"{script_name()}.{safe}.{os.getpid()}.{suffix}")
+
+
+def _sample_stacks(thread_id, stop, counts, interval):
+    """Count the folded call stacks of one thread until ``stop`` is set."""
+    while not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+            frame = frame.f_back
+        if stack:
+            counts[";".join(reversed(stack))] += 1
+
+
+@contextmanager
+def _profiled(name):
+    """Profile the enclosed block according to METRICS_PROFILE and METRICS_TRACEMALLOC_TOP."""
+    # One profiler at a time (cProfile cannot nest); concurrent or nested spans run unprofiled
+    if not _profiling.acquire(blocking=False):
+        yield
+        return
+    try:
+        profiler = sampler = None
+        if PROFILE_MODE == "cprofile":
+            import cProfile
+
+            profiler = cProfile.Profile()
+        elif PROFILE_MODE == "sample":
+            counts, stop = Counter(), threading.Event()
+            sampler = threading.Thread(target=_sample_stacks, daemon=True,
+                                       args=(threading.get_ident(), stop, counts, SAMPLE_INTERVAL))
+        if TRACEMALLOC_TOP > 0:
+            import tracemalloc
+
+            tracemalloc.start(25)
+
+        if profiler is not None:
+            profiler.enable()
+        if sampler is not None:
+            sampler.start()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(_profile_path(name, "prof"))
+            if sampler is not None:
+                stop.set()
+                sampler.join()
+                with open(_profile_path(name, "folded"), "w") as f:
+                    f.writelines(f"{stack} {count}\n" for stack, count in counts.most_common())
+            if TRACEMALLOC_TOP > 0:
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(_profile_path(name, "tracemalloc.txt"), "w") as f:
+                    f.write(f"# {name}: traced peak {peak:,} bytes, {current:,} bytes still allocated\n")
+                    for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                        f.write(f"{stat}\n")
+    finally:
+        _profiling.release()
+
+
+def _should_profile(name, depth):
+    if PROFILE_MODE not in PROFILE_MODES and TRACEMALLOC_TOP <= 0:
+        return False
+    return name in PROFILE_SPANS if PROFILE_SPANS else depth == 0
+
+
+@contextmanager
+def span(name, **fields):
+    """Record the enclosed block as a span; yields the dict of fields (rows, bytes, ...) to update."""
+    if not METRICS_ENABLED:
+        yield fields
+        return
+    _register_exit()
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    status, error = "ok", None
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        if _should_profile(name, len(stack) - 1):
+            with _profiled(name):
+                yield fields
+        else:
+            yield fields
+    except BaseException as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+        stack.pop()
+        _write_record({
+            "run_id": RUN_ID, "script": script_name(), "pid": os.getpid(), "span": name, "parent": parent,
+            "depth": len(stack), "start": started_at, "wall_s": round(wall, 6), "cpu_s": round(cpu, 6),
+            "max_rss_bytes": peak_rss_bytes(), "status": status, "error": error, **fields,
+        })
+
+
+def read_spans(run_id=None, script=None):
+    """Span records of a run (default: this one), optionally of one script only."""
+    path = metrics_path(run_id)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if script is None or record["script"] == script]
+
+
+def _number(value):
+    return f"{value:.6f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(records):
+    """Prometheus text exposition of span records, summed per (script, stage)."""
+    stages = {}
+    for record in records:
+        key = (record["script"], record["span"])
+        totals = stages.setdefault(key, {"spans": 0, "errors": 0, "max_rss_bytes": 0})
+        totals["spans"] += 1
+        totals["errors"] += record["status"] == "error"
+        totals["max_rss_bytes"] = max(totals["max_rss_bytes"], record.get("max_rss_bytes") or 0)
+        for field, _, _ in PROMETHEUS_SUMS:
+            value = record.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                totals[field] = totals.get(field, 0) + value
+
+    metrics = PROMETHEUS_SUMS + [
+        ("spans", "stage_spans", "Spans (calls or batches) of the stage in the last run"),
+        ("errors", "stage_errors", "Spans of the stage that raised in the last run"),
+        ("max_rss_bytes", "stage_max_rss_bytes", "Highest process peak RSS seen at the end of a stage span"),
+    ]
+    lines = []
+    for field, metric, help_text in metrics:
+        samples = [(key, totals[field]) for key, totals in stages.items() if field in totals]
+        if not samples:
+            continue
+        lines += [f"# HELP {PROMETHEUS_PREFIX}_{metric} {help_text}", f"# TYPE {PROMETHEUS_PREFIX}_{metric} gauge"]
+        lines += [f'{PROMETHEUS_PREFIX}_{metric}{{script="{_label(script)}",stage="{_label(stage)}"}} {_number(value)}'
+                  for (script, stage), value in samples]
+    lines += [f"# HELP {PROMETHEUS_PREFIX}_last_run_timestamp_seconds Time the metrics were written",
+              f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge",
+              f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {time.time():.0f}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Write this script's spans of the current run as a Prometheus textfile, atomically."""
+    records = read_spans(script=script_name())
+    if not records:
+        return None
+    path = path or os.path.join(METRICS_DIR, f"{script_name()}.prom")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w") as f:
+            f.write(prometheus_text(records))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def main():
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description="Summarize the spans of a run.")
+    parser.add_argument("run_id", nargs="?", help="Run id (default: the latest file in METRICS_DIR)")
+    args = parser.parse_args()
+
+    run_id = args.run_id
+    if run_id is None:
+        paths = glob.glob(os.path.join(METRICS_DIR, "*.jsonl"))
+        if not paths:
+            parser.error(f"no runs in {METRICS_DIR}")
+        run_id = os.path.basename(max(paths, key=os.path.getmtime))[:-len(".jsonl")]
+
+    print(f"📊 Run {run_id} ({metrics_path(run_id)}):")
+    totals = {}
+    for record in read_spans(run_id):
+        entry = totals.setdefault((record["script"], record["span"]), [0, 0.0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += record["wall_s"]
+        entry[2] += record["cpu_s"]
+        entry[3] += record.get("rows") or 0
+        entry[4] = max(entry[4], record.get("max_rss_bytes") or 0)
+    for (script, stage), (spans, wall, cpu, rows, rss) in totals.items():
+        print(f"⏱️ {script + ':' + stage:<48} {spans:6d} span(s) {wall:9.2f} s wall {cpu:9.2f} s CPU "
+              f"{rows:>12,} rows  peak RSS {rss / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Intraday (minute bar) ingestion with timestamp-precise lunar phase attribution.
+
+The daily analysis assigns each trading day the phase of its date, but phase
+changes happen at specific instants, often in the middle of a session. This
+mode works on intraday bars instead:
+
+- ``ingest`` downloads minute bars from Yahoo Finance in windows of
+  DOWNLOAD_WINDOW_DAYS (the most yfinance serves per 1m request) and stores
+  one CSV per window under ``data/intraday/<TICKER>/``. Windows sit on fixed
+  Monday-aligned calendar boundaries, so every run maps a day to the same
+  file whatever its ``--start``; a window written after it closed is
+  skipped on the next run.
+- ``stats`` streams the stored bars in chunks of INTRADAY_CHUNK_ROWS rows,
+  dropping bars at or before the last timestamp already read (overlapping
+  files from older runs are counted once). Each bar gets the phase code at its own UTC timestamp from the phase
+  interval index (phase_index.py, one binary search per bar), and a
+  bar-to-bar return within its session. Only
+  per-(ticker, phase) count / sum / sum of squares are kept between chunks
+  (phase_stats.py), so memory is bounded by the chunk size and not by the
+  history length. ``--annotate`` also writes the attributed bars back out
+  chunk by chunk, with the phase angle from lunar_phase_engine.
+
+Usage:
+    python scripts/intraday.py ingest [--start 2025-02-10] [--end 2025-03-11] [--interval 1m]
+    python scripts/intraday.py stats [--chunk-rows 200000] [--annotate]
+"""
+from datetime import datetime, timedelta
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from frame_schema import PHASE_DTYPE
+from instrumentation import span
+from lunar_phase_engine import MOON_PHASES, compute_lunar_phases
+from phase_index import get_phase_index, phase_at
+from phase_stats import finish_stats, sufficient_stats
+from ticker_registry import load_tickers
+
+load_dotenv()
+
+INTRADAY_DIR = os.getenv("INTRADAY_DATA_DIR", "data/intraday")
+INTERVAL = os.getenv("INTRADAY_INTERVAL", "1m")
+
+# Rows per streamed chunk (bounds memory of the stats pass)
+CHUNK_ROWS = int(os.getenv("INTRADAY_CHUNK_ROWS", "200000"))
+
+# yfinance serves at most 7 days of 1m bars per request and only the last 30 days
+DOWNLOAD_WINDOW_DAYS = 7
+LOOKBACK_DAYS = 29
+
+# Windows are counted from this Monday, so their boundaries do not depend on --start
+WINDOW_EPOCH = datetime(1970, 1, 5)
+
+# Sessions are split on the exchange calendar date
+MARKET_TZ = "America/New_York"
+
+BAR_COLUMNS = ["Datetime", "Open", "High", "Low", "Close", "Volume"]
+ANNOTATED_COLUMNS = BAR_COLUMNS + ["PhaseCode", "Phase", "PhaseAngle", "Return"]
+
+
+def download_window(ticker, start, end, interval=INTERVAL):
+    """Download one window of intraday bars as a flat DataFrame with a Datetime column."""
+    import yfinance as yf
+
+    data = yf.download(ticker, start=start, end=end, interval=interval, auto_adjust=False, progress=False)
+
+    # Newer yfinance versions return (field, ticker) column pairs
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+
+    data = data.reset_index().rename(columns={"index": "Datetime", "Date": "Datetime"})
+    return data[data["Datetime"].notna()][BAR_COLUMNS]
+
+
+def download_windows(start, end, window_days=DOWNLOAD_WINDOW_DAYS):
+    """Split [start, end) on fixed window boundaries.
+
+    Returns ``(window_start, window_end, fetch_start, fetch_end)`` date
+    strings: the calendar window (counted from WINDOW_EPOCH) names the stored
+    file, and the fetch range is that window clipped to [start, end).
+    """
+    windows = []
+    start_date = datetime.strptime(start, "%Y-%m-%d")
+    end_date = datetime.strptime(end, "%Y-%m-%d")
+    current = WINDOW_EPOCH + timedelta(days=(start_date - WINDOW_EPOCH).days // window_days * window_days)
+    while current < end_date:
+        window_end = current + timedelta(days=window_days)
+        windows.append(tuple(day.strftime("%Y-%m-%d") for day in
+                             (current, window_end, max(current, start_date), min(window_end, end_date))))
+        current = window_end
+    return windows
+
+
+def _write_atomic(df, path):
+    """Write a CSV to a temporary file and rename it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_csv(temp_path, index=False)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def ingest_ticker(ticker, start, end, interval=INTERVAL, directory=INTRADAY_DIR):
+    """Download missing windows of intraday bars for one ticker; return the number of new bars."""
+    new_bars = 0
+    for window_start, window_end, fetch_start, fetch_end in download_windows(start, end):
+        path = os.path.join(directory, ticker, f"{window_start}_{interval}.csv")
+        # Closed windows never change once written after they closed; open ones are refreshed
+        if os.path.exists(path):
+            written = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+            if written >= window_end:
+                continue
+        try:
+            with span("download_window", ticker=ticker, start=fetch_start, end=fetch_end) as metrics:
+                bars = download_window(ticker, fetch_start, fetch_end, interval)
+                metrics["rows"] = len(bars)
+        except Exception as e:
+            print(f"❌ {ticker} {fetch_start}..{fetch_end}: {e}")
+            continue
+        if bars.empty:
+            continue
+        _write_atomic(bars, path)
+        new_bars += len(bars)
+    print(f"✅ {ticker}: {new_bars} intraday bars stored")
+    return new_bars
+
+
+def stored_files(ticker, directory=INTRADAY_DIR, interval=INTERVAL):
+    """Stored window files of one bar interval for a ticker, in time order."""
+    return sorted(glob.glob(os.path.join(directory, ticker, f"*_{interval}.csv")))
+
+
+def iter_bar_chunks(ticker, directory=INTRADAY_DIR, chunk_rows=CHUNK_ROWS, interval=INTERVAL):
+    """Yield a ticker's stored bars as DataFrames of at most ``chunk_rows`` rows, in time order.
+
+    Bars at or before the latest timestamp already yielded are dropped, so
+    files that overlap (written by runs with shifted windows) count each bar
+    once and keep the stream in time order for the session-return carry.
+    """
+    latest = np.iinfo(np.int64).min
+    for path in stored_files(ticker, directory, interval):
+        for chunk in pd.read_csv(path, usecols=BAR_COLUMNS, chunksize=chunk_rows):
+            stamps = pd.to_datetime(chunk["Datetime"], utc=True).dt.tz_convert(None)
+            stamps = stamps.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            previous = np.maximum.accumulate(np.concatenate(([latest], stamps[:-1])))
+            chunk = chunk[stamps > previous]
+            if chunk.empty:
+                continue
+            latest = max(latest, int(stamps.max()))
+            yield chunk
+
+
+def attribute_phases(timestamps, index=None, angles=False):
+    """Phase code at each bar's exact UTC timestamp, plus the phase angle (degrees) with ``angles``.
+
+    Returns ``(codes, angles or None)``. Codes come from the phase interval
+    index; the angle needs the full position model and is only computed when
+    asked for.
+    """
+    utc = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    index = index if index is not None else get_phase_index(utc)
+    return phase_at(index, utc), compute_lunar_phases(utc).angle if angles else None
+
+
+def annotate_chunk(chunk, carry=None, index=None, angles=True):
+    """Attribute phases and session returns to one chunk of bars.
+
+    ``carry`` is the (session, close) of the last bar of the previous chunk,
+    so the first bar of a chunk still gets its return when it continues a
+    session. Returns ``(annotated chunk, carry for the next chunk)``. The
+    return (%) of the first bar of each session is NaN, so overnight gaps
+    are not counted. Without ``angles`` the PhaseAngle column is left out.
+    """
+    timestamps = pd.to_datetime(chunk["Datetime"], utc=True)
+    session = timestamps.dt.tz_convert(MARKET_TZ).dt.tz_localize(None).dt.normalize().to_numpy()
+    close = chunk["Close"].to_numpy(dtype=np.float64)
+
+    previous_close = np.empty_like(close)
+    previous_close[1:] = close[:-1]
+    previous_session = np.empty_like(session)
+    previous_session[1:] = session[:-1]
+    if carry is not None:
+        previous_session[0], previous_close[0] = carry
+    else:
+        previous_session[0], previous_close[0] = np.datetime64("NaT"), np.nan
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.where(session == previous_session, (close / previous_close - 1) * 100, np.nan)
+
+    codes, phase_angles = attribute_phases(timestamps, index, angles)
+    annotated = chunk.assign(PhaseCode=codes, Phase=pd.Categorical.from_codes(codes, dtype=PHASE_DTYPE),
+                             Return=returns)
+    if angles:
+        annotated["PhaseAngle"] = phase_angles
+    return annotated, (session[-1], close[-1])
+
+
+def stream_phase_stats(tickers, directory=INTRADAY_DIR, chunk_rows=CHUNK_ROWS, annotate_dir=None,
+                       interval=INTERVAL):
+    """Per-phase statistics and ANOVA of intraday bar returns, streamed chunk by chunk.
+
+    Returns ``(PhaseStats, bars)`` where ``bars`` maps ticker to the number of
+    distinct bars read. With ``annotate_dir``, the attributed bars are appended to
+    ``<annotate_dir>/<TICKER>_annotated.csv`` as each chunk is processed.
+    """
+    shape = (len(tickers), len(MOON_PHASES))
+    count, total, total_sq = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    index = get_phase_index()
+    bars = {}
+    for i, ticker in enumerate(tickers):
+        carry = None
+        bars[ticker] = 0
+        annotated_path = os.path.join(annotate_dir, f"{ticker}_annotated.csv") if annotate_dir else None
+        for chunk in iter_bar_chunks(ticker, directory, chunk_rows, interval):
+            with span("stream_chunk", ticker=ticker, rows=len(chunk)):
+                annotated, carry = annotate_chunk(chunk, carry, index, angles=annotated_path is not None)
+                chunk_count, chunk_total, chunk_total_sq = sufficient_stats(
+                    annotated["Return"].to_numpy(), annotated["PhaseCode"].to_numpy(),
+                    np.zeros(len(annotated), dtype=np.int64), 1)
+                count[i] += chunk_count[0]
+                total[i] += chunk_total[0]
+                total_sq[i] += chunk_total_sq[0]
+                if annotated_path:
+                    os.makedirs(annotate_dir, exist_ok=True)
+                    annotated[ANNOTATED_COLUMNS].to_csv(annotated_path, mode="w" if bars[ticker] == 0 else "a",
+                                                        header=bars[ticker] == 0, index=False)
+            bars[ticker] += len(chunk)
+    return finish_stats(tickers, count, total, total_sq), bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intraday bars with timestamp-precise lunar phases.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="Download intraday bars for the registry tickers")
+    ingest.add_argument("--start", default=(datetime.today() - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d"))
+    ingest.add_argument("--end", default=datetime.today().strftime("%Y-%m-%d"))
+    ingest.add_argument("--interval", default=INTERVAL, help="yfinance bar interval (1m, 2m, 5m, ...)")
+    stats = subparsers.add_parser("stats", help="Stream per-phase statistics over the stored bars")
+    stats.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Bars per streamed chunk")
+    stats.add_argument("--annotate", action="store_true",
+                       help=f"Also write the attributed bars to {INTRADAY_DIR}/annotated/")
+    args = parser.parse_args()
+
+    tickers = load_tickers()
+    if args.command == "ingest":
+        for ticker in tickers:
+            ingest_ticker(ticker, args.start, args.end, args.interval)
+        return
+
+    annotate_dir = os.path.join(INTRADAY_DIR, "annotated") if args.annotate else None
+    tickers = [ticker for ticker in tickers if stored_files(ticker)]
+    if not tickers:
+        print(f"❌ No intraday bars under {INTRADAY_DIR}; run the ingest subcommand first")
+        return
+    phase_stats, bars = stream_phase_stats(tickers, chunk_rows=args.chunk_rows, annotate_dir=annotate_dir)
+    for ticker in tickers:
+        anova = phase_stats.anova.loc[ticker]
+        print(f"\n📊 {ticker}: {bars[ticker]} bars, ANOVA F = {anova['F']:.4f}, p = {anova['p_value']:.4f}")
+        print(phase_stats.groups.loc[ticker, ["count", "mean", "std"]].reset_index())
+
+    output_path = os.path.join(INTRADAY_DIR, "phase_stats.csv")
+    phase_stats.groups.reset_index().to_csv(output_path, index=False)
+    print(f"\n✅ Per-phase intraday statistics written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""Stock market & lunar phase analysis as an importable package.
+
+Modules:
+
+- settings: environment configuration (.env)
+- compute: data loading and statistics (returns, phase statistics,
+  correlations, ANOVA, resampling) into an ``AnalysisResult``
+- render: headless charts (matplotlib/seaborn, imported only when rendering)
+- report: the markdown report
+- database: connection, results-table checks and the batched result writes
+- cli: ``compute``, ``render``, ``report``, ``write-db`` and ``run`` subcommands
+
+Importing the package or a module only loads what that module needs, so a
+statistics-only run never imports the plotting libraries. Run it through
+``scripts/azure_stock_lunar_analysis.py``.
+"""
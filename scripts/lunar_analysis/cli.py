@@ -0,0 +1,178 @@
+"""Command line interface for the analysis.
+
+Subcommands (``run`` is the default and does all steps in one process):
+
+    compute    load data and compute statistics (steps 2-5), save the results
+    render     render the charts from saved results (headless)
+    report     write the markdown report from saved results
+    write-db   write saved results to Azure SQL (steps 1 and 6)
+    run        all of the above
+
+Each subcommand imports only the modules it needs; ``compute`` never
+imports matplotlib or seaborn.
+"""
+from datetime import datetime
+import argparse
+import sys
+
+AUTOMATION_NOTES = """
+To automate this analysis process:
+
+1. Create an Azure Automation Account and upload this script as a Python Runbook.
+2. Set up a schedule to run weekly (e.g., every Monday at 6:00 AM).
+3. Configure the Runbook to connect to your Azure SQL Database using credentials from Azure Key Vault.
+4. Set up email notifications to receive the report and visualizations.
+
+Alternatively:
+- Use Azure Data Factory to create a pipeline that executes this script.
+- Set up SQL Server Agent jobs with scheduled queries for the analysis.
+"""
+
+
+def _compute(settings, conn, pool=None):
+    """Steps 2-5; exits with table diagnostics when no data was found."""
+    from ticker_registry import load_tickers
+
+    from .compute import compute
+
+    result = compute(settings, load_tickers(), conn, pool)
+    if result is None:
+        if conn is None:
+            print(f"No local data found for data source '{settings.data_source}'.")
+            sys.exit(1)
+        from .database import print_table_diagnostics
+
+        print_table_diagnostics(conn)
+        conn.close()
+        sys.exit(1)
+    return result
+
+
+def _load(settings):
+    from .compute import load_results
+
+    return load_results(settings.results_path)
+
+
+def cmd_compute(settings):
+    from data_access import close_pool
+
+    from .compute import save_results
+    from .database import connect, open_pool
+
+    # Only the sql source needs the database to compute; results are written by write-db
+    conn = connect(settings.conn_str) if settings.data_source == "sql" else None
+    pool = open_pool(settings)
+    try:
+        result = _compute(settings, conn, pool)
+    finally:
+        if pool is not None:
+            close_pool(pool)
+        if conn is not None:
+            conn.close()
+    save_results(result, settings.results_path)
+    print(f"\nResults saved to {settings.results_path}")
+
+
+def cmd_render(settings, workers=None):
+    from .render import render_charts
+
+    render_charts(_load(settings), max_workers=workers, ticker_charts=settings.ticker_charts,
+                  cache_dir=settings.cache_dir)
+
+
+def cmd_report(settings):
+    from .report import write_report
+
+    print("\n7. Generating report...")
+    write_report(_load(settings), cache_dir=settings.cache_dir)
+
+
+def cmd_write_db(settings):
+    from .database import connect, verify_results_table, write_to_db
+
+    if not settings.conn_str:
+        print("❌ SQL_ODBC_CONNECTION_STRING is not set, nothing to write to.")
+        sys.exit(1)
+    result = _load(settings)
+    conn = connect(settings.conn_str)
+    try:
+        verify_results_table(conn)
+        write_to_db(conn, result, datetime.now().strftime("%Y-%m-%d"))
+    finally:
+        conn.close()
+
+
+def cmd_run(settings):
+    from data_access import close_pool
+
+    from .compute import save_results
+    from .database import connect, needs_connection, open_pool, verify_results_table, write_to_db
+    from .render import render_charts
+    from .report import write_report
+
+    if needs_connection(settings):
+        conn = connect(settings.conn_str)
+    else:
+        conn = None
+        print(f"Using local '{settings.data_source}' data source without a database connection.")
+
+    verify_results_table(conn)
+    pool = open_pool(settings)
+    try:
+        result = _compute(settings, conn, pool)
+    finally:
+        if pool is not None:
+            close_pool(pool)
+    save_results(result, settings.results_path)
+    render_charts(result, ticker_charts=settings.ticker_charts, cache_dir=settings.cache_dir)
+    write_to_db(conn, result, datetime.now().strftime("%Y-%m-%d"))
+
+    print("\n7. Generating report...")
+    write_report(result, cache_dir=settings.cache_dir)
+
+    print("\n8. Automation Recommendations...")
+    print(AUTOMATION_NOTES)
+
+    if conn is not None:
+        conn.close()
+    print("\nAnalysis completed successfully!")
+
+
+COMMANDS = {
+    "compute": (cmd_compute, "Load data and compute statistics, save the results"),
+    "render": (cmd_render, "Render the charts from saved results"),
+    "report": (cmd_report, "Write the markdown report from saved results"),
+    "write-db": (cmd_write_db, "Write saved results to Azure SQL"),
+    "run": (cmd_run, "Run every step in one process (default)"),
+}
+
+
+def main(argv=None):
+    from .settings import load_settings
+
+    parser = argparse.ArgumentParser(description="Stock market & lunar phase analysis.")
+    subparsers = parser.add_subparsers(dest="command")
+    for name, (_, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.add_argument("--results", help="Saved results file (default ANALYSIS_RESULTS_PATH "
+                                                 "or data/analysis_results.pkl)")
+        if name == "render":
+            subparser.add_argument("--workers", type=int,
+                                   help="Chart worker processes (default SHARD_MAX_WORKERS or one per CPU)")
+    args = parser.parse_args(argv)
+
+    from instrumentation import span
+
+    settings = load_settings()
+    if getattr(args, "results", None):
+        settings = settings._replace(results_path=args.results)
+    with span(args.command or "run", source=settings.data_source):
+        if args.command == "render":
+            cmd_render(settings, args.workers)
+        else:
+            COMMANDS[args.command or "run"][0](settings)
+    if settings.cache_dir is not None:
+        from result_cache import prune
+
+        prune(settings.cache_dir)
@@ -0,0 +1,312 @@
+"""Data loading and statistics for the analysis (steps 2-5).
+
+Needs pandas/NumPy and the statistics modules only; nothing here imports
+matplotlib or seaborn. ``compute`` returns an ``AnalysisResult`` holding
+everything the render, report and write-db steps use, which can be saved
+with ``save_results`` and reloaded in a separate process.
+
+With ``settings.cache_dir`` set, results go through the content-addressed
+cache (result_cache.py): when no ticker's input data, setting or analysis
+module has changed, the cached ``AnalysisResult`` is returned without
+loading any data; otherwise only tickers whose data changed are loaded and
+resampled again.
+"""
+from collections import namedtuple
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from analysis_backends import load_stock_lunar, source_fingerprints
+from event_study import run_event_study
+from frame_schema import format_bytes, frame_memory
+from instrumentation import span
+from phase_stats import compute_phase_histograms, compute_phase_stats
+from price_panel import build_panel, panel_frame, phase_correlations
+from resampling import combine_resampled, resample_tickers
+from result_cache import code_version, digest, get_object, put_object
+from sql_pushdown import pushdown_stats
+
+# Modules whose source is part of the cache keys
+LOADER_MODULES = ("analysis_backends", "frame_schema", "data_access", "columnar_store", "sql_pushdown",
+                  "phase_index", "lunar_phase_engine")
+RESAMPLING_MODULES = ("resampling", "phase_stats", "lunar_phase_engine", "sharding")
+COMPUTE_MODULES = LOADER_MODULES + RESAMPLING_MODULES + ("lunar_analysis.compute", "price_panel", "event_study")
+
+# The cross-ticker correlation matrix only feeds the annotated heatmap, which is
+# readable up to this many {ticker}_{field} columns; beyond it the quadratic
+# matrix is not computed (and the heatmap not drawn)
+HEATMAP_MAX_COLUMNS = 40
+
+PHASE_ORDER = ["New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
+               "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent"]
+
+AnalysisResult = namedtuple("AnalysisResult", [
+    "tickers",               # registry tickers (report order)
+    "analysed",              # tickers with data, in registry order
+    "phase_stats",           # phase_stats.PhaseStats of daily returns
+    "phase_correlation",     # DataFrame ticker x Close/Volume/Return correlations with the phase
+    "lunar_correlations",    # Series of {ticker}_{field} correlations with the phase, sorted
+    "correlation_matrix",    # full correlation matrix for the heatmap (None in pushdown mode or too wide)
+    "all_returns_by_phase",  # mean return per phase and ticker plus Average_Return, phase order
+    "resampling",            # resampling.ResamplingResult, or None when disabled
+    "return_histograms",     # phase_stats.PhaseHistograms of daily returns (None in pushdown mode)
+    "event_study",           # event_study.EventStudy around new/full moons (None in pushdown mode or disabled)
+    "n_permutations",
+    "cache_key",             # result cache key (None when computed without the cache)
+], defaults=(None,))
+
+
+def frame_key(fingerprint):
+    """Cache key of a ticker's joined frame, from its input fingerprint."""
+    return digest("frame", code_version(*LOADER_MODULES), pd.__version__, os.getenv("PRICE_DTYPE"), fingerprint)
+
+
+def result_key(settings, tickers, fingerprints):
+    """Cache key of the ``AnalysisResult`` for the inputs, settings and analysis code."""
+    return digest("result", code_version(*COMPUTE_MODULES), np.__version__, pd.__version__, os.getenv("PRICE_DTYPE"),
+                  settings.data_source, settings.sql_pushdown, settings.n_permutations, settings.n_bootstrap,
+                  settings.resampling_seed, settings.event_window, settings.event_baseline,
+                  settings.event_estimation_days, list(tickers), [fingerprints[ticker] for ticker in tickers])
+
+
+def fetch_stock_data(settings, tickers, conn=None, pool=None, frame_keys=None):
+    """Step 2: load joined prices/phases with daily returns, or pushdown aggregates.
+
+    Returns ``(stock_data, pushdown)``; ``pushdown`` is a
+    ``sql_pushdown.PushdownStats`` in pushdown mode and None otherwise. With
+    a ``data_access.ConnectionPool`` the sql source reads tickers concurrently.
+    Tickers with a cached frame under ``frame_keys`` ({ticker: key}) are not
+    loaded; the frames loaded for the others are cached.
+    """
+    print("\n2. Fetching Stock Data and Lunar Phases...")
+
+    stock_data = {}
+    pushdown = None
+    if settings.sql_pushdown:
+        print("Computing returns and per-phase aggregates in the database (pushdown mode)...")
+        with span("fetch_stock_data", source="sql_pushdown") as metrics:
+            pushdown = pushdown_stats(conn, tickers)
+            metrics["rows"] = int(pushdown.rows.sum())
+        for etf, rows in pushdown.rows.items():
+            print(f"Aggregated {rows} rows for {etf}")
+    else:
+        frame_keys = frame_keys or {}
+        cached = {}
+        for etf, key in frame_keys.items():
+            data = get_object(settings.cache_dir, key)
+            if data is not None:
+                cached[etf] = data
+        if cached:
+            print(f"Reusing cached frames for {len(cached)} of {len(tickers)} tickers with unchanged data")
+        missing = [etf for etf in tickers if etf not in cached]
+        with span("fetch_stock_data", source=settings.data_source, cached=len(cached)) as metrics:
+            loaded = load_stock_lunar(missing, source=settings.data_source, conn=conn, pool=pool) if missing else {}
+            for etf, data in loaded.items():
+                if data is not None and etf in frame_keys:
+                    put_object(settings.cache_dir, frame_keys[etf], data)
+            for etf in tickers:
+                data = cached[etf] if etf in cached else loaded.get(etf)
+                if data is not None:
+                    # Calculate daily returns
+                    data["Return"] = data["Close"].pct_change() * 100  # in percentage
+                    stock_data[etf] = data
+                    print(f"Fetched {len(data)} rows for {etf} ({format_bytes(frame_memory(data))} in memory)")
+            metrics["rows"] = sum(len(data) for data in stock_data.values())
+            metrics["bytes"] = sum(frame_memory(data) for data in stock_data.values())
+        if stock_data:
+            print(f"Price/phase frames use {format_bytes(metrics['bytes'])} in memory")
+    return stock_data, pushdown
+
+
+def lunar_correlation_series(phase_correlation):
+    """The ticker x field phase correlations as one sorted Series of {ticker}_{field} values."""
+    lunar_correlations = phase_correlation[["Close", "Volume", "Return"]].stack()
+    lunar_correlations.index = [f"{etf}_{field}" for etf, field in lunar_correlations.index]
+    return lunar_correlations.sort_values()
+
+
+def compute_correlations(stock_data, pushdown, max_columns=HEATMAP_MAX_COLUMNS):
+    """Step 3: phase correlations per ticker/field and the cross-ticker correlation matrix.
+
+    Returns ``(phase_correlation, lunar_correlations, correlation_matrix)``.
+    The matrix is only computed when the heatmap will be drawn (at most
+    ``max_columns`` columns) and is None otherwise.
+    """
+    if pushdown is not None:
+        # Correlations with the phase follow from the per-phase sums; the cross-ETF
+        # heatmap needs individual rows
+        phase_correlation = pushdown.correlations
+        print("Pushdown mode: correlation heatmap skipped (needs row-level data).")
+        return phase_correlation, lunar_correlation_series(phase_correlation), None
+
+    # One date-aligned (dates x ETFs x fields) panel with the numeric lunar phase
+    # (0 = New Moon ... 7 = Waning Crescent) per date
+    panel = build_panel(stock_data, fields=["Close", "Volume", "Return"])
+    phase_correlation = phase_correlations(panel)
+    correlation_matrix = None
+    columns = len(panel.tickers) * len(panel.fields) + 1
+    if columns <= max_columns:
+        correlation_matrix = panel_frame(panel).corr()
+    else:
+        print(f"Correlation heatmap skipped: {columns} columns (more than {max_columns}).")
+    return phase_correlation, lunar_correlation_series(phase_correlation), correlation_matrix
+
+
+def returns_by_phase_table(phase_stats, analysed):
+    """Mean return per phase for every analysed ticker plus the cross-ticker average, in phase order."""
+    all_returns_by_phase = (phase_stats.groups["mean"].unstack("ticker")
+                            .reindex(columns=analysed)
+                            .add_suffix("_mean")
+                            .rename_axis(columns=None)
+                            .reset_index())
+    all_returns_by_phase["Average_Return"] = all_returns_by_phase[[f"{etf}_mean" for etf in analysed]].mean(axis=1)
+    all_returns_by_phase["PhaseOrder"] = all_returns_by_phase["Phase"].map(
+        {phase: i for i, phase in enumerate(PHASE_ORDER)})
+    return all_returns_by_phase.sort_values("PhaseOrder")
+
+
+def resample(settings, stock_data, frame_keys=None):
+    """Permutation/bootstrap statistics, reusing cached per-ticker results for tickers whose frame is unchanged."""
+    order = list(stock_data)
+    keys = {
+        etf: digest("resampling", code_version(*RESAMPLING_MODULES), np.__version__, frame_keys[etf], position,
+                    settings.n_permutations, settings.n_bootstrap, settings.resampling_seed)
+        for position, etf in enumerate(order) if frame_keys and etf in frame_keys
+    }
+    results = {}
+    for etf, key in keys.items():
+        cached = get_object(settings.cache_dir, key)
+        if cached is not None:
+            results[etf] = cached
+    missing = [etf for etf in order if etf not in results]
+    if missing:
+        fresh = resample_tickers(stock_data, missing, n_permutations=settings.n_permutations,
+                                 n_bootstrap=settings.n_bootstrap, seed=settings.resampling_seed)
+        for etf, ticker_result in fresh.items():
+            if etf in keys:
+                put_object(settings.cache_dir, keys[etf], ticker_result)
+        results.update(fresh)
+    return combine_resampled(order, [results[etf] for etf in order])
+
+
+def compute(settings, tickers, conn=None, pool=None):
+    """Run steps 2-5 and return an ``AnalysisResult`` (None when no data was found)."""
+    key, frame_keys = None, None
+    if settings.cache_dir is not None:
+        with span("cache_lookup", tickers=len(tickers)) as metrics:
+            fingerprints = source_fingerprints(tickers, settings.data_source, conn, pool, settings.cache_dir)
+            key = result_key(settings, tickers, fingerprints)
+            cached = get_object(settings.cache_dir, key)
+            metrics["hit"] = cached is not None
+        if cached is not None:
+            print(f"\nInputs, settings and analysis code are unchanged: using cached results ({key[:12]}).")
+            return cached
+        frame_keys = {etf: frame_key(fingerprint) for etf, fingerprint in fingerprints.items()
+                      if fingerprint is not None and not settings.sql_pushdown}
+
+    stock_data, pushdown = fetch_stock_data(settings, tickers, conn, pool, frame_keys)
+
+    # ETFs with data, in registry order
+    analysed = list(pushdown.rows.index) if pushdown is not None else list(stock_data)
+
+    # 3. Compute Correlations between lunar phases and stock data
+    print("\n3. Computing Correlations...")
+    if not analysed:
+        print("No stock data was retrieved from the database. Can't proceed with the analysis.")
+        print("Possible issues:")
+        print("1. Tables might not exist or have a different naming convention")
+        print("2. SQL query might need further adjustments")
+        print("3. Database might not contain data yet")
+        return None
+
+    with span("correlations", tickers=len(analysed)):
+        phase_correlation, lunar_correlations, correlation_matrix = compute_correlations(stock_data, pushdown)
+    print("\nCorrelations with Lunar Phase:")
+    print(lunar_correlations)
+
+    # 4. Stock Returns by Lunar Phase
+    print("\n4. Analyzing Stock Returns by Lunar Phase...")
+
+    # Per-phase statistics and ANOVA for all ETFs in one pass, reused by the later steps
+    with span("phase_stats", tickers=len(analysed)):
+        phase_stats = pushdown.phase_stats if pushdown is not None else compute_phase_stats(stock_data)
+    for etf in analysed:
+        print(f"\nAverage Returns by Lunar Phase for {etf}:")
+        print(phase_stats.groups.loc[etf, ["mean", "std", "count"]].reset_index())
+
+    all_returns_by_phase = returns_by_phase_table(phase_stats, analysed)
+
+    # 5. Perform ANOVA test to check if returns vary significantly by lunar phase
+    print("\n5. Performing ANOVA test for returns by lunar phase...")
+
+    # Permutation p-values and bootstrap confidence intervals (no normality assumption)
+    resampling = None
+    if settings.n_permutations > 0 and pushdown is None:
+        with span("resampling", tickers=len(analysed), permutations=settings.n_permutations,
+                  bootstrap=settings.n_bootstrap):
+            resampling = resample(settings, stock_data, frame_keys)
+
+    for etf in analysed:
+        anova_result = phase_stats.anova.loc[etf]
+
+        print(f"\nANOVA Test Results for {etf} Returns by Lunar Phase:")
+        print(f"F-statistic: {anova_result['F']:.4f}")
+        print(f"p-value: {anova_result['p_value']:.4f}")
+        print(f"Statistically significant (p < 0.05): {anova_result['p_value'] < 0.05}")
+        if resampling is not None:
+            resampled = resampling.anova.loc[etf]
+            print(f"Permutation p-value ({settings.n_permutations} permutations): {resampled['perm_p_value']:.4f}")
+            print(f"Bootstrap 95% CI for F: [{resampled['F_ci_low']:.4f}, {resampled['F_ci_high']:.4f}]")
+            print(resampling.groups.loc[etf].reset_index())
+
+    # Cumulative abnormal returns around new and full moons (needs row-level returns)
+    event_study = None
+    if settings.event_window > 0 and pushdown is None:
+        print(f"\nEvent study: returns {settings.event_window} trading days around new and full moons "
+              f"({settings.event_baseline} baseline)...")
+        with span("event_study", tickers=len(analysed), window=settings.event_window) as metrics:
+            event_study = run_event_study(build_panel(stock_data, fields=["Return"]), window=settings.event_window,
+                                          baseline=settings.event_baseline,
+                                          estimation_days=settings.event_estimation_days)
+            metrics["rows"] = len(event_study.events)
+        counts = event_study.events["event"].value_counts()
+        for event, rows in event_study.summary.groupby(level="event", sort=False):
+            print(f"\nCumulative abnormal returns around the {event} ({counts[event]} events):")
+            print(rows.droplevel("event"))
+
+    return_histograms = None
+    if pushdown is None:
+        with span("histograms", tickers=len(analysed)):
+            return_histograms = compute_phase_histograms(stock_data)
+
+    result = AnalysisResult(
+        tickers=list(tickers), analysed=analysed, phase_stats=phase_stats,
+        phase_correlation=phase_correlation, lunar_correlations=lunar_correlations,
+        correlation_matrix=correlation_matrix, all_returns_by_phase=all_returns_by_phase,
+        resampling=resampling, n_permutations=settings.n_permutations,
+        return_histograms=return_histograms, event_study=event_study, cache_key=key,
+    )
+    if key is not None:
+        put_object(settings.cache_dir, key, result)
+    return result
+
+
+def save_results(result, path):
+    """Pickle an ``AnalysisResult`` for the render, report and write-db subcommands."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with span("save_results") as metrics:
+        with open(path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        metrics["bytes"] = os.path.getsize(path)
+
+
+def load_results(path):
+    """Load an ``AnalysisResult`` saved by ``save_results``."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"❌ No analysis results at {path}; run the compute subcommand first")
+    with open(path, "rb") as f:
+        return pickle.load(f)
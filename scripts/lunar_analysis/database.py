@@ -0,0 +1,136 @@
+"""Database side of the analysis: connection, results-table checks and result writes."""
+import sys
+
+import pandas as pd
+
+from instrumentation import span
+from result_writer import write_results
+from sql_upsert import detect_dialect
+
+
+def needs_connection(settings):
+    """The sql source reads from the database; local sources only connect to write results."""
+    return settings.data_source == "sql" or bool(settings.conn_str)
+
+
+def connect(conn_str):
+    """Open the Azure SQL connection, retrying transient failures (exits on failure)."""
+    from data_access import connect_with_retry, connection_factory
+
+    print("Connecting to Azure SQL Database...")
+    try:
+        conn = connect_with_retry(connection_factory(conn_str))
+        print("Connected successfully!")
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        sys.exit(1)
+    return conn
+
+
+def open_pool(settings):
+    """Connection pool for the concurrent per-ticker reads of the sql source (None otherwise).
+
+    Connections are opened on first use, at most SQL_POOL_SIZE at once.
+    """
+    if settings.data_source != "sql" or settings.sql_pushdown:
+        return None
+    from data_access import POOL_SIZE, connection_factory, create_pool
+
+    print(f"Reading tickers over up to {POOL_SIZE} pooled connections.")
+    return create_pool(connection_factory(settings.conn_str))
+
+
+def execute_query(conn, query):
+    """Execute a query and return the results as a DataFrame (None on error)."""
+    try:
+        return pd.read_sql(query, conn)
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        print(f"Query: {query}")
+        return None
+
+
+def _tables_query(dialect, table_name=None):
+    """Query listing base tables (TABLE_NAME), optionally only ``table_name``."""
+    if dialect == "sqlite":
+        query = "SELECT name AS TABLE_NAME FROM sqlite_master WHERE type = 'table'"
+        return query + (f" AND name = '{table_name}'" if table_name else "")
+    query = "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_TYPE = 'BASE TABLE'"
+    return query + (f" AND TABLE_NAME = '{table_name}'" if table_name else "")
+
+
+def _columns_query(dialect, table_name):
+    """Query listing the columns (COLUMN_NAME) of a table."""
+    if dialect == "sqlite":
+        return f"SELECT name AS COLUMN_NAME FROM pragma_table_info('{table_name}')"
+    return f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = '{table_name}'"
+
+
+def _sample_query(dialect, table_name, rows):
+    """Query returning the first ``rows`` rows of a table."""
+    if dialect == "sqlite":
+        return f"SELECT * FROM {table_name} LIMIT {rows}"
+    return f"SELECT TOP {rows} * FROM {table_name}"
+
+
+def verify_results_table(conn):
+    """Step 1: check the StockLunarAnalysisResults table and print its columns and a sample."""
+    print("\n1. Verifying StockLunarAnalysisResults Table...")
+    if conn is None:
+        print("No database connection, skipping table verification.")
+        return
+
+    dialect = detect_dialect(conn)
+    table_exists = execute_query(conn, _tables_query(dialect, "StockLunarAnalysisResults"))
+    if table_exists is None or table_exists.empty:
+        print("StockLunarAnalysisResults table does not exist.")
+        return
+
+    print("StockLunarAnalysisResults table exists. Checking its columns...")
+    columns = execute_query(conn, _columns_query(dialect, "StockLunarAnalysisResults"))
+    print("Columns in StockLunarAnalysisResults:")
+    print(columns)
+
+    sample_data = execute_query(conn, _sample_query(dialect, "StockLunarAnalysisResults", 10))
+    print("\nSample data from StockLunarAnalysisResults:")
+    print(sample_data)
+
+    if columns is not None and "AverageReturn" in columns["COLUMN_NAME"].values:
+        print("StockLunarAnalysisResults already contains average returns by lunar phase.")
+    else:
+        print("StockLunarAnalysisResults does not contain average returns by lunar phase. Will compute them.")
+
+
+def print_table_diagnostics(conn):
+    """List the database tables and the columns of one of them (used when no stock data was found)."""
+    dialect = detect_dialect(conn)
+    tables = execute_query(conn, _tables_query(dialect))
+    print("\nAvailable tables in the database:")
+    if tables is not None and not tables.empty:
+        print(tables)
+        table_name = tables.iloc[0]["TABLE_NAME"]
+        columns = execute_query(conn, _columns_query(dialect, table_name))
+        print(f"\nColumns in the {table_name} table:")
+        if columns is not None:
+            print(columns)
+    else:
+        print("Could not retrieve table information.")
+
+
+def write_to_db(conn, result, analysis_date):
+    """Step 6: write all per-phase returns and per-ETF ANOVA results in one batched transaction."""
+    print("\n6. Updating StockLunarAnalysisResults table if needed...")
+    if conn is None:
+        print("No database connection, skipping database update.")
+        return
+
+    try:
+        with span("write_results", tickers=len(result.tickers)):
+            written = write_results(conn, analysis_date, result.phase_stats, result.phase_correlation["Volume"],
+                                    result.tickers)
+        print(f"LunarPhaseReturns: {written.phase_returns.inserted} inserted, "
+              f"{written.phase_returns.updated} updated, {written.phase_returns.unchanged} unchanged.")
+        print(f"StockLunarAnalysisResults: {written.analysis_results.inserted} inserted, "
+              f"{written.analysis_results.updated} updated, {written.analysis_results.unchanged} unchanged.")
+    except Exception as e:
+        print(f"Error updating database: {e}")
@@ -0,0 +1,351 @@
+"""Charts for the analysis, rendered headless.
+
+matplotlib (forced to the non-interactive Agg backend) and seaborn are
+imported inside the functions, so only the render step pays for them.
+
+Besides the correlation heatmap and the cross-ETF returns chart, every
+analysed ticker gets a returns-by-phase chart and a phase-distribution
+chart under ``visualizations/tickers/``. Those are built from the
+precomputed aggregates in the ``AnalysisResult`` (per-phase means,
+confidence intervals and return histograms) and fanned out to worker
+processes (sharding.py). Each worker draws the static parts of a figure
+(axes, ticks, labels) once per chart kind and then only redraws the
+per-ticker artists over the cached background. Every chart is written to a
+temporary file and renamed into place, so readers never see a partially
+written image.
+
+With a ``cache_dir``, every chart is keyed on the data it is drawn from and
+the render code (result_cache.py); charts whose key is cached are copied
+from the cache instead of being drawn, so only changed tickers are redrawn.
+Per-ticker charts therefore depend on their own ticker only: the returns
+charts are scaled to the ticker's own confidence intervals (rounded up to
+LIMIT_STEPS) and the distribution charts use the fixed histogram edges.
+"""
+from collections import namedtuple
+import os
+
+import numpy as np
+
+from instrumentation import span
+from result_cache import code_version, digest, get_file, put_file
+from sharding import map_shards
+
+from .compute import HEATMAP_MAX_COLUMNS, PHASE_ORDER
+
+HEATMAP_PATH = "correlation_heatmap.png"
+RETURNS_CHART_PATH = "visualizations/returns_by_lunar_phase.png"
+TICKER_CHART_DIR = "visualizations/tickers"
+
+TICKER_CHART_DPI = 100
+TICKER_FIGSIZE = (8, 5)
+
+# z for the normal-approximation 95% CI of a phase mean (without bootstrap CIs)
+Z_95 = 1.959964
+
+# PNG zlib level for the per-ticker charts (1 encodes several times faster than the default 6)
+PNG_COMPRESS_LEVEL = 1
+
+# Per-ticker y-limits of the returns charts are rounded up to one of these steps (times a
+# power of ten), so tickers of a similar scale share a figure
+LIMIT_STEPS = (1.0, 2.0, 2.5, 5.0, 10.0)
+
+# kind: "returns" or "distribution"; layout: hashable figure settings (y-range, x-range), so
+# jobs with the same layout reuse one figure in a worker; data: dict of NumPy arrays
+ChartJob = namedtuple("ChartJob", ["kind", "ticker", "path", "layout", "data"])
+
+
+def chart_version():
+    """Part of every chart key: the render code and the plotting library versions."""
+    from importlib.metadata import version
+
+    return (code_version("lunar_analysis.render", "lunar_analysis.compute"),
+            version("matplotlib"), version("seaborn"))
+
+
+def cached_chart(cache_dir, key, path, render):
+    """Copy the chart cached under ``key`` to ``path``, or call ``render()`` and cache the result.
+
+    Returns whether the chart came from the cache.
+    """
+    if cache_dir is not None and get_file(cache_dir, key, path):
+        return True
+    render()
+    if cache_dir is not None:
+        put_file(cache_dir, key, path)
+    return False
+
+
+def _pyplot():
+    """Import pyplot on the headless Agg backend."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def atomic_savefig(fig, path, **kwargs):
+    """Save ``fig`` to a temporary file next to ``path`` and rename it into place."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        fig.savefig(temp_path, format=os.path.splitext(path)[1].lstrip(".") or "png", **kwargs)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def render_heatmap(correlation_matrix, path=HEATMAP_PATH):
+    """Annotated heatmap of the stock data & lunar phase correlation matrix."""
+    import seaborn as sns
+
+    plt = _pyplot()
+    fig = plt.figure(figsize=(12, 10))
+    sns.heatmap(correlation_matrix, annot=True, cmap="coolwarm", fmt=".2f")
+    plt.title("Correlation Matrix: Stock Data & Lunar Phases")
+    plt.tight_layout()
+    atomic_savefig(fig, path)
+    plt.close(fig)
+    print(f"Generated correlation heatmap ({path})")
+
+
+def _phase_colors():
+    """Blue gradient for the waxing half of the cycle, red gradient for the waning half."""
+    half = len(PHASE_ORDER) // 2
+    colors = []
+    for i in range(len(PHASE_ORDER)):
+        if i < half:
+            colors.append((0.3, 0.5, 0.9, 0.4 + (i / half) * 0.6))
+        else:
+            colors.append((0.9, 0.4, 0.4, 0.4 + ((i - half) / half) * 0.6))
+    return colors
+
+
+def render_returns_chart(all_returns_by_phase, path=RETURNS_CHART_PATH):
+    """Bar chart of the cross-ETF average daily return per lunar phase."""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 6))
+    plt.style.use("default")
+    plt.gca().set_facecolor("#f8f9fa")
+    fig.set_facecolor("#f8f9fa")
+
+    plt.bar(range(len(PHASE_ORDER)), all_returns_by_phase["Average_Return"], color=_phase_colors())
+    plt.title("Average Stock Returns by Lunar Phase", fontsize=12, pad=15)
+    plt.xlabel("Lunar Phase", fontsize=10)
+    plt.ylabel("Average Daily Return", fontsize=10)
+    plt.xticks(range(len(PHASE_ORDER)), PHASE_ORDER, rotation=45, ha="right")
+    plt.grid(axis="y", linestyle="--", alpha=0.2)
+    plt.gca().spines["top"].set_visible(False)
+    plt.gca().spines["right"].set_visible(False)
+    plt.tight_layout()
+
+    atomic_savefig(fig, path, dpi=300, bbox_inches="tight", facecolor="#f8f9fa")
+    plt.close(fig)
+    print(f"Generated returns by lunar phase chart ({path})")
+
+
+def _returns_layout(data):
+    """Symmetric y-range for one ticker's returns chart, from its own confidence intervals only."""
+    values = np.abs(np.concatenate([data["low"], data["high"]]))
+    values = values[np.isfinite(values)]
+    if not len(values) or values.max() <= 0:
+        return (-1.0, 1.0)
+    limit = 1.1 * float(values.max())
+    scale = 10.0 ** np.floor(np.log10(limit))
+    limit = round(next(step for step in LIMIT_STEPS if step * scale >= limit) * scale, 10)
+    return (-limit, limit)
+
+
+def ticker_chart_jobs(result, directory=TICKER_CHART_DIR):
+    """Chart jobs for every analysed ticker, built from the precomputed aggregates."""
+    groups = result.phase_stats.groups
+    histograms = result.return_histograms
+    histogram_rows = {ticker: i for i, ticker in enumerate(histograms.tickers)} if histograms is not None else {}
+    returns_jobs, distribution_jobs = [], []
+    for ticker in result.analysed:
+        stats = groups.loc[ticker].reindex(PHASE_ORDER)
+        mean = stats["mean"].to_numpy(dtype=np.float64)
+        if result.resampling is not None:
+            bootstrap = result.resampling.groups.loc[ticker].reindex(PHASE_ORDER)
+            low = bootstrap["mean_ci_low"].to_numpy(dtype=np.float64)
+            high = bootstrap["mean_ci_high"].to_numpy(dtype=np.float64)
+        else:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                half_width = Z_95 * stats["std"].to_numpy(dtype=np.float64) / np.sqrt(stats["count"].to_numpy())
+            low, high = mean - half_width, mean + half_width
+        data = {"mean": mean, "low": low, "high": high}
+        returns_jobs.append(ChartJob("returns", ticker, os.path.join(directory, f"{ticker}_returns_by_phase.png"),
+                                     _returns_layout(data), data))
+
+        if ticker in histogram_rows:
+            edges = histograms.edges
+            distribution_jobs.append(ChartJob("distribution", ticker,
+                                              os.path.join(directory, f"{ticker}_phase_distribution.png"),
+                                              (float(edges[0]), float(edges[-1])),
+                                              {"counts": histograms.counts[histogram_rows[ticker]]}))
+
+    return returns_jobs + distribution_jobs
+
+
+def _new_figure():
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=TICKER_FIGSIZE, dpi=TICKER_CHART_DPI)
+
+
+def _returns_figure(ylim):
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    fig.subplots_adjust(left=0.12, right=0.97, top=0.9, bottom=0.28)
+    positions = np.arange(len(PHASE_ORDER))
+    bars = ax.bar(positions, np.zeros(len(PHASE_ORDER)), color=_phase_colors())
+    intervals = ax.vlines(positions, 0.0, 0.0, color="#333333", linewidth=1.2)
+    ax.axhline(0.0, color="#666666", linewidth=0.8)
+    ax.set_ylim(*ylim)
+    ax.set_xticks(positions)
+    ax.set_xticklabels(PHASE_ORDER, rotation=45, ha="right", fontsize=9)
+    ax.set_ylabel("Average Daily Return (%)", fontsize=10)
+    ax.grid(axis="y", linestyle="--", alpha=0.2)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    title = ax.set_title("", fontsize=12)
+    return fig, {"bars": bars, "intervals": intervals, "title": title,
+                 "dynamic": [*bars, intervals, title]}
+
+
+def _draw_returns(artists, ticker, data):
+    for bar, height in zip(artists["bars"], np.nan_to_num(data["mean"])):
+        bar.set_height(height)
+    artists["intervals"].set_segments([[(i, low), (i, high)]
+                                       for i, (low, high) in enumerate(zip(data["low"], data["high"]))])
+    artists["title"].set_text(f"{ticker}: Average Daily Return by Lunar Phase (95% CI)")
+
+
+def _distribution_figure(x_range):
+    fig = _new_figure()
+    ax = fig.add_subplot()
+    fig.subplots_adjust(left=0.22, right=0.97, top=0.9, bottom=0.12)
+    image = ax.imshow(np.zeros((len(PHASE_ORDER), 1)), aspect="auto", cmap="viridis", interpolation="nearest",
+                      extent=(x_range[0], x_range[1], len(PHASE_ORDER) - 0.5, -0.5))
+    ax.set_yticks(np.arange(len(PHASE_ORDER)))
+    ax.set_yticklabels(PHASE_ORDER, fontsize=9)
+    ax.set_xlabel("Daily Return (%)", fontsize=10)
+    title = ax.set_title("", fontsize=12)
+    return fig, {"image": image, "title": title, "dynamic": [image, title]}
+
+
+def _draw_distribution(artists, ticker, data):
+    counts = data["counts"].astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.nan_to_num(counts / counts.sum(axis=1, keepdims=True))
+    artists["image"].set_data(share)
+    artists["image"].set_clim(0.0, max(share.max(), 1e-9))
+    artists["title"].set_text(f"{ticker}: Share of Trading Days by Return and Lunar Phase")
+
+
+# kind: (build figure from layout, update the dynamic artists for one ticker)
+CHART_KINDS = {
+    "returns": (_returns_figure, _draw_returns),
+    "distribution": (_distribution_figure, _draw_distribution),
+}
+
+# Per-process figures: {(kind, layout): (canvas, static background, artists)}
+_FIGURES = {}
+
+
+def _figure_for(kind, layout):
+    """This process's canvas for a chart kind, with the static parts drawn once and cached."""
+    key = (kind, layout)
+    if key not in _FIGURES:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig, artists = CHART_KINDS[kind][0](layout)
+        for artist in artists["dynamic"]:
+            artist.set_animated(True)
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        _FIGURES[key] = (canvas, canvas.copy_from_bbox(fig.bbox), artists)
+    return _FIGURES[key]
+
+
+def _write_png(rgba, path):
+    """Encode an RGBA buffer to a temporary PNG next to ``path`` and rename it into place."""
+    from matplotlib.image import imsave
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        imsave(temp_path, rgba, format="png", dpi=TICKER_CHART_DPI, pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def render_chart_job(job):
+    """Draw one chart job on this process's figure for its kind and save it atomically.
+
+    Only the per-ticker artists are redrawn: the cached background (axes,
+    ticks, labels) is restored and the bars/image and title drawn over it.
+    """
+    canvas, background, artists = _figure_for(job.kind, job.layout)
+    CHART_KINDS[job.kind][1](artists, job.ticker, job.data)
+    canvas.restore_region(background)
+    for artist in artists["dynamic"]:
+        canvas.figure.draw_artist(artist)
+    _write_png(np.asarray(canvas.buffer_rgba()), job.path)
+    return job.path
+
+
+def _render_shard(jobs):
+    with span("render_shard", rows=len(jobs)):
+        return [render_chart_job(job) for job in jobs]
+
+
+def render_chart_jobs(jobs, max_workers=None):
+    """Render chart jobs across worker processes; return the written paths in job order."""
+    return [path for shard in map_shards(_render_shard, jobs, max_workers) for path in shard]
+
+
+def render_ticker_charts(result, directory=TICKER_CHART_DIR, max_workers=None, cache_dir=None):
+    """Render the per-ticker returns and phase-distribution charts for an ``AnalysisResult``.
+
+    With a ``cache_dir``, charts cached for the same data are copied instead of drawn.
+    """
+    jobs = ticker_chart_jobs(result, directory)
+    if cache_dir is None:
+        paths = render_chart_jobs(jobs, max_workers)
+        print(f"Generated {len(paths)} per-ticker charts ({directory}/)")
+        return paths
+
+    version = chart_version()
+    keys = [digest("ticker_chart", version, job.kind, job.ticker, job.layout, job.data) for job in jobs]
+    pending = [(job, key) for job, key in zip(jobs, keys) if not get_file(cache_dir, key, job.path)]
+    render_chart_jobs([job for job, _ in pending], max_workers)
+    for job, key in pending:
+        put_file(cache_dir, key, job.path)
+    print(f"Generated {len(pending)} per-ticker charts, {len(jobs) - len(pending)} unchanged ones "
+          f"copied from the cache ({directory}/)")
+    return [job.path for job in jobs]
+
+
+def render_charts(result, max_workers=None, ticker_charts=True, cache_dir=None):
+    """Render every chart for an ``AnalysisResult`` (through the chart cache with a ``cache_dir``)."""
+    version = chart_version() if cache_dir is not None else None
+    if result.correlation_matrix is not None and len(result.correlation_matrix) > HEATMAP_MAX_COLUMNS:
+        print(f"Correlation heatmap skipped: {len(result.correlation_matrix)} columns "
+              f"(more than {HEATMAP_MAX_COLUMNS}).")
+    elif result.correlation_matrix is not None:
+        with span("render_heatmap", columns=len(result.correlation_matrix)) as metrics:
+            metrics["cached"] = cached_chart(cache_dir, digest("heatmap", version, result.correlation_matrix),
+                                             HEATMAP_PATH, lambda: render_heatmap(result.correlation_matrix))
+    with span("render_returns_chart") as metrics:
+        metrics["cached"] = cached_chart(
+            cache_dir, digest("returns_chart", version, result.all_returns_by_phase["Average_Return"].to_numpy()),
+            RETURNS_CHART_PATH, lambda: render_returns_chart(result.all_returns_by_phase))
+    if ticker_charts:
+        with span("render_ticker_charts", tickers=len(result.analysed)) as metrics:
+            metrics["rows"] = len(render_ticker_charts(result, max_workers=max_workers, cache_dir=cache_dir))
@@ -0,0 +1,219 @@
+"""Markdown report of the analysis results (step 7)."""
+from datetime import datetime
+import os
+
+from instrumentation import span
+from result_cache import code_version, digest, get_file, put_file
+from ticker_registry import load_registry
+
+REPORT_PATH = "lunar_stock_analysis_report.md"
+
+REPORT_INTRO = """
+# Stock Market & Lunar Phase Analysis Report
+*Generated on {generated_on}*
+
+## 1. Introduction
+
+This report analyzes the relationship between lunar phases and stock market behavior for {count} ETFs:
+{etf_list}
+The analysis investigates whether lunar phases have any meaningful impact on stock price returns and trading volume.
+
+## 2. Correlation Analysis
+
+The correlation analysis examines the relationship between lunar phases and various stock metrics:
+
+"""
+
+CORRELATION_NOTES = """
+**Interpretation:** Generally, correlation values close to 0 indicate no meaningful relationship between lunar phases and stock metrics.
+
+## 3. Stock Returns by Lunar Phase
+
+Average daily returns (%) for each lunar phase:
+
+"""
+
+ANOVA_INTRO = """
+
+## 4. ANOVA Test Results
+
+The ANOVA test checks whether the differences in stock returns across different lunar phases are statistically significant:
+
+"""
+
+EVENT_STUDY_INTRO = """## 5. Event Study Around New and Full Moons
+
+"""
+
+EVENT_BASELINE_NOTES = {
+    "mean": "the ticker's mean daily return over the {estimation} trading days before the window",
+    "market": "the equal-weighted average return of all analysed ETFs on the same day",
+    "raw": "zero (raw returns)",
+}
+
+QUERIES_AND_CONCLUSION = """
+## 6. SQL Queries Used
+
+The following SQL queries were used in this analysis:
+
+```sql
+-- Join stock prices with lunar phases
+SELECT s.[Date], s.[Open], s.[High], s.[Low], s.[Close], s.[Volume], l.[Phase]
+FROM ETF_StockPrices s
+JOIN LunarPhases l ON CAST(s.[Date] AS DATE) = CAST(l.[Date] AS DATE)
+ORDER BY s.[Date]
+```
+
+```sql
+-- Check StockLunarAnalysisResults table structure
+SELECT COLUMN_NAME 
+FROM INFORMATION_SCHEMA.COLUMNS 
+WHERE TABLE_NAME = 'StockLunarAnalysisResults'
+```
+
+```sql
+-- Create StockLunarAnalysisResults table (if needed)
+CREATE TABLE StockLunarAnalysisResults (
+    ID INT IDENTITY(1,1) PRIMARY KEY,
+    ETF VARCHAR(10),
+    TestType VARCHAR(50),
+    LunarPhase VARCHAR(50),
+    Result FLOAT,
+    PValue FLOAT,
+    CreatedAt DATETIME DEFAULT GETDATE()
+)
+```
+
+```sql
+-- Insert ANOVA test results
+INSERT INTO StockLunarAnalysisResults (ETF, TestType, LunarPhase, Result, PValue)
+VALUES ('ETF', 'ANOVA Returns', 'All', F_statistic, p_value)
+```
+
+```sql
+-- Insert average returns by lunar phase
+INSERT INTO StockLunarAnalysisResults (ETF, TestType, LunarPhase, Result, PValue)
+VALUES ('ETF', 'Average Return', 'Lunar Phase', average_return, NULL)
+```
+
+## 7. Conclusion
+
+Based on the analysis of stock market data and lunar phases:
+
+1. **Correlation Analysis:** The correlations between lunar phases and stock metrics (Close Price, Volume, Returns) are very weak, suggesting no meaningful relationship.
+
+2. **Returns by Lunar Phase:** While there are some variations in average returns across different lunar phases, these differences are generally small and inconsistent across ETFs.
+
+3. **Statistical Significance:** The ANOVA test results indicate that the differences in stock returns across lunar phases are not statistically significant (p > 0.05) for most ETFs.
+
+4. **Overall Assessment:** The data does not support the hypothesis that lunar phases have a meaningful impact on stock market behavior. Any observed patterns are likely due to random chance rather than a causal relationship.
+
+## 8. Automation Process
+
+This analysis can be automated to run on a regular schedule using:
+- Azure Automation Account with Python Runbooks
+- Azure Data Factory pipelines
+- SQL Server Agent jobs with scheduled queries
+
+The recommended approach is to set up a weekly refresh to update the StockLunarAnalysisResults table with new data.
+
+"""
+
+
+def etf_list(result, names):
+    """Markdown list of the analysed ETFs with their registry names, noting registry tickers without data."""
+    lines = "".join(f"- {etf} ({names.get(etf, etf)})\n" for etf in result.analysed)
+    without_data = [etf for etf in result.tickers if etf not in result.analysed]
+    if without_data:
+        lines += f"\nRegistry tickers without data (left out of the analysis): {', '.join(without_data)}\n"
+    return lines
+
+
+def build_report(result, generated_on=None, names=None):
+    """Render the markdown report for an ``AnalysisResult``; ``names`` is {ticker: name} (the registry)."""
+    generated_on = generated_on or datetime.now().strftime("%Y-%m-%d")
+    names = load_registry() if names is None else names
+    tickers = result.analysed
+    report = REPORT_INTRO.format(generated_on=generated_on, count=len(tickers), etf_list=etf_list(result, names))
+
+    for etf in tickers:
+        report += f"### {etf} Correlations\n"
+        report += f"- Close Price vs Lunar Phase: {result.phase_correlation.loc[etf, 'Close']:.4f}\n"
+        report += f"- Volume vs Lunar Phase: {result.phase_correlation.loc[etf, 'Volume']:.4f}\n"
+        report += f"- Returns vs Lunar Phase: {result.phase_correlation.loc[etf, 'Return']:.4f}\n\n"
+
+    report += CORRELATION_NOTES
+
+    columns = ["Phase"] + [f"{etf}_mean" for etf in tickers] + ["Average_Return"]
+    returns_table = result.all_returns_by_phase[columns].copy()
+    returns_table.columns = ["Lunar Phase"] + tickers + ["Average (All ETFs)"]
+    report += returns_table.to_markdown(index=False, floatfmt=".4f")
+
+    report += ANOVA_INTRO
+
+    for etf in tickers:
+        anova_result = result.phase_stats.anova.loc[etf]
+        report += f"### {etf}\n"
+        report += f"- F-statistic: {anova_result['F']:.4f}\n"
+        report += f"- p-value: {anova_result['p_value']:.4f}\n"
+        report += f"- Statistically significant (p < 0.05): {anova_result['p_value'] < 0.05}\n"
+        if result.resampling is not None:
+            resampled = result.resampling.anova.loc[etf]
+            report += f"- Permutation p-value ({result.n_permutations} permutations): {resampled['perm_p_value']:.4f}\n"
+            report += f"- Bootstrap 95% CI for F: [{resampled['F_ci_low']:.4f}, {resampled['F_ci_high']:.4f}]\n"
+        report += "\n"
+
+    report += EVENT_STUDY_INTRO + event_study_section(result.event_study)
+    return report + QUERIES_AND_CONCLUSION
+
+
+def event_study_section(event_study):
+    """Markdown body of the event study section (CAR by day and per ETF)."""
+    if event_study is None:
+        return ("Not computed for this run (it needs row-level returns, so it is skipped in SQL pushdown mode, "
+                "and EVENT_WINDOW_DAYS=0 disables it).\n")
+
+    window = event_study.window
+    counts = event_study.events["event"].value_counts()
+    baseline = EVENT_BASELINE_NOTES[event_study.baseline].format(estimation=event_study.estimation_days)
+    section = (f"Cumulative abnormal returns (CAR, %) from {window} trading days before to {window} trading days "
+               f"after each new moon ({counts.get('New Moon', 0)} events) and full moon "
+               f"({counts.get('Full Moon', 0)} events). Day 0 is the first trading day on or after the event; "
+               f"abnormal returns are daily returns minus {baseline}. Averages, standard deviations and t "
+               f"statistics are taken across all event/ETF pairs.\n\n")
+
+    table = event_study.summary[["mean_ar", "mean_car", "std_car", "t_car"]].unstack("event")
+    table.columns = [f"{event} {label}" for label, event in table.columns]
+    columns = [f"{event} {label}" for event in ("New Moon", "Full Moon")
+               for label in ("mean_ar", "mean_car", "std_car", "t_car")]
+    table = table[columns].rename(columns=lambda column: column.replace("mean_ar", "AR")
+                                  .replace("mean_car", "CAR").replace("std_car", "CAR std")
+                                  .replace("t_car", "CAR t"))
+    table.index = [f"{day:+d}" if day else "0" for day in table.index]
+    section += table.rename_axis("Day").reset_index().to_markdown(index=False, floatfmt=".4f")
+
+    section += f"\n\nMean CAR (%) over the whole window (day -{window} to +{window}) per ETF:\n\n"
+    section += event_study.ticker_car.rename_axis("ETF").reset_index().to_markdown(index=False, floatfmt=".4f")
+    return section + "\n"
+
+
+def write_report(result, path=REPORT_PATH, cache_dir=None):
+    """Write the markdown report to ``path``.
+
+    With a ``cache_dir`` and a cached ``result``, the report built for the same
+    result on the same day is copied from the cache (result_cache.py).
+    """
+    generated_on = datetime.now().strftime("%Y-%m-%d")
+    names = load_registry()
+    key = None
+    if cache_dir is not None and result.cache_key is not None:
+        key = digest("report", code_version("lunar_analysis.report"), result.cache_key, generated_on, names)
+    with span("write_report") as metrics:
+        metrics["cached"] = key is not None and get_file(cache_dir, key, path)
+        if not metrics["cached"]:
+            with open(path, "w") as f:
+                f.write(build_report(result, generated_on, names))
+            if key is not None:
+                put_file(cache_dir, key, path)
+        metrics["bytes"] = os.path.getsize(path)
+    print(f"Report generated: {path}")
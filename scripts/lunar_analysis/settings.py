@@ -0,0 +1,43 @@
+"""Analysis settings read from the environment (.env)."""
+from collections import namedtuple
+import os
+
+# compute saves its results here for the render, report and write-db subcommands
+RESULTS_PATH = "data/analysis_results.pkl"
+
+Settings = namedtuple("Settings", [
+    "conn_str", "data_source", "sql_pushdown", "n_permutations", "n_bootstrap", "resampling_seed",
+    "results_path", "ticker_charts", "event_window", "event_baseline", "event_estimation_days", "cache_dir",
+])
+
+
+def load_settings():
+    """Load .env and return the analysis ``Settings``."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    # Where prices and phases are read from: "sql" (default), "duckdb", "store" or "csv"
+    # (see analysis_backends.py). Local sources only need a database to write results.
+    data_source = os.getenv("ANALYSIS_DATA_SOURCE", "sql")
+    return Settings(
+        conn_str=os.getenv("SQL_ODBC_CONNECTION_STRING"),
+        data_source=data_source,
+        # Pushdown mode: returns and per-phase aggregates are computed in the database
+        sql_pushdown=data_source == "sql" and os.getenv("ANALYSIS_SQL_PUSHDOWN", "false").lower() == "true",
+        # Permutation / bootstrap resamples for the distribution-free tests (0 disables)
+        n_permutations=int(os.getenv("RESAMPLING_PERMUTATIONS", "10000")),
+        n_bootstrap=int(os.getenv("RESAMPLING_BOOTSTRAP", "2000")),
+        resampling_seed=int(os.getenv("RESAMPLING_SEED", "42")),
+        results_path=os.getenv("ANALYSIS_RESULTS_PATH", RESULTS_PATH),
+        # Per-ticker returns and phase-distribution charts (visualizations/tickers/)
+        ticker_charts=os.getenv("RENDER_TICKER_CHARTS", "true").lower() == "true",
+        # Event study around new and full moons: +/- trading days (0 disables), abnormal
+        # return baseline ("mean", "market" or "raw") and estimation window for "mean"
+        event_window=int(os.getenv("EVENT_WINDOW_DAYS", "5")),
+        event_baseline=os.getenv("EVENT_BASELINE", "mean"),
+        event_estimation_days=int(os.getenv("EVENT_ESTIMATION_DAYS", "120")),
+        # Content-addressed cache of frames, statistics, charts and the report (result_cache.py);
+        # None disables it
+        cache_dir=os.getenv("ANALYSIS_CACHE_DIR", "data/cache")
+        if os.getenv("ANALYSIS_CACHE", "true").lower() == "true" else None,
+    )
@@ -0,0 +1,177 @@
+"""Vectorized lunar phase engine.
+
+Computes lunar phase codes, phase angle and illumination fraction for a whole
+array of dates/timestamps in one call, using the geocentric positions of the
+Sun and Moon instead of a fixed mean synodic month.
+
+Two position models are available:
+
+- "meeus" (default): truncated analytic series from Meeus, *Astronomical
+  Algorithms* (ch. 25 for the Sun, ch. 47 for the Moon), evaluated with NumPy.
+  Accurate to a few hundredths of a degree in elongation, which places phase
+  boundaries to within about a minute.
+- "astropy": full ephemeris via ``astropy.coordinates.get_body``. Slower, used
+  as the high-precision reference.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Phase names indexed by phase code (0-7)
+MOON_PHASES = (
+    "New Moon", "Waxing Crescent", "First Quarter", "Waxing Gibbous",
+    "Full Moon", "Waning Gibbous", "Last Quarter", "Waning Crescent",
+)
+
+# Degrees of elongation per phase code; each bin is centred on its principal angle (code * 45)
+PHASE_BIN_WIDTH = 45.0
+
+# Julian date of the Unix epoch and of J2000.0
+JD_UNIX_EPOCH = 2440587.5
+JD_J2000 = 2451545.0
+
+AU_KM = 149597870.7
+
+LunarPhaseResult = namedtuple("LunarPhaseResult", ["code", "angle", "illumination"])
+
+# Periodic terms for the Moon (Meeus table 47.A/47.B, largest terms).
+# Each row: multipliers of D, M, M', F and the coefficient.
+_MOON_LONGITUDE_TERMS = np.array([
+    (0, 0, 1, 0, 6288774), (2, 0, -1, 0, 1274027), (2, 0, 0, 0, 658314),
+    (0, 0, 2, 0, 213618), (0, 1, 0, 0, -185116), (0, 0, 0, 2, -114332),
+    (2, 0, -2, 0, 58793), (2, -1, -1, 0, 57066), (2, 0, 1, 0, 53322),
+    (2, -1, 0, 0, 45758), (0, 1, -1, 0, -40923), (1, 0, 0, 0, -34720),
+    (0, 1, 1, 0, -30383), (2, 0, 0, -2, 15327), (0, 0, 1, 2, -12528),
+    (0, 0, 1, -2, 10980), (4, 0, -1, 0, 10675), (0, 0, 3, 0, 10034),
+    (4, 0, -2, 0, 8548), (2, 1, -1, 0, -7888), (2, 1, 0, 0, -6766),
+    (1, 0, -1, 0, -5163), (1, 1, 0, 0, 4987), (2, -1, 1, 0, 4036),
+    (2, 0, 2, 0, 3994), (4, 0, 0, 0, 3861), (2, 0, -3, 0, 3665),
+    (0, 1, -2, 0, -2689), (2, 0, -1, 2, -2602), (2, -1, -2, 0, 2390),
+    (1, 0, 1, 0, -2348), (2, -2, 0, 0, 2236), (0, 1, 2, 0, -2120),
+    (0, 2, 0, 0, -2069), (2, -2, -1, 0, 2048), (2, 0, 1, -2, -1773),
+    (2, 0, 0, 2, -1595), (4, -1, -1, 0, 1215), (0, 0, 2, 2, -1110),
+], dtype=float)
+
+_MOON_DISTANCE_TERMS = np.array([
+    (0, 0, 1, 0, -20905355), (2, 0, -1, 0, -3699111), (2, 0, 0, 0, -2955968),
+    (0, 0, 2, 0, -569925), (0, 1, 0, 0, 48888), (0, 0, 0, 2, -3149),
+    (2, 0, -2, 0, 246158), (2, -1, -1, 0, -152138), (2, 0, 1, 0, -170733),
+    (2, -1, 0, 0, -204586), (0, 1, -1, 0, -129620), (1, 0, 0, 0, 108743),
+    (0, 1, 1, 0, 104755), (2, 0, 0, -2, 10321), (0, 0, 1, -2, 79661),
+    (4, 0, -1, 0, -34782), (0, 0, 3, 0, -23210), (4, 0, -2, 0, -21636),
+    (2, 1, -1, 0, 24208), (2, 1, 0, 0, 30824), (1, 0, -1, 0, -8379),
+    (1, 1, 0, 0, -16675), (2, -1, 1, 0, -12831), (2, 0, 2, 0, -10445),
+    (4, 0, 0, 0, -11650), (2, 0, -3, 0, 14403), (0, 1, -2, 0, -7003),
+], dtype=float)
+
+_MOON_LATITUDE_TERMS = np.array([
+    (0, 0, 0, 1, 5128122), (0, 0, 1, 1, 280602), (0, 0, 1, -1, 277693),
+    (2, 0, 0, -1, 173237), (2, 0, -1, 1, 55413), (2, 0, -1, -1, 46271),
+    (2, 0, 0, 1, 32573), (0, 0, 2, 1, 17198), (2, 0, 1, -1, 9266),
+    (0, 0, 2, -1, 8822), (2, -1, 0, -1, 8216), (2, 0, -2, -1, 4324),
+    (2, 0, 1, 1, 4200), (2, 1, 0, -1, -3359),
+], dtype=float)
+
+
+def to_julian_date(dates):
+    """Convert an array-like of dates/timestamps (UTC) to Julian dates."""
+    values = np.asarray(dates)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]")
+    ns = values.astype("datetime64[ns]").astype(np.int64)
+    return JD_UNIX_EPOCH + ns / 86_400e9
+
+
+def _series(terms, args, e, trig):
+    """Sum a Meeus periodic series for every epoch at once."""
+    # multipliers: (n_terms, 4); args: (4, n_epochs) in radians
+    multipliers = terms[:, :4]
+    angles = multipliers @ args
+    # Terms involving M are scaled by E (or E^2 for 2M)
+    m_power = np.abs(multipliers[:, 1])[:, None]
+    return (terms[:, 4:5] * e[None, :] ** m_power * trig(angles)).sum(axis=0)
+
+
+def _meeus_positions(jd):
+    """Return geocentric ecliptic longitudes/latitudes (deg) and distances (km)."""
+    t = (jd - JD_J2000) / 36525.0
+
+    # Sun (Meeus ch. 25, low accuracy)
+    sun_l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t ** 2
+    sun_m = np.radians(357.52911 + 35999.05029 * t - 0.0001537 * t ** 2)
+    sun_c = ((1.914602 - 0.004817 * t - 0.000014 * t ** 2) * np.sin(sun_m)
+             + (0.019993 - 0.000101 * t) * np.sin(2 * sun_m)
+             + 0.000289 * np.sin(3 * sun_m))
+    eccentricity = 0.016708634 - 0.000042037 * t
+    sun_lon = sun_l0 + sun_c
+    true_anomaly = sun_m + np.radians(sun_c)
+    sun_dist = (1.000001018 * (1 - eccentricity ** 2)
+                / (1 + eccentricity * np.cos(true_anomaly))) * AU_KM
+
+    # Moon (Meeus ch. 47, truncated)
+    moon_lp = 218.3164477 + 481267.88123421 * t - 0.0015786 * t ** 2
+    d = np.radians(297.8501921 + 445267.1114034 * t - 0.0018819 * t ** 2)
+    m = np.radians(357.5291092 + 35999.0502909 * t - 0.0001536 * t ** 2)
+    mp = np.radians(134.9633964 + 477198.8675055 * t + 0.0087414 * t ** 2)
+    f = np.radians(93.2720950 + 483202.0175233 * t - 0.0036539 * t ** 2)
+    e = 1 - 0.002516 * t - 0.0000074 * t ** 2
+    args = np.vstack([d, m, mp, f])
+
+    moon_lon = moon_lp + _series(_MOON_LONGITUDE_TERMS, args, e, np.sin) / 1e6
+    moon_lat = _series(_MOON_LATITUDE_TERMS, args, e, np.sin) / 1e6
+    moon_dist = 385000.56 + _series(_MOON_DISTANCE_TERMS, args, e, np.cos) / 1e3
+
+    return sun_lon, sun_dist, moon_lon, moon_lat, moon_dist
+
+
+def _astropy_positions(jd):
+    """Same as ``_meeus_positions`` but from the astropy ephemeris."""
+    from astropy import units as u
+    from astropy.coordinates import GeocentricTrueEcliptic, get_body
+    from astropy.time import Time
+
+    times = Time(jd, format="jd", scale="utc")
+    frame = GeocentricTrueEcliptic(equinox=times)
+    sun = get_body("sun", times).transform_to(frame)
+    moon = get_body("moon", times).transform_to(frame)
+    return (sun.lon.deg, sun.distance.to_value(u.km),
+            moon.lon.deg, moon.lat.deg, moon.distance.to_value(u.km))
+
+
+def compute_lunar_phases(dates, method="meeus"):
+    """Compute lunar phase code, phase angle and illumination for many dates.
+
+    ``dates`` may be any array-like of dates, timestamps or ISO strings; naive
+    values are treated as UTC. Returns a ``LunarPhaseResult`` of arrays:
+
+    - code: int8 phase code 0-7 indexing ``MOON_PHASES``; each phase spans
+      45 degrees of elongation centred on its principal angle (New Moon
+      337.5-22.5, First Quarter 67.5-112.5, ...), so the days around an
+      exact new or full moon carry that phase, as in the stored daily table
+    - angle: Moon-Sun elongation in ecliptic longitude, degrees in [0, 360)
+    - illumination: illuminated fraction of the lunar disk in [0, 1]
+    """
+    jd = np.atleast_1d(to_julian_date(dates)).astype(float)
+
+    if method == "meeus":
+        sun_lon, sun_dist, moon_lon, moon_lat, moon_dist = _meeus_positions(jd)
+    elif method == "astropy":
+        sun_lon, sun_dist, moon_lon, moon_lat, moon_dist = _astropy_positions(jd)
+    else:
+        raise ValueError(f"Unknown lunar position method: {method}")
+
+    angle = np.mod(moon_lon - sun_lon, 360.0)
+
+    # Geocentric elongation and Sun-Moon-Earth phase angle (Meeus ch. 48)
+    elongation = np.arccos(np.cos(np.radians(moon_lat)) * np.cos(np.radians(angle)))
+    phase_angle = np.arctan2(sun_dist * np.sin(elongation),
+                             moon_dist - sun_dist * np.cos(elongation))
+    illumination = (1 + np.cos(phase_angle)) / 2
+
+    code = ((angle + PHASE_BIN_WIDTH / 2) // PHASE_BIN_WIDTH).astype(np.int8) % 8
+    return LunarPhaseResult(code=code, angle=angle, illumination=illumination)
+
+
+def phase_names(codes):
+    """Map an array of phase codes to their phase names."""
+    return np.asarray(MOON_PHASES, dtype=object)[np.asarray(codes)]
@@ -0,0 +1,205 @@
+"""Lunar phase interval index: phase transitions as sorted boundary arrays.
+
+Instead of one row per calendar day, the index stores only the instants at
+which the phase code changes (the Moon-Sun elongation crossing a bin edge
+halfway between two principal angles, 22.5 + k * 45 degrees, about 99 a
+year) and the code that starts at each. Looking up the
+phase of any array of dates or timestamps is one ``np.searchsorted`` over the
+boundaries, O(log n) per value, so day-level and bar-level attribution share
+the same index and no daily table has to be materialized. Two centuries fit
+in well under a megabyte in memory and a fraction of that on disk.
+
+Transitions are located with the lunar_phase_engine.py model: elongation is
+sampled every SAMPLE_HOURS (the Moon gains at most ~16 degrees a day, so a
+sample step never skips a boundary), and every crossing is then bisected,
+all at once, down to BISECT_TOLERANCE. ``principal_phases`` locates the exact
+new moon, first quarter, full moon and last quarter instants (elongation
+crossing a multiple of 90 degrees) the same way.
+
+Usage:
+    python scripts/phase_index.py build [--start 1900-01-01] [--end 2100-01-01]
+    python scripts/phase_index.py lookup 2025-03-14T06:55 2025-03-14
+"""
+from collections import namedtuple
+import argparse
+import os
+
+import numpy as np
+
+from lunar_phase_engine import MOON_PHASES, compute_lunar_phases
+
+PHASE_INDEX_PATH = os.getenv("LUNAR_PHASE_INDEX_PATH", "data/lunar_phase_index.npz")
+
+# Default coverage of a built index
+INDEX_START = "1900-01-01"
+INDEX_END = "2100-01-01"
+
+SAMPLE_HOURS = 6
+BISECT_TOLERANCE = np.timedelta64(1, "s")
+
+# Day-level attribution uses the phase at this time of day (UTC), like the daily table
+DAY_ATTRIBUTION_TIME = np.timedelta64(0, "h")
+
+# Saved with the index; an index saved with other phase bins is rebuilt
+INDEX_VERSION = 2
+
+# boundaries: int64 UTC seconds since the epoch at which each interval starts, ascending
+# codes: int8 phase code of each interval; the last interval ends at ``end``
+PhaseIndex = namedtuple("PhaseIndex", ["boundaries", "codes", "end"])
+
+
+def _as_seconds(values):
+    """Dates, timestamps or strings (naive = UTC) as int64 seconds, rounded down."""
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]")
+    return np.atleast_1d(values.astype("datetime64[s]").astype(np.int64))
+
+
+def _codes_at(seconds):
+    return compute_lunar_phases(seconds.astype("datetime64[s]")).code
+
+
+def _quadrants_at(seconds):
+    """Principal phase most recently passed: 0 new moon, 1 first quarter, 2 full moon, 3 last quarter."""
+    return (compute_lunar_phases(seconds.astype("datetime64[s]")).angle // 90.0).astype(np.int8)
+
+
+def _changes(start, end, key, sample_hours, tolerance):
+    """Every change of ``key(seconds)`` in [start, end), bisected down to ``tolerance``.
+
+    Returns ``(start_s, first_key, instants, keys)``: int64 seconds of the first
+    instant with each new key and the key that starts there.
+    """
+    start_s, end_s = _as_seconds(start)[0], _as_seconds(end)[0]
+    samples = np.append(np.arange(start_s, end_s, sample_hours * 3600, dtype=np.int64), end_s)
+    keys = key(samples)
+
+    # Bisect every bracketing sample pair at once; ``high`` converges on the first
+    # instant with the new key
+    changed = np.flatnonzero(keys[1:] != keys[:-1])
+    low, high = samples[changed], samples[changed + 1]
+    low_keys = keys[changed]
+    tolerance_s = max(int(tolerance.astype("timedelta64[s]").astype(np.int64)), 1)
+    while len(low) and np.max(high - low) > tolerance_s:
+        middle = low + (high - low) // 2
+        same = key(middle) == low_keys
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+    return start_s, keys[0], high, keys[changed + 1]
+
+
+def build_phase_index(start=INDEX_START, end=INDEX_END, sample_hours=SAMPLE_HOURS, tolerance=BISECT_TOLERANCE):
+    """Locate every phase transition in [start, end) and return a ``PhaseIndex``."""
+    start_s, first_code, instants, codes = _changes(start, end, _codes_at, sample_hours, tolerance)
+    return PhaseIndex(boundaries=np.concatenate([[start_s], instants]).astype(np.int64),
+                      codes=np.concatenate([[first_code], codes]).astype(np.int8),
+                      end=np.int64(_as_seconds(end)[0]))
+
+
+def principal_phases(start, end, sample_hours=SAMPLE_HOURS, tolerance=BISECT_TOLERANCE):
+    """Instants (datetime64[s]) and phase codes (0, 2, 4, 6) of the principal phases in [start, end)."""
+    _, _, instants, quadrants = _changes(start, end, _quadrants_at, sample_hours, tolerance)
+    return instants.astype("datetime64[s]"), (quadrants * 2).astype(np.int8)
+
+
+def phase_at(index, timestamps):
+    """Phase codes (int8) at each timestamp; -1 outside the index coverage."""
+    # Boundaries are whole seconds, so flooring a timestamp to seconds never changes its interval
+    seconds = _as_seconds(timestamps)
+    position = np.searchsorted(index.boundaries, seconds, side="right") - 1
+    covered = (position >= 0) & (seconds < index.end)
+    return np.where(covered, index.codes[np.clip(position, 0, None)], -1).astype(np.int8)
+
+
+def phase_on(index, dates):
+    """Day-level phase codes: the phase at DAY_ATTRIBUTION_TIME (UTC) of each date."""
+    days = _as_seconds(dates).astype("datetime64[s]").astype("datetime64[D]")
+    return phase_at(index, days + DAY_ATTRIBUTION_TIME)
+
+
+def transitions(index, start=None, end=None):
+    """Instants (datetime64[s]) and new phase codes of the transitions in [start, end)."""
+    boundaries = index.boundaries[1:]
+    keep = np.ones(len(boundaries), dtype=bool)
+    if start is not None:
+        keep &= boundaries >= _as_seconds(start)[0]
+    if end is not None:
+        keep &= boundaries < _as_seconds(end)[0]
+    return boundaries[keep].astype("datetime64[s]"), index.codes[1:][keep]
+
+
+def covers(index, timestamps):
+    """Whether every timestamp falls inside the index coverage."""
+    seconds = _as_seconds(timestamps)
+    return len(seconds) == 0 or (seconds.min() >= index.boundaries[0] and seconds.max() < index.end)
+
+
+def index_nbytes(index):
+    """In-memory size of the boundary and code arrays."""
+    return index.boundaries.nbytes + index.codes.nbytes
+
+
+def save_phase_index(index, path=PHASE_INDEX_PATH):
+    """Write the index as a compressed .npz (transitions stored as int32 second deltas), atomically."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez_compressed(temp_path, version=np.array([INDEX_VERSION]), start=index.boundaries[:1],
+                            deltas=np.diff(index.boundaries).astype(np.int32), codes=index.codes,
+                            end=np.array([index.end]))
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_phase_index(path=PHASE_INDEX_PATH):
+    """Read an index written by ``save_phase_index`` (None for an index saved with other phase bins)."""
+    with np.load(path) as data:
+        if "version" not in data or data["version"][0] != INDEX_VERSION:
+            return None
+        boundaries = data["start"][0] + np.concatenate([[0], np.cumsum(data["deltas"], dtype=np.int64)])
+        return PhaseIndex(boundaries=boundaries, codes=data["codes"].astype(np.int8), end=np.int64(data["end"][0]))
+
+
+def get_phase_index(timestamps=None, path=PHASE_INDEX_PATH):
+    """The stored index, built (and saved) first when missing or not covering ``timestamps``."""
+    index = load_phase_index(path) if os.path.exists(path) else None
+    if index is None or (timestamps is not None and not covers(index, timestamps)):
+        start, end = INDEX_START, INDEX_END
+        seconds = _as_seconds(timestamps) if timestamps is not None else np.empty(0, dtype=np.int64)
+        if len(seconds):
+            years = seconds.astype("datetime64[s]").astype("datetime64[Y]")
+            start = min(np.datetime64(start, "D"), years.min().astype("datetime64[D]"))
+            end = max(np.datetime64(end, "D"), (years.max() + np.timedelta64(1, "Y")).astype("datetime64[D]"))
+        index = build_phase_index(start, end)
+        save_phase_index(index, path)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lunar phase interval index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help=f"Build the index and save it to {PHASE_INDEX_PATH}")
+    build.add_argument("--start", default=INDEX_START)
+    build.add_argument("--end", default=INDEX_END)
+    lookup = subparsers.add_parser("lookup", help="Print the phase at dates or timestamps (UTC)")
+    lookup.add_argument("timestamps", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_phase_index(args.start, args.end)
+        save_phase_index(index)
+        print(f"✅ {len(index.boundaries) - 1} phase transitions {args.start}..{args.end}: "
+              f"{index_nbytes(index) / 1024:,.0f} KiB in memory, "
+              f"{os.path.getsize(PHASE_INDEX_PATH) / 1024:,.0f} KiB on disk ({PHASE_INDEX_PATH})")
+        return
+
+    index = get_phase_index(np.array(args.timestamps, dtype="datetime64[ns]"))
+    for value, code in zip(args.timestamps, phase_at(index, np.array(args.timestamps, dtype="datetime64[ns]"))):
+        print(f"🌙 {value}: {MOON_PHASES[code] if code >= 0 else 'outside the index'}")
+
+
+if __name__ == "__main__":
+    main()
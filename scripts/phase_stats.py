@@ -0,0 +1,172 @@
+"""Single-pass per-phase return statistics and one-way ANOVA for many tickers.
+
+Phase labels are factorized once into codes, and count, sum and sum of squares
+for every (ticker, phase) group are accumulated with one ``np.bincount`` pass
+over the concatenated returns of all tickers. Means, standard deviations and
+the ANOVA F statistic / p-value are then derived from those sufficient
+statistics, so the printing, database and report stages can share one result
+instead of re-masking the data per phase. Per-phase return histograms for the
+charts are binned the same way.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from frame_schema import PHASE_DTYPE
+from lunar_phase_engine import MOON_PHASES
+
+PhaseStats = namedtuple("PhaseStats", ["groups", "anova"])
+PhaseHistograms = namedtuple("PhaseHistograms", ["tickers", "edges", "counts"])
+
+# Daily return (%) bin edges for the per-phase histograms; returns beyond the
+# outer edges are counted in the outer bins
+HISTOGRAM_EDGES = np.linspace(-5.0, 5.0, 41)
+
+
+def phase_codes(phases):
+    """Phase codes 0-7 (MOON_PHASES order) for phase names; unknown names get -1.
+
+    Phases already stored as ``frame_schema.PHASE_DTYPE`` categoricals are
+    returned as their codes without looking at any strings.
+    """
+    if getattr(phases, "dtype", None) == PHASE_DTYPE:
+        return np.asarray(phases.cat.codes if isinstance(phases, pd.Series) else phases.codes)
+    return pd.Categorical(phases, categories=MOON_PHASES).codes
+
+
+def sufficient_stats(returns, codes, ticker_codes, n_tickers):
+    """Accumulate count, sum and sum of squares per (ticker, phase) in one pass.
+
+    Returns three arrays of shape (n_tickers, 8). NaN returns and unknown
+    phases (code -1) are ignored.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(returns) & (codes >= 0)
+    index = ticker_codes[valid].astype(np.int64) * len(MOON_PHASES) + codes[valid]
+    values = returns[valid]
+    size = n_tickers * len(MOON_PHASES)
+
+    shape = (n_tickers, len(MOON_PHASES))
+    count = np.bincount(index, minlength=size).reshape(shape).astype(np.float64)
+    total = np.bincount(index, weights=values, minlength=size).reshape(shape)
+    total_sq = np.bincount(index, weights=values * values, minlength=size).reshape(shape)
+    return count, total, total_sq
+
+
+def anova_f(count, total, total_sq):
+    """One-way ANOVA F statistic from per-group sufficient statistics.
+
+    Groups run along the last axis, so any leading shape (tickers,
+    resamples, ...) is evaluated at once. Returns (F, df_between, df_within);
+    F is NaN when either degrees of freedom is zero.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        group_ss = np.where(count > 0, np.maximum(total_sq - total * mean, 0.0), 0.0)
+        n = count.sum(axis=-1)
+        k = (count > 0).sum(axis=-1)
+        grand_mean = total.sum(axis=-1) / n
+        ss_between = np.nansum(count * (mean - grand_mean[..., None]) ** 2, axis=-1)
+        ss_within = group_ss.sum(axis=-1)
+        df_between = k - 1
+        df_within = n - k
+        f_stat = (ss_between / df_between) / (ss_within / df_within)
+    f_stat = np.where((df_between > 0) & (df_within > 0), f_stat, np.nan)
+    return f_stat, df_between, df_within
+
+
+def finish_stats(tickers, count, total, total_sq):
+    """Derive per-phase mean/std and per-ticker ANOVA from sufficient statistics.
+
+    ``count``, ``total`` and ``total_sq`` have shape (n_tickers, 8). Returns a
+    ``PhaseStats`` of:
+
+    - groups: DataFrame indexed by (ticker, Phase) with count, sum, sum_sq,
+      mean and std (sample, ddof=1); empty groups are omitted
+    - anova: DataFrame indexed by ticker with F, p_value, df_between, df_within
+    """
+    from scipy.special import fdtrc
+
+    count = np.asarray(count, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)
+    total_sq = np.asarray(total_sq, dtype=np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq - total * mean, 0.0) / (count - 1))
+    f_stat, df_between, df_within = anova_f(count, total, total_sq)
+    p_value = fdtrc(df_between, df_within, f_stat)
+
+    index = pd.MultiIndex.from_product([list(tickers), list(MOON_PHASES)], names=["ticker", "Phase"])
+    groups = pd.DataFrame({
+        "count": count.ravel().astype(np.int64),
+        "sum": total.ravel(),
+        "sum_sq": total_sq.ravel(),
+        "mean": mean.ravel(),
+        "std": std.ravel(),
+    }, index=index)
+    groups = groups[groups["count"] > 0]
+
+    anova = pd.DataFrame({
+        "F": f_stat,
+        "p_value": p_value,
+        "df_between": df_between,
+        "df_within": df_within.astype(np.int64),
+    }, index=pd.Index(list(tickers), name="ticker"))
+    return PhaseStats(groups=groups, anova=anova)
+
+
+def phase_correlation(count, total, total_sq):
+    """Pearson correlation of a series with the numeric phase (0-7) from per-phase sums.
+
+    The phase is constant within each group, so the cross-products follow
+    from the group totals. Groups run along the last axis, like ``anova_f``.
+    """
+    codes = np.arange(len(MOON_PHASES), dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = count.sum(axis=-1)
+        sum_x = total.sum(axis=-1)
+        sum_y = (count * codes).sum(axis=-1)
+        cov = (total * codes).sum(axis=-1) - sum_x * sum_y / n
+        var_x = total_sq.sum(axis=-1) - sum_x ** 2 / n
+        var_y = (count * codes ** 2).sum(axis=-1) - sum_y ** 2 / n
+        return cov / np.sqrt(var_x * var_y)
+
+
+def _concatenate(stock_data, value_column):
+    """Concatenate one column, phase codes and ticker codes of {ticker: DataFrame}."""
+    tickers = list(stock_data)
+    frames = [stock_data[ticker] for ticker in tickers]
+    lengths = np.array([len(df) for df in frames])
+
+    if frames:
+        values = np.concatenate([df[value_column].to_numpy(dtype=np.float64) for df in frames])
+        codes = np.concatenate([phase_codes(df["Phase"]) for df in frames])
+    else:
+        values, codes = np.empty(0), np.empty(0, dtype=np.int8)
+    ticker_codes = np.repeat(np.arange(len(tickers)), lengths)
+    return tickers, values, codes, ticker_codes
+
+
+def compute_phase_stats(stock_data, value_column="Return"):
+    """Compute per-phase statistics and ANOVA for {ticker: DataFrame} in one pass."""
+    tickers, returns, codes, ticker_codes = _concatenate(stock_data, value_column)
+    count, total, total_sq = sufficient_stats(returns, codes, ticker_codes, len(tickers))
+    return finish_stats(tickers, count, total, total_sq)
+
+
+def compute_phase_histograms(stock_data, value_column="Return", edges=HISTOGRAM_EDGES):
+    """Histogram counts per (ticker, phase) for {ticker: DataFrame} in one bincount pass.
+
+    Returns a ``PhaseHistograms`` whose ``counts`` has shape
+    (n_tickers, 8, len(edges) - 1). NaN values and unknown phases are ignored.
+    """
+    tickers, values, codes, ticker_codes = _concatenate(stock_data, value_column)
+    n_bins = len(edges) - 1
+    valid = ~np.isnan(values) & (codes >= 0)
+    bins = np.clip(np.searchsorted(edges, values[valid], side="right") - 1, 0, n_bins - 1)
+    index = (ticker_codes[valid].astype(np.int64) * len(MOON_PHASES) + codes[valid]) * n_bins + bins
+    counts = np.bincount(index, minlength=len(tickers) * len(MOON_PHASES) * n_bins)
+    return PhaseHistograms(tickers=tickers, edges=np.asarray(edges),
+                           counts=counts.reshape(len(tickers), len(MOON_PHASES), n_bins))
@@ -0,0 +1,438 @@
+"""Incremental store of per-(ticker, phase) sufficient statistics.
+
+Keeps, for every ticker and lunar phase, the count, sum and sum of squares of
+daily returns (and of volume, for the volume/phase correlation), so the
+per-phase means, standard deviations and ANOVA written to LunarPhaseReturns
+and StockLunarAnalysisResults can be derived without re-reading the price
+history. Layout under ``STORE_DIR``:
+
+    state.npz              tickers, stored bars and the sums per ticker
+    bars/<TICKER>.<n>.bin  the ticker's bars (date, close, volume, phase code), date order
+
+Updates take joined price/phase frames (analysis_backends.py) and classify
+each bar against the stored ones:
+
+- bars after the last stored date are appended and their returns added to
+  the sums in date order, in O(new rows). The sums are accumulated in the
+  same order as ``phase_stats.sufficient_stats``, so they are bit-identical to a
+  full recompute.
+- revised bars (a stored date with a different close, volume or phase) and
+  back-filled dates are merged into a new generation of the ticker's bars
+  file, and that ticker's sums are replayed from its local bars. A revised
+  close also changes the next day's return, and replaying keeps the sums
+  exact instead of subtracting old contributions.
+- identical bars are skipped
+
+Bars are appended before the state is saved, and a revision writes a new
+file generation that the state switches to. An interrupted update therefore
+leaves the previous state intact (extra appended bars are truncated on the
+next update). Bars deleted upstream are not detected by an update; ``verify``
+compares the store with a full recompute and ``rebuild`` starts over.
+
+The store always works on float64 prices, like the SQL uploads.
+
+Usage:
+    python scripts/phase_stats_store.py update [--since YYYY-MM-DD]   # new and revised bars
+    python scripts/phase_stats_store.py rebuild                        # from the full history
+    python scripts/phase_stats_store.py verify                         # against a full recompute
+    python scripts/phase_stats_store.py show
+    python scripts/phase_stats_store.py write-db [--date YYYY-MM-DD]   # derived results to Azure SQL
+"""
+from collections import namedtuple
+from datetime import datetime
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+from lunar_phase_engine import MOON_PHASES
+from phase_stats import finish_stats, phase_codes, phase_correlation
+
+STORE_DIR = os.getenv("PHASE_STATS_STORE_DIR", "data/phase_stats")
+# update re-reads this many days before each ticker's last stored bar to pick up revisions
+REVISION_DAYS = int(os.getenv("PHASE_STATS_REVISION_DAYS", "10"))
+
+STATE_FILE = "state.npz"
+BARS_DIR = "bars"
+
+BAR_DTYPE = np.dtype([("date", "<M8[D]"), ("close", "<f8"), ("volume", "<f8"), ("phase", "i1")])
+
+# Series with sufficient statistics, and the statistics kept for each (sums axes 1 and 2)
+FIELDS = ("Return", "Volume")
+STATISTICS = ("count", "sum", "sum_sq")
+
+# tickers: list; rows, generation: int64 arrays per ticker (stored bars, bars file generation);
+# sums: float64 array (tickers x FIELDS x STATISTICS x phases)
+StoreState = namedtuple("StoreState", ["tickers", "rows", "generation", "sums"])
+
+UpdateSummary = namedtuple("UpdateSummary", ["appended", "revised", "unchanged"])
+
+
+def empty_state():
+    return StoreState(tickers=[], rows=np.zeros(0, dtype=np.int64), generation=np.zeros(0, dtype=np.int64),
+                      sums=np.zeros((0, len(FIELDS), len(STATISTICS), len(MOON_PHASES))))
+
+
+def load_state(root=STORE_DIR):
+    """The saved ``StoreState`` (empty when there is none)."""
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return empty_state()
+    with np.load(path) as data:
+        return StoreState(tickers=data["tickers"].tolist(), rows=data["rows"], generation=data["generation"],
+                          sums=data["sums"])
+
+
+def save_state(state, root=STORE_DIR):
+    """Write the state to a temporary file and rename it into place."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, STATE_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            np.savez(f, tickers=np.array(state.tickers, dtype=str), rows=state.rows,
+                     generation=state.generation, sums=state.sums)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _bars_path(root, ticker, generation):
+    return os.path.join(root, BARS_DIR, f"{ticker}.{generation}.bin")
+
+
+def read_bars(root, ticker, rows, generation):
+    """A ticker's stored bars, memory-mapped (only the pages that are touched are read)."""
+    path = _bars_path(root, ticker, generation)
+    if rows == 0 or not os.path.exists(path):
+        return np.zeros(0, dtype=BAR_DTYPE)
+    return np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(int(rows),))
+
+
+def frame_bars(frame):
+    """Bars of a joined price/phase frame (Date, Close, Volume, Phase), one per date in date order."""
+    frame = frame.drop_duplicates(subset="Date", keep="last").sort_values("Date")
+    bars = np.zeros(len(frame), dtype=BAR_DTYPE)
+    bars["date"] = frame["Date"].to_numpy(dtype="datetime64[D]")
+    bars["close"] = frame["Close"].to_numpy(dtype=np.float64)
+    bars["volume"] = frame["Volume"].to_numpy(dtype=np.float64)
+    bars["phase"] = phase_codes(frame["Phase"])
+    return bars
+
+
+def bar_returns(close, previous_close=np.nan):
+    """Daily returns (%) of a close series following ``previous_close``, as the analysis computes them."""
+    previous = np.concatenate([[previous_close], close[:-1]])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (close / previous - 1) * 100
+
+
+def accumulate(sums, bars, previous_close=np.nan):
+    """Add the returns and volumes of ``bars`` to one ticker's sums (FIELDS x STATISTICS x phases).
+
+    Values are added one by one in date order (``np.add.at``), the order in
+    which ``np.bincount`` sums a ticker's rows in a full recompute.
+    """
+    for f, values in enumerate((bar_returns(bars["close"], previous_close), bars["volume"])):
+        valid = ~np.isnan(values) & (bars["phase"] >= 0)
+        codes, values = bars["phase"][valid], values[valid]
+        np.add.at(sums[f, 0], codes, 1.0)
+        np.add.at(sums[f, 1], codes, values)
+        np.add.at(sums[f, 2], codes, values * values)
+
+
+def _same_bars(a, b):
+    """Elementwise: do two bar arrays hold the same close, volume and phase (NaN equals NaN)?"""
+    def same(x, y):
+        return (x == y) | (np.isnan(x) & np.isnan(y))
+    return same(a["close"], b["close"]) & same(a["volume"], b["volume"]) & (a["phase"] == b["phase"])
+
+
+def classify(stored, batch):
+    """Split a ticker's batch against its stored bars.
+
+    Returns ``(appended, revised, unchanged)``: bars after the last stored
+    date, bars that revise or back-fill stored dates, and the number of
+    identical bars.
+    """
+    if len(stored) == 0:
+        return batch, batch[:0], 0
+    dates = np.asarray(stored["date"])
+    after = batch["date"] > dates[-1]
+    overlap = batch[~after]
+    position = np.minimum(np.searchsorted(dates, overlap["date"]), len(dates) - 1)
+    found = dates[position] == overlap["date"]
+    same = np.zeros(len(overlap), dtype=bool)
+    same[found] = _same_bars(np.asarray(stored[position[found]]), overlap[found])
+    return batch[after], overlap[~same], int(same.sum())
+
+
+def _merge(stored, revised, appended):
+    """Stored bars with revisions applied and the appended bars, in date order."""
+    kept = np.asarray(stored)[~np.isin(stored["date"], revised["date"])]
+    merged = np.concatenate([kept, revised, appended])
+    return merged[np.argsort(merged["date"], kind="stable")]
+
+
+def _ticker_index(state, ticker):
+    """Position of a ticker in the state, adding it when it is new."""
+    if ticker in state.tickers:
+        return state, state.tickers.index(ticker)
+    return StoreState(tickers=state.tickers + [ticker], rows=np.append(state.rows, 0),
+                      generation=np.append(state.generation, 0),
+                      sums=np.concatenate([state.sums, np.zeros((1,) + state.sums.shape[1:])])), len(state.tickers)
+
+
+def update(frames, root=STORE_DIR):
+    """Apply {ticker: joined price/phase frame} batches to the store; return {ticker: UpdateSummary}."""
+    state = load_state(root)
+    os.makedirs(os.path.join(root, BARS_DIR), exist_ok=True)
+    summaries, stale_files = {}, []
+    for ticker, frame in frames.items():
+        state, i = _ticker_index(state, ticker)
+        stored = read_bars(root, ticker, state.rows[i], state.generation[i])
+        appended, revised, unchanged = classify(stored, frame_bars(frame))
+        summaries[ticker] = UpdateSummary(appended=len(appended), revised=len(revised), unchanged=unchanged)
+        if len(revised):
+            # Replay the ticker from its merged bars, written as a new file generation
+            bars = _merge(stored, revised, appended)
+            generation = int(state.generation[i]) + 1
+            bars.tofile(_bars_path(root, ticker, generation))
+            stale_files.append(_bars_path(root, ticker, state.generation[i]))
+            state.sums[i] = 0.0
+            accumulate(state.sums[i], bars)
+            state.rows[i], state.generation[i] = len(bars), generation
+        elif len(appended):
+            previous_close = float(stored["close"][-1]) if len(stored) else np.nan
+            # Unmap before the file is truncated and extended
+            del stored
+            with open(_bars_path(root, ticker, state.generation[i]), "ab") as f:
+                # Drop bars left over from an interrupted update before appending
+                f.truncate(int(state.rows[i]) * BAR_DTYPE.itemsize)
+                f.seek(0, os.SEEK_END)
+                appended.tofile(f)
+            accumulate(state.sums[i], appended, previous_close)
+            state.rows[i] += len(appended)
+    save_state(state, root)
+    for path in stale_files:
+        if os.path.exists(path):
+            os.remove(path)
+    return summaries
+
+
+def rebuild(frames, root=STORE_DIR):
+    """Replace the store with the full history in ``frames``."""
+    import shutil
+
+    if os.path.exists(os.path.join(root, STATE_FILE)):
+        os.remove(os.path.join(root, STATE_FILE))
+    shutil.rmtree(os.path.join(root, BARS_DIR), ignore_errors=True)
+    return update(frames, root)
+
+
+def store_sums(state, field, tickers=None):
+    """(count, total, total_sq) arrays (tickers x phases) of one field for ``tickers`` (default all)."""
+    tickers = state.tickers if tickers is None else tickers
+    sums = state.sums[[state.tickers.index(ticker) for ticker in tickers], FIELDS.index(field)]
+    return sums[:, 0], sums[:, 1], sums[:, 2]
+
+
+def store_stats(state, tickers=None):
+    """Per-phase return statistics and ANOVA (``phase_stats.PhaseStats``) plus the phase correlations.
+
+    Returns ``(phase_stats, correlations)``; ``correlations`` is a DataFrame
+    of ticker x Return/Volume correlations with the numeric phase.
+    """
+    tickers = state.tickers if tickers is None else tickers
+    correlations = pd.DataFrame({field: phase_correlation(*store_sums(state, field, tickers)) for field in FIELDS},
+                                index=pd.Index(tickers, name="ticker"))
+    return finish_stats(tickers, *store_sums(state, "Return", tickers)), correlations
+
+
+def recompute_sums(frames):
+    """{field: (count, total, total_sq)} of full-history frames, computed the way the analysis does.
+
+    Returns come from ``pct_change`` and every ticker is accumulated in one
+    ``phase_stats.sufficient_stats`` pass, like ``compute_phase_stats``.
+    """
+    from phase_stats import sufficient_stats
+
+    tickers = list(frames)
+    if not tickers:
+        return {field: (np.zeros((0, len(MOON_PHASES))),) * 3 for field in FIELDS}
+    codes = np.concatenate([phase_codes(frames[ticker]["Phase"]) for ticker in tickers])
+    ticker_codes = np.repeat(np.arange(len(tickers)), [len(frames[ticker]) for ticker in tickers])
+    values = {
+        "Return": np.concatenate([(frames[ticker]["Close"].astype(np.float64).pct_change() * 100).to_numpy()
+                                  for ticker in tickers]),
+        "Volume": np.concatenate([frames[ticker]["Volume"].to_numpy(dtype=np.float64) for ticker in tickers]),
+    }
+    return {field: sufficient_stats(values[field], codes, ticker_codes, len(tickers)) for field in FIELDS}
+
+
+def verify(frames, root=STORE_DIR):
+    """Compare the store with a full recompute of ``frames``; return the tickers that differ.
+
+    Counts, sums and sums of squares must match exactly, and so must the
+    per-phase statistics and ANOVA derived from them.
+    """
+    state = load_state(root)
+    expected = recompute_sums(frames)
+    mismatched, matched = [], []
+    for k, ticker in enumerate(frames):
+        same = ticker in state.tickers and all(
+            np.array_equal(state.sums[state.tickers.index(ticker), f, s], expected[field][s][k])
+            for f, field in enumerate(FIELDS) for s in range(len(STATISTICS)))
+        (matched if same else mismatched).append(ticker)
+    if matched:
+        rows = [list(frames).index(ticker) for ticker in matched]
+        full = finish_stats(matched, *(sums[rows] for sums in expected["Return"]))
+        derived, _ = store_stats(state, matched)
+        if not (derived.groups.equals(full.groups) and derived.anova.equals(full.anova)):
+            mismatched += matched
+    return mismatched
+
+
+def load_frames(settings, tickers, conn=None, since=None):
+    """Joined price/phase frames with float64 prices: the full history, or bars on/after ``since`` per ticker.
+
+    ``since`` maps tickers to a date; tickers without one are read in full.
+    The sql source only transfers the requested bars.
+    """
+    from analysis_backends import join_query, load_stock_lunar
+
+    since = since or {}
+    full = [ticker for ticker in tickers if since.get(ticker) is None]
+    frames = load_stock_lunar(full, source=settings.data_source, conn=conn) if full else {}
+    partial = [ticker for ticker in tickers if since.get(ticker) is not None]
+    if partial and settings.data_source == "sql":
+        from data_access import read_frame
+        from frame_schema import normalize_frame
+        from sql_upsert import detect_dialect
+
+        dialect = detect_dialect(conn)
+        for ticker in partial:
+            try:
+                frames[ticker] = read_frame(conn, join_query(ticker, dialect, since=True),
+                                            params=[since[ticker].isoformat()], convert=normalize_frame)
+            except Exception as e:
+                print(f"❌ Could not read {ticker}: {e}")
+    elif partial:
+        # Local sources are read in full and filtered
+        for ticker, frame in load_stock_lunar(partial, source=settings.data_source).items():
+            frames[ticker] = frame[frame["Date"] >= pd.Timestamp(since[ticker])]
+    return {ticker: frames[ticker] for ticker in tickers if ticker in frames}
+
+
+def revision_start(state, root=STORE_DIR, days=REVISION_DAYS):
+    """{ticker: first date to re-read}: REVISION_DAYS before each stored ticker's last bar."""
+    since = {}
+    for i, ticker in enumerate(state.tickers):
+        bars = read_bars(root, ticker, state.rows[i], state.generation[i])
+        if len(bars):
+            since[ticker] = (bars["date"][-1] - np.timedelta64(days, "D")).astype(object)
+    return since
+
+
+def _connect(settings, required=False):
+    """Database connection for the sql source, or ``required`` for writing results (None otherwise)."""
+    from lunar_analysis.database import connect
+
+    if required and not settings.conn_str:
+        print("❌ SQL_ODBC_CONNECTION_STRING is not set, nothing to write to.")
+        sys.exit(1)
+    if required or settings.data_source == "sql":
+        return connect(settings.conn_str)
+    return None
+
+
+def print_summaries(summaries):
+    for ticker, summary in summaries.items():
+        print(f"🔹 {ticker}: {summary.appended} appended, {summary.revised} revised, {summary.unchanged} unchanged")
+
+
+def main():
+    from lunar_analysis.settings import load_settings
+    from ticker_registry import load_tickers
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Apply new and revised bars")
+    update_parser.add_argument("--since", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                               help="Re-read bars from this date for every ticker "
+                                    "(default PHASE_STATS_REVISION_DAYS before each ticker's last bar)")
+    subparsers.add_parser("rebuild", help="Rebuild from the full history")
+    subparsers.add_parser("verify", help="Compare with a full recompute (exits 1 on a mismatch)")
+    subparsers.add_parser("show", help="Print the derived per-phase statistics and ANOVA")
+    write_parser = subparsers.add_parser("write-db", help="Write the derived results to Azure SQL")
+    write_parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"), help="AnalysisDate")
+    args = parser.parse_args()
+
+    settings = load_settings()
+    tickers = load_tickers()
+
+    if args.command == "show":
+        state = load_state()
+        phase_stats, correlations = store_stats(state)
+        print(phase_stats.groups[["count", "mean", "std"]])
+        print(phase_stats.anova.join(correlations))
+        return
+
+    if args.command == "write-db":
+        from lunar_analysis.database import verify_results_table
+        from result_writer import write_results
+
+        state = load_state()
+        stored = [ticker for ticker in tickers if ticker in state.tickers]
+        phase_stats, correlations = store_stats(state, stored)
+        conn = _connect(settings, required=True)
+        try:
+            verify_results_table(conn)
+            with span("write_results", tickers=len(stored), source="phase_stats_store"):
+                written = write_results(conn, args.date, phase_stats, correlations["Volume"], stored)
+        finally:
+            conn.close()
+        print(f"✅ LunarPhaseReturns: {written.phase_returns.inserted} inserted, "
+              f"{written.phase_returns.updated} updated, {written.phase_returns.unchanged} unchanged; "
+              f"StockLunarAnalysisResults: {written.analysis_results.inserted} inserted, "
+              f"{written.analysis_results.updated} updated, {written.analysis_results.unchanged} unchanged.")
+        return
+
+    conn = _connect(settings)
+    try:
+        if args.command == "update":
+            state = load_state()
+            since = ({ticker: args.since for ticker in tickers} if args.since
+                     else revision_start(state))
+            with span("load_batches", source=settings.data_source) as metrics:
+                frames = load_frames(settings, tickers, conn, since)
+                metrics["rows"] = sum(len(frame) for frame in frames.values())
+            print(f"📥 Read {metrics['rows']} bars for {len(frames)} tickers")
+            with span("update_phase_stats", tickers=len(frames)):
+                print_summaries(update(frames))
+        else:
+            with span("load_history", source=settings.data_source) as metrics:
+                frames = load_frames(settings, tickers, conn)
+                metrics["rows"] = sum(len(frame) for frame in frames.values())
+            if args.command == "rebuild":
+                with span("rebuild_phase_stats", tickers=len(frames)):
+                    print_summaries(rebuild(frames))
+            else:
+                with span("verify_phase_stats", tickers=len(frames)):
+                    mismatched = verify(frames)
+                if mismatched:
+                    print(f"❌ Store differs from a full recompute for: {', '.join(mismatched)} "
+                          f"(run the rebuild command)")
+                    sys.exit(1)
+                print(f"✅ Store matches a full recompute for {len(frames)} tickers")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
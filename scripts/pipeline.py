@@ -0,0 +1,360 @@
+"""Dependency-aware pipeline runner for the whole stock/lunar workflow.
+
+Stages are declared as a DAG and started as soon as their dependencies have
+succeeded, so independent stages (stock and moon extraction, the blob and SQL
+uploads) run in parallel:
+
+    extract_stock ──┬── upload_stock_blob
+                    ├── load_stock_sql ──┐
+    extract_moon ───┼── upload_moon_blob ├── phase_stats ── write_db
+                    └── load_moon_sql ───┴── analyze ──┬── render
+                                                       └── report
+
+The analysis runs as separate subcommands of azure_stock_lunar_analysis.py:
+``analyze`` computes and saves the results to the run directory, and
+``render`` and ``report`` each load them in parallel. ``phase_stats`` folds
+only the new and revised bars into the incremental per-phase statistics
+store (phase_stats_store.py), and ``write_db`` writes LunarPhaseReturns and
+StockLunarAnalysisResults from that store, so the database write does not
+wait for (or depend on) the full-history analysis.
+
+Each script stage runs in its own process with output captured to
+``<run dir>/<stage>.log``. Run state is saved after every stage, so
+``--resume`` retries only the stages that failed (or never ran) in the last
+run. Every run writes a per-stage wall-clock timeline to ``timeline.csv``,
+and the stage scripts record their spans (instrumentation.py) under the run
+id ``pipeline-<run id>``.
+
+``--offline`` swaps the network stages for local stand-ins: the stored CSVs
+instead of Yahoo Finance / USNO, no blob uploads, and a SQLite database in
+the run directory instead of Azure SQL. The SQL uploads fill the stand-in,
+and the analysis (``sql`` source, or PIPELINE_OFFLINE_SOURCE; SQL pushdown
+with ANALYSIS_SQL_PUSHDOWN=true), the phase statistics store and
+``write_db`` read from and write to it. The offline phase statistics store
+also lives in the run directory, so stand-in data never mixes into
+``data/phase_stats``.
+
+Usage:
+    python scripts/pipeline.py [--offline] [--resume [RUN_ID]] [--stages analyze render report]
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import argparse
+import csv
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from instrumentation import set_run_id, span
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RUNS_DIR = os.getenv("PIPELINE_RUNS_DIR", "data/pipeline")
+
+# Stages running at once, and automatic retries per stage within a run
+MAX_PARALLEL = 4
+RETRIES = 1
+RETRY_BACKOFF_SECONDS = 5.0
+
+LATEST_FILES_PATH = "latest_files.txt"
+LUNAR_FILE_PATH = "data/lunar_phases.csv"
+REPORT_PATH = "lunar_stock_analysis_report.md"
+CHART_PATHS = ["correlation_heatmap.png", "visualizations/returns_by_lunar_phase.png"]
+
+# run: callable(log_path) that raises on failure; offline_run: same, or None to skip offline
+Stage = namedtuple("Stage", ["name", "depends_on", "run", "offline_run"])
+
+DONE_STATUSES = ("succeeded", "skipped")
+
+
+class StageError(Exception):
+    """A pipeline stage failed."""
+
+
+def script_step(script, *args, env=None):
+    """Return a stage step that runs a script from this directory in a subprocess."""
+    def run(log_path):
+        command = [sys.executable, os.path.join(SCRIPTS_DIR, script), *args]
+        with open(log_path, "a") as log:
+            log.write(f"$ {' '.join(command)}\n")
+            log.flush()
+            result = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT,
+                                    env={**os.environ, **(env or {})})
+        if result.returncode != 0:
+            raise StageError(f"{script} exited with code {result.returncode} (see {log_path})")
+    return run
+
+
+def steps(*runs):
+    """Return a stage step that runs several steps in order."""
+    def run(log_path):
+        for step in runs:
+            step(log_path)
+    return run
+
+
+def check_stored_stock_files(log_path):
+    """Offline stand-in for stock extraction: the stored CSVs must exist."""
+    with open(LATEST_FILES_PATH, "r") as f:
+        paths = [line.strip() for line in f if line.strip()]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if not paths or missing:
+        raise StageError(f"Stored stock files missing: {missing or LATEST_FILES_PATH}")
+    with open(log_path, "a") as log:
+        log.write(f"Using {len(paths)} stored stock files from {LATEST_FILES_PATH}\n")
+
+
+def check_stored_lunar_file(log_path):
+    """Offline stand-in for moon extraction: the stored phases must exist."""
+    if not os.path.exists(LUNAR_FILE_PATH):
+        raise StageError(f"Stored lunar phases missing: {LUNAR_FILE_PATH}")
+    with open(log_path, "a") as log:
+        log.write(f"Using stored lunar phases from {LUNAR_FILE_PATH}\n")
+
+
+def collect_charts(log_path):
+    """Collect the rendered charts into visualizations/."""
+    os.makedirs("visualizations", exist_ok=True)
+    with open(log_path, "a") as log:
+        for path in CHART_PATHS:
+            if not os.path.exists(path):
+                log.write(f"⚠️ Chart not generated: {path}\n")
+                continue
+            target = os.path.join("visualizations", os.path.basename(path))
+            if os.path.abspath(path) != os.path.abspath(target):
+                shutil.copy2(path, target)
+            log.write(f"✅ Chart available: {target}\n")
+
+
+def publish_report(log_path):
+    """Copy the generated report into reports/."""
+    if not os.path.exists(REPORT_PATH):
+        raise StageError(f"Report file was not generated: {REPORT_PATH}")
+    os.makedirs("reports", exist_ok=True)
+    shutil.copy2(REPORT_PATH, os.path.join("reports", REPORT_PATH))
+    with open(log_path, "a") as log:
+        log.write(f"✅ Report published to reports/{REPORT_PATH}\n")
+
+
+def build_stages(run_dir):
+    """Declare the pipeline DAG."""
+    standin_db = os.path.join(run_dir, "standin.db")
+    results = ["--results", os.path.join(run_dir, "analysis_results.pkl")]
+    analysis = "azure_stock_lunar_analysis.py"
+    # Offline, every SQL stage runs against the SQLite stand-in
+    standin = {"SQL_ODBC_CONNECTION_STRING": f"sqlite:{os.path.abspath(standin_db)}"}
+    standin_analysis = {**standin, "ANALYSIS_DATA_SOURCE": os.getenv("PIPELINE_OFFLINE_SOURCE", "sql")}
+    # The offline statistics store lives in the run directory, next to the stand-in
+    standin_store = {**standin_analysis,
+                     "PHASE_STATS_STORE_DIR": os.path.abspath(os.path.join(run_dir, "phase_stats"))}
+    create_tables = script_step("sql_pushdown.py", "--sqlite", standin_db, "--create")
+    return [
+        Stage("extract_stock", [], script_step("extract_stock_data.py", "--incremental"),
+              check_stored_stock_files),
+        Stage("extract_moon", [], script_step("extract_moon_data.py"), check_stored_lunar_file),
+        Stage("upload_stock_blob", ["extract_stock"], script_step("upload_stock_blob.py"), None),
+        Stage("upload_moon_blob", ["extract_moon"], script_step("upload_moon_blob.py"), None),
+        Stage("load_stock_sql", ["extract_stock"], script_step("upload_stock_sql.py"),
+              steps(create_tables, script_step("upload_stock_sql.py", env=standin))),
+        Stage("load_moon_sql", ["extract_moon"], script_step("upload_moon_sql.py"),
+              steps(create_tables, script_step("upload_moon_sql.py", env=standin))),
+        Stage("analyze", ["load_stock_sql", "load_moon_sql"], script_step(analysis, "compute", *results),
+              script_step(analysis, "compute", *results, env=standin_analysis)),
+        Stage("phase_stats", ["load_stock_sql", "load_moon_sql"], script_step("phase_stats_store.py", "update"),
+              script_step("phase_stats_store.py", "update", env=standin_store)),
+        Stage("write_db", ["phase_stats"], script_step("phase_stats_store.py", "write-db"),
+              script_step("phase_stats_store.py", "write-db", env=standin_store)),
+        Stage("render", ["analyze"], steps(script_step(analysis, "render", *results), collect_charts),
+              steps(script_step(analysis, "render", *results, env=standin_analysis), collect_charts)),
+        Stage("report", ["analyze"], steps(script_step(analysis, "report", *results), publish_report),
+              steps(script_step(analysis, "report", *results, env=standin_analysis), publish_report)),
+    ]
+
+
+def _save_state(run_dir, state):
+    path = os.path.join(run_dir, "state.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _write_timeline(run_dir, state):
+    """Write the per-stage timeline (seconds from run start) to timeline.csv."""
+    rows = [dict(stage=name, **entry) for name, entry in state["stages"].items()]
+    with open(os.path.join(run_dir, "timeline.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["stage", "status", "attempts", "start_s", "end_s", "seconds", "error"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: row.get(key, "") for key in writer.fieldnames})
+
+
+def print_timeline(state, width=40):
+    """Print each stage's wall-clock span as a bar on a shared time axis."""
+    stages = state["stages"]
+    total = max([entry.get("end_s") or 0.0 for entry in stages.values()] + [1e-9])
+    for name, entry in stages.items():
+        if entry.get("start_s") is None:
+            bar = " " * width
+            seconds = "      -"
+        else:
+            start = min(int(entry["start_s"] / total * width), width - 1)
+            end = min(max(start + 1, int(entry["end_s"] / total * width)), width)
+            bar = " " * start + "█" * (end - start) + " " * (width - end)
+            seconds = f"{entry['seconds']:7.1f}"
+        print(f"⏱️ {name:<18}▕{bar}▏{seconds} s  {entry['status']}")
+
+
+def _latest_run_id():
+    if not os.path.isdir(RUNS_DIR):
+        return None
+    runs = sorted(d for d in os.listdir(RUNS_DIR) if os.path.exists(os.path.join(RUNS_DIR, d, "state.json")))
+    return runs[-1] if runs else None
+
+
+def _attempt(step, log_path, retries):
+    """Run a stage step with retries; return the number of attempts."""
+    for attempt in range(1, retries + 2):
+        try:
+            step(log_path)
+            return attempt
+        except Exception as e:
+            with open(log_path, "a") as log:
+                log.write(f"❌ Attempt {attempt} failed: {e}\n")
+            if attempt > retries:
+                raise StageError(str(e)) from e
+            time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+
+
+def run_pipeline(offline=False, resume=None, selected=None, max_parallel=MAX_PARALLEL, retries=RETRIES):
+    """Run (or resume) the pipeline; return the final state dict."""
+    run_id = resume or datetime.now().strftime("%Y%m%d-%H%M%S")
+    run_dir = os.path.join(RUNS_DIR, run_id)
+    # Stage scripts inherit the run id, so their spans land in the same metrics file
+    set_run_id(f"pipeline-{run_id}")
+    os.makedirs(run_dir, exist_ok=True)
+    stages = {stage.name: stage for stage in build_stages(run_dir)}
+
+    state_path = os.path.join(run_dir, "state.json")
+    if resume and os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            state = json.load(f)
+        offline = state.get("offline", offline)
+        print(f"🔁 Resuming run {run_id}: {sum(e['status'] in DONE_STATUSES for e in state['stages'].values())} "
+              f"stage(s) already done")
+    else:
+        state = {"run_id": run_id, "offline": offline, "stages": {}}
+
+    # Stages outside the selection count as done; done stages from a previous attempt are kept
+    for name in stages:
+        entry = state["stages"].get(name)
+        if selected and name not in selected:
+            state["stages"][name] = entry if entry and entry["status"] in DONE_STATUSES else {"status": "skipped"}
+        elif not entry or entry["status"] not in DONE_STATUSES:
+            state["stages"][name] = {"status": "pending", "attempts": 0}
+    _save_state(run_dir, state)
+
+    mode = "offline (local stand-ins)" if offline else "online"
+    print(f"🚀 Pipeline run {run_id} ({mode}), logs in {run_dir}")
+    run_start = time.perf_counter()
+    offset = max([entry.get("end_s") or 0.0 for entry in state["stages"].values()] + [0.0])
+
+    def status(name):
+        return state["stages"][name]["status"]
+
+    def run_stage(stage):
+        step = stage.offline_run if offline else stage.run
+        started = time.perf_counter()
+        try:
+            with span(stage.name, offline=offline) as metrics:
+                metrics["attempts"] = _attempt(step, os.path.join(run_dir, f"{stage.name}.log"), retries)
+            result = ("succeeded", metrics["attempts"], None)
+        except StageError as e:
+            result = ("failed", retries + 1, str(e))
+        return stage.name, started, time.perf_counter(), result
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while True:
+            progressed = False
+
+            # Stages whose dependencies failed can never run
+            for name, stage in stages.items():
+                if status(name) == "pending" and any(status(dep) in ("failed", "blocked") for dep in stage.depends_on):
+                    state["stages"][name] = {"status": "blocked", "attempts": 0}
+                    progressed = True
+                    print(f"⛔ {name} blocked by a failed dependency")
+
+            for name, stage in stages.items():
+                if status(name) != "pending" or not all(status(dep) in DONE_STATUSES for dep in stage.depends_on):
+                    continue
+                progressed = True
+                if offline and stage.offline_run is None:
+                    state["stages"][name] = {"status": "skipped", "attempts": 0}
+                    print(f"⏭️ {name} skipped (offline)")
+                    continue
+                state["stages"][name]["status"] = "running"
+                print(f"▶️ {name} started")
+                running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                if progressed:
+                    # Offline skips can make more stages ready; scan again
+                    continue
+                if any(status(name) == "pending" for name in stages):
+                    raise StageError("Pipeline stalled: pending stages have unsatisfiable dependencies")
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, started, ended, (result, attempts, error) = future.result()
+                del running[future]
+                state["stages"][name] = {
+                    "status": result,
+                    "attempts": attempts,
+                    "start_s": round(offset + started - run_start, 3),
+                    "end_s": round(offset + ended - run_start, 3),
+                    "seconds": round(ended - started, 3),
+                    "error": error,
+                }
+                icon = "✅" if result == "succeeded" else "❌"
+                print(f"{icon} {name} {result} in {ended - started:.1f} s" + (f": {error}" if error else ""))
+            _save_state(run_dir, state)
+
+    _save_state(run_dir, state)
+    _write_timeline(run_dir, state)
+    print(f"\n📊 Timeline ({run_dir}/timeline.csv):")
+    print_timeline(state)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the stock/lunar pipeline as a dependency graph.")
+    parser.add_argument("--offline", action="store_true", default=os.getenv("PIPELINE_OFFLINE", "false").lower() == "true",
+                        help="Use local stand-ins instead of Yahoo Finance, USNO, Blob Storage and Azure SQL")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                        help="Retry the failed or unfinished stages of a previous run (default: the latest)")
+    parser.add_argument("--stages", nargs="+", metavar="STAGE",
+                        help="Only run these stages (their dependencies must already be satisfied)")
+    parser.add_argument("--max-parallel", type=int, default=MAX_PARALLEL, help="Stages running at once")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Automatic retries per failed stage")
+    args = parser.parse_args()
+
+    resume = _latest_run_id() if args.resume == "latest" else args.resume
+    if args.resume and not resume:
+        parser.error(f"no previous run found in {RUNS_DIR}")
+
+    state = run_pipeline(offline=args.offline, resume=resume, selected=args.stages,
+                         max_parallel=args.max_parallel, retries=args.retries)
+    failed = [name for name, entry in state["stages"].items() if entry["status"] in ("failed", "blocked")]
+    if failed:
+        print(f"\n❌ Failed or blocked: {', '.join(failed)}. Rerun with --resume to retry them.")
+        sys.exit(1)
+    print("\n🎉 Pipeline completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
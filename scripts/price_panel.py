@@ -0,0 +1,74 @@
+"""Date-aligned wide price panel for cross-ticker analysis.
+
+The panel is keyed by the union of all tickers' trading dates and stores the
+selected fields as one contiguous float64 array of shape
+(dates, tickers, fields), with NaN where a ticker has no bar on a date. The
+lunar phase is joined once onto the date axis, so every ticker is correlated
+against the phase of the same calendar day.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from phase_stats import phase_codes
+
+PANEL_FIELDS = ("Close", "Volume", "Return")
+
+PricePanel = namedtuple("PricePanel", ["dates", "tickers", "fields", "values", "phase"])
+
+
+def build_panel(stock_data, fields=PANEL_FIELDS):
+    """Build a ``PricePanel`` from {ticker: DataFrame with Date, Phase and ``fields``}.
+
+    ``phase`` holds the numeric phase (0-7, MOON_PHASES order) per date, or -1
+    where no phase is known.
+    """
+    tickers = list(stock_data)
+    fields = list(fields)
+    frames = [stock_data[ticker] for ticker in tickers]
+    date_arrays = [df["Date"].to_numpy(dtype="datetime64[ns]") for df in frames]
+
+    dates = np.unique(np.concatenate(date_arrays)) if frames else np.empty(0, dtype="datetime64[ns]")
+    values = np.full((len(dates), len(tickers), len(fields)), np.nan)
+    phase = np.full(len(dates), -1, dtype=np.int8)
+
+    for i, (df, ticker_dates) in enumerate(zip(frames, date_arrays)):
+        rows = np.searchsorted(dates, ticker_dates)
+        values[rows, i, :] = df[fields].to_numpy(dtype=np.float64)
+        codes = phase_codes(df["Phase"])
+        known = codes >= 0
+        phase[rows[known]] = codes[known]
+
+    return PricePanel(dates=pd.DatetimeIndex(dates, name="Date"), tickers=tickers, fields=fields,
+                      values=values, phase=phase)
+
+
+def panel_frame(panel):
+    """Flatten the panel to a wide DataFrame of {ticker}_{field} columns plus PhaseNumeric."""
+    columns = [f"{ticker}_{field}" for ticker in panel.tickers for field in panel.fields]
+    flat = panel.values.reshape(len(panel.dates), len(columns))
+    frame = pd.DataFrame(flat, index=panel.dates, columns=columns)
+    frame["PhaseNumeric"] = np.where(panel.phase >= 0, panel.phase, np.nan)
+    return frame
+
+
+def phase_correlations(panel):
+    """Pearson correlation of every (ticker, field) series with the numeric phase.
+
+    Uses pairwise-complete observations like ``DataFrame.corr``. Returns a
+    DataFrame indexed by ticker with one column per field.
+    """
+    x = panel.values
+    y = np.where(panel.phase >= 0, panel.phase, np.nan).astype(np.float64)[:, None, None]
+    valid = ~np.isnan(x) & ~np.isnan(y)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = valid.sum(axis=0)
+        x_mean = np.where(valid, x, 0.0).sum(axis=0) / n
+        y_mean = np.where(valid, y, 0.0).sum(axis=0) / n
+        dx = np.where(valid, x - x_mean, 0.0)
+        dy = np.where(valid, y - y_mean, 0.0)
+        corr = (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+
+    return pd.DataFrame(corr, index=pd.Index(panel.tickers, name="ticker"), columns=panel.fields)
@@ -0,0 +1,215 @@
+"""Permutation and bootstrap significance for returns by lunar phase.
+
+Distribution-free companions to the F-test in phase_stats.py, which assumes
+normal, homoscedastic daily returns:
+
+- permutation p-values for the ANOVA F statistic and for each phase's mean
+  return (deviation from the overall mean), from shuffling the phase labels
+- stratified bootstrap confidence intervals for each phase's mean return and
+  for the F statistic, from resampling returns within each phase
+
+Shuffled labels are generated as a (permutations x observations) matrix per
+batch and all group sums are taken with one ``np.bincount``, so thousands of
+resamples cost a few array passes. Tickers are sharded across worker
+processes (sharding.py); each ticker draws from its own child of one
+``SeedSequence``, so results are reproducible for a given seed regardless
+of the worker count.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from lunar_phase_engine import MOON_PHASES
+from phase_stats import anova_f, phase_codes
+from sharding import map_items
+
+N_PERMUTATIONS = 10000
+N_BOOTSTRAP = 2000
+CONFIDENCE = 0.95
+
+# Resamples generated per batch (bounds the label matrix to batch x observations)
+BATCH_SIZE = 500
+
+ResamplingResult = namedtuple("ResamplingResult", ["groups", "anova"])
+
+_N_PHASES = len(MOON_PHASES)
+
+
+def _between_ss(total, count, grand_total, n):
+    """Between-group sum of squares from group totals (groups on the last axis)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total * total / count, 0.0).sum(axis=-1) - grand_total ** 2 / n
+
+
+def permutation_test(returns, codes, n_permutations, rng, batch_size=BATCH_SIZE):
+    """Permutation p-values for the F statistic and each phase's mean deviation.
+
+    ``codes`` are phase codes 0-7 for valid ``returns``. Group sizes and the
+    total sum of squares do not change under relabelling, so each permutation
+    only needs its group totals. Returns (F p-value, per-phase p-values).
+    """
+    n = len(returns)
+    count = np.bincount(codes, minlength=_N_PHASES).astype(np.float64)
+    total = np.bincount(codes, weights=returns, minlength=_N_PHASES)
+    grand_total = returns.sum()
+    ss_total = (returns * returns).sum() - grand_total ** 2 / n
+    df_between = (count > 0).sum() - 1
+    df_within = n - (count > 0).sum()
+
+    def f_from_between(ss_between):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (ss_between / df_between) / ((ss_total - ss_between) / df_within)
+
+    f_observed = f_from_between(_between_ss(total, count, grand_total, n))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        deviation_observed = np.abs(total / count - grand_total / n)
+
+    f_exceed = 0
+    deviation_exceed = np.zeros(_N_PHASES)
+    for start in range(0, n_permutations, batch_size):
+        size = min(batch_size, n_permutations - start)
+        labels = rng.permuted(np.tile(codes, (size, 1)), axis=1)
+        index = (np.arange(size)[:, None] * _N_PHASES + labels).ravel()
+        perm_total = np.bincount(index, weights=np.tile(returns, size),
+                                 minlength=size * _N_PHASES).reshape(size, _N_PHASES)
+
+        f_exceed += np.count_nonzero(f_from_between(_between_ss(perm_total, count, grand_total, n))
+                                     >= f_observed * (1 - 1e-12))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            deviation = np.abs(perm_total / count - grand_total / n)
+        deviation_exceed += (deviation >= deviation_observed * (1 - 1e-12)).sum(axis=0)
+
+    f_p_value = (1 + f_exceed) / (1 + n_permutations) if np.isfinite(f_observed) else np.nan
+    phase_p_values = np.where(count > 0, (1 + deviation_exceed) / (1 + n_permutations), np.nan)
+    return f_p_value, phase_p_values
+
+
+def bootstrap_sums(returns, codes, n_bootstrap, rng, batch_size=BATCH_SIZE):
+    """Stratified bootstrap of per-phase sums and sums of squares.
+
+    Returns within each phase are resampled with replacement, keeping group
+    sizes fixed. Returns (count, total, total_sq); the latter two have shape
+    (n_bootstrap, 8).
+    """
+    count = np.bincount(codes, minlength=_N_PHASES).astype(np.float64)
+    total = np.zeros((n_bootstrap, _N_PHASES))
+    total_sq = np.zeros((n_bootstrap, _N_PHASES))
+    for phase in np.flatnonzero(count):
+        values = returns[codes == phase]
+        for start in range(0, n_bootstrap, batch_size):
+            size = min(batch_size, n_bootstrap - start)
+            sample = values[rng.integers(0, len(values), size=(size, len(values)))]
+            total[start:start + size, phase] = sample.sum(axis=1)
+            total_sq[start:start + size, phase] = (sample * sample).sum(axis=1)
+    return count, total, total_sq
+
+
+def resample_ticker(returns, codes, n_permutations, n_bootstrap, confidence, seed, batch_size=BATCH_SIZE):
+    """Permutation p-values and bootstrap intervals for one ticker.
+
+    Returns a dict of per-phase arrays (count, mean, mean_ci_low,
+    mean_ci_high, phase_p_value) and ANOVA scalars (F, perm_p_value,
+    F_ci_low, F_ci_high).
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(returns) & (codes >= 0)
+    returns = returns[valid]
+    codes = codes[valid].astype(np.intp)
+    rng = np.random.default_rng(seed)
+
+    count = np.bincount(codes, minlength=_N_PHASES).astype(np.float64)
+    total = np.bincount(codes, weights=returns, minlength=_N_PHASES)
+    total_sq = np.bincount(codes, weights=returns * returns, minlength=_N_PHASES)
+    f_observed = anova_f(count, total, total_sq)[0]
+
+    f_p_value, phase_p_values = permutation_test(returns, codes, n_permutations, rng, batch_size)
+
+    tail = 100 * (1 - confidence) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        if n_bootstrap > 0:
+            _, boot_total, boot_sq = bootstrap_sums(returns, codes, n_bootstrap, rng, batch_size)
+            boot_mean = np.where(count > 0, boot_total / count, np.nan)
+            mean_ci = np.percentile(boot_mean, [tail, 100 - tail], axis=0)
+            f_ci = np.nanpercentile(anova_f(count, boot_total, boot_sq)[0], [tail, 100 - tail])
+        else:
+            mean_ci = np.full((2, _N_PHASES), np.nan)
+            f_ci = np.full(2, np.nan)
+
+    return {
+        "count": count,
+        "mean": mean,
+        "mean_ci_low": mean_ci[0],
+        "mean_ci_high": mean_ci[1],
+        "phase_p_value": phase_p_values,
+        "F": float(f_observed),
+        "perm_p_value": f_p_value,
+        "F_ci_low": f_ci[0],
+        "F_ci_high": f_ci[1],
+    }
+
+
+def _resample_task(args):
+    return resample_ticker(*args)
+
+
+def resample_tickers(stock_data, tickers=None, value_column="Return", n_permutations=N_PERMUTATIONS,
+                     n_bootstrap=N_BOOTSTRAP, confidence=CONFIDENCE, seed=None, max_workers=None,
+                     batch_size=BATCH_SIZE):
+    """Per-ticker resampling results {ticker: dict of arrays} for ``tickers`` (default: all).
+
+    Each ticker draws from the child of ``seed`` at its position in
+    ``stock_data``, so resampling a subset gives the same results as the full
+    run (the result cache resamples only tickers whose data changed).
+    """
+    order = list(stock_data)
+    seeds = dict(zip(order, np.random.SeedSequence(seed).spawn(len(order))))
+    tickers = order if tickers is None else list(tickers)
+    tasks = [
+        (stock_data[ticker][value_column].to_numpy(dtype=np.float64),
+         phase_codes(stock_data[ticker]["Phase"]),
+         n_permutations, n_bootstrap, confidence, seeds[ticker], batch_size)
+        for ticker in tickers
+    ]
+    return dict(zip(tickers, map_items(_resample_task, tasks, max_workers=max_workers)))
+
+
+def resample_phase_stats(stock_data, value_column="Return", n_permutations=N_PERMUTATIONS,
+                         n_bootstrap=N_BOOTSTRAP, confidence=CONFIDENCE, seed=None,
+                         max_workers=None, batch_size=BATCH_SIZE):
+    """Permutation and bootstrap statistics for {ticker: DataFrame}.
+
+    Returns a ``ResamplingResult`` (see ``combine_resampled``).
+    """
+    results = resample_tickers(stock_data, value_column=value_column, n_permutations=n_permutations,
+                               n_bootstrap=n_bootstrap, confidence=confidence, seed=seed,
+                               max_workers=max_workers, batch_size=batch_size)
+    return combine_resampled(list(stock_data), [results[ticker] for ticker in stock_data])
+
+
+def combine_resampled(tickers, results):
+    """Build a ``ResamplingResult`` from per-ticker results (in ``tickers`` order) of:
+
+    - groups: DataFrame indexed by (ticker, Phase) with mean, mean_ci_low,
+      mean_ci_high and perm_p_value; empty phases are omitted
+    - anova: DataFrame indexed by ticker with F, perm_p_value, F_ci_low and
+      F_ci_high
+    """
+    def stacked(key):
+        return np.concatenate([r[key] for r in results]) if results else np.empty(0)
+
+    index = pd.MultiIndex.from_product([tickers, list(MOON_PHASES)], names=["ticker", "Phase"])
+    groups = pd.DataFrame({
+        "count": stacked("count"),
+        "mean": stacked("mean"),
+        "mean_ci_low": stacked("mean_ci_low"),
+        "mean_ci_high": stacked("mean_ci_high"),
+        "perm_p_value": stacked("phase_p_value"),
+    }, index=index)
+    groups = groups[groups["count"] > 0].drop(columns="count")
+
+    anova = pd.DataFrame(
+        [{key: r[key] for key in ("F", "perm_p_value", "F_ci_low", "F_ci_high")} for r in results],
+        index=pd.Index(tickers, name="ticker"), columns=["F", "perm_p_value", "F_ci_low", "F_ci_high"])
+    return ResamplingResult(groups=groups, anova=anova)
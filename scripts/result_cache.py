@@ -0,0 +1,261 @@
+"""Content-addressed local cache for analysis results and artifacts.
+
+Every entry is stored under a key that is a SHA-256 digest of everything
+that determines it: the input data (file contents or database table
+fingerprints), the analysis settings and the source code of the modules
+that produce it. The analysis caches:
+
+- per-ticker joined price/phase frames and resampling results, so a change
+  to one ticker only reloads and resamples that ticker
+- the whole ``AnalysisResult``, so an unchanged rerun skips loading and
+  statistics entirely
+- the charts and the markdown report, keyed on the data they are drawn from
+
+Entries are plain files under ``CACHE_DIR/objects/`` (pickles for Python
+objects, copies for artifacts), written to a temporary file and renamed into
+place. A hit touches the file's modification time and ``prune`` evicts the
+least recently used entries once the cache exceeds CACHE_MAX_BYTES. Content
+digests of input files are remembered by (size, modification time) in
+``file_digests.json``, so unchanged files are not re-read.
+
+Usage:
+    python scripts/result_cache.py            # entries and size
+    python scripts/result_cache.py --prune    # evict down to ANALYSIS_CACHE_MAX_MB
+    python scripts/result_cache.py --clear    # remove every entry
+"""
+import argparse
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+
+CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", "data/cache")
+CACHE_MAX_BYTES = int(float(os.getenv("ANALYSIS_CACHE_MAX_MB", "512")) * 2 ** 20)
+
+OBJECTS_DIR = "objects"
+FILE_DIGESTS = "file_digests.json"
+
+_CODE_VERSIONS = {}
+
+
+def _update(digest, value):
+    """Feed a value into a hash: plain Python values, NumPy arrays and pandas objects."""
+    if isinstance(value, bytes):
+        digest.update(b"bytes%d:" % len(value))
+        digest.update(value)
+    elif isinstance(value, str):
+        digest.update(b"str")
+        _update(digest, value.encode())
+    elif value is None or isinstance(value, (bool, int, float)):
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, np.generic):
+        _update(digest, value.item())
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"seq%d:" % len(value))
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(b"dict%d:" % len(value))
+        for key in sorted(value, key=repr):
+            _update(digest, key)
+            _update(digest, value[key])
+    elif isinstance(value, np.ndarray):
+        if value.dtype == object:
+            _update(digest, ("object array", value.shape, value.ravel().tolist()))
+        else:
+            _update(digest, ("array", value.dtype.str, value.shape))
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif type(value).__module__.startswith("pandas"):
+        import pandas as pd
+
+        names = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        dtypes = [str(dtype) for dtype in value.dtypes] if isinstance(value, pd.DataFrame) else [str(value.dtype)]
+        _update(digest, (type(value).__name__, names, dtypes,
+                         pd.util.hash_pandas_object(value, index=not isinstance(value, pd.Index)).to_numpy()))
+    else:
+        raise TypeError(f"Cannot hash {type(value).__name__} for a cache key")
+
+
+def digest(*parts):
+    """SHA-256 hex digest of the given values (see ``_update`` for the supported types)."""
+    h = hashlib.sha256()
+    _update(h, parts)
+    return h.hexdigest()
+
+
+def code_version(*modules):
+    """Digest of the source files of the named modules (without importing them)."""
+    if modules not in _CODE_VERSIONS:
+        h = hashlib.sha256()
+        for name in modules:
+            spec = importlib.util.find_spec(name)
+            h.update(name.encode())
+            if spec is not None and spec.origin and os.path.isfile(spec.origin):
+                with open(spec.origin, "rb") as f:
+                    h.update(f.read())
+        _CODE_VERSIONS[modules] = h.hexdigest()
+    return _CODE_VERSIONS[modules]
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_atomic(path, write):
+    """Call ``write(file)`` on a temporary file next to ``path`` and rename it into place."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def file_digests(paths, root=CACHE_DIR):
+    """Content digests {path: digest} of existing files (missing files map to None).
+
+    Files whose size and modification time match the remembered ones are not
+    read again.
+    """
+    index_path = os.path.join(root, FILE_DIGESTS)
+    try:
+        with open(index_path, "r") as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        known = {}
+
+    digests, changed = {}, False
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            digests[path] = None
+            continue
+        key = os.path.abspath(path)
+        entry = known.get(key)
+        if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+            entry = [stat.st_size, stat.st_mtime_ns, _sha256_file(path)]
+            known[key] = entry
+            changed = True
+        digests[path] = entry[2]
+
+    if changed:
+        _write_atomic(index_path, lambda f: f.write(json.dumps(known).encode()))
+    return digests
+
+
+def entry_path(root, key, suffix=".pkl"):
+    """Where the entry for ``key`` lives."""
+    return os.path.join(root, OBJECTS_DIR, key[:2], key + suffix)
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def get_object(root, key, default=None):
+    """The cached object for ``key``, or ``default`` on a miss (or an unreadable entry)."""
+    path = entry_path(root, key)
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except FileNotFoundError:
+        return default
+    except Exception:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return default
+    _touch(path)
+    return value
+
+
+def put_object(root, key, value):
+    """Cache ``value`` under ``key``."""
+    _write_atomic(entry_path(root, key), lambda f: pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def get_file(root, key, destination):
+    """Copy the cached artifact for ``key`` to ``destination`` (atomically); False on a miss."""
+    path = entry_path(root, key, os.path.splitext(destination)[1])
+    try:
+        with open(path, "rb") as source:
+            _write_atomic(destination, lambda f: shutil.copyfileobj(source, f))
+    except FileNotFoundError:
+        return False
+    _touch(path)
+    return True
+
+
+def put_file(root, key, source):
+    """Cache a copy of the artifact at ``source`` under ``key``."""
+    with open(source, "rb") as f:
+        _write_atomic(entry_path(root, key, os.path.splitext(source)[1]), lambda out: shutil.copyfileobj(f, out))
+
+
+def _entries(root):
+    """(modification time, size, path) of every entry."""
+    entries = []
+    for directory, _, names in os.walk(os.path.join(root, OBJECTS_DIR)):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+    return entries
+
+
+def prune(root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """Evict least recently used entries until the cache holds at most ``max_bytes``; return the bytes freed."""
+    entries = sorted(_entries(root))
+    excess = sum(size for _, size, _ in entries) - max_bytes
+    freed = 0
+    for _, size, path in entries:
+        if freed >= excess:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=CACHE_DIR, help="Cache directory (default ANALYSIS_CACHE_DIR)")
+    parser.add_argument("--prune", action="store_true", help="Evict down to ANALYSIS_CACHE_MAX_MB")
+    parser.add_argument("--clear", action="store_true", help="Remove every entry")
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(args.root, ignore_errors=True)
+        print(f"🧹 Cleared {args.root}")
+        return
+    if args.prune:
+        print(f"🧹 Evicted {prune(args.root) / 2 ** 20:,.1f} MiB")
+    entries = _entries(args.root)
+    print(f"📦 {len(entries)} entries, {sum(size for _, size, _ in entries) / 2 ** 20:,.1f} MiB "
+          f"in {args.root} (limit {CACHE_MAX_BYTES / 2 ** 20:,.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Batched writes of the analysis results to Azure SQL.
+
+Collects the per-phase returns (LunarPhaseReturns) and per-ticker ANOVA
+results (StockLunarAnalysisResults) for all tickers and writes them with two
+staged, parameterized upserts (sql_upsert.py) committed as one transaction:
+
+- LunarPhaseReturns keyed on (AnalysisDate, ETF, LunarPhase), so rerunning an
+  analysis on the same day replaces that day's rows instead of duplicating them
+- StockLunarAnalysisResults keyed on ETF (one current result per ticker)
+
+Works against SQL Server and SQLite like the upload scripts.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from sql_upsert import bulk_upsert, detect_dialect
+
+ResultWriteSummary = namedtuple("ResultWriteSummary", ["phase_returns", "analysis_results"])
+
+SIGNIFICANCE_LEVEL = 0.05
+
+PHASE_RETURNS_KEY = ["AnalysisDate", "ETF", "LunarPhase"]
+PHASE_RETURNS_VALUES = ["AverageReturn", "Count"]
+ANALYSIS_RESULTS_KEY = ["ETF"]
+ANALYSIS_RESULTS_VALUES = ["AnalysisDate", "Correlation_Volume", "ANOVA_F_Statistic", "ANOVA_P_Value", "Conclusion"]
+
+_CREATE_TABLES = {
+    "mssql": [
+        """
+        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES
+                       WHERE TABLE_NAME = 'LunarPhaseReturns')
+        CREATE TABLE LunarPhaseReturns (
+            ID INT IDENTITY(1,1) PRIMARY KEY,
+            AnalysisDate DATE,
+            ETF VARCHAR(10),
+            LunarPhase VARCHAR(50),
+            AverageReturn FLOAT,
+            Count INT
+        )
+        """,
+        """
+        IF NOT EXISTS (SELECT * FROM INFORMATION_SCHEMA.TABLES
+                       WHERE TABLE_NAME = 'StockLunarAnalysisResults')
+        CREATE TABLE StockLunarAnalysisResults (
+            ID INT IDENTITY(1,1) PRIMARY KEY,
+            AnalysisDate DATE,
+            ETF VARCHAR(10),
+            Correlation_Volume FLOAT,
+            ANOVA_F_Statistic FLOAT,
+            ANOVA_P_Value FLOAT,
+            Conclusion VARCHAR(100)
+        )
+        """,
+    ],
+    "sqlite": [
+        """
+        CREATE TABLE IF NOT EXISTS LunarPhaseReturns (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            AnalysisDate DATE,
+            ETF VARCHAR(10),
+            LunarPhase VARCHAR(50),
+            AverageReturn FLOAT,
+            Count INT,
+            UNIQUE (AnalysisDate, ETF, LunarPhase)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS StockLunarAnalysisResults (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            AnalysisDate DATE,
+            ETF VARCHAR(10) UNIQUE,
+            Correlation_Volume FLOAT,
+            ANOVA_F_Statistic FLOAT,
+            ANOVA_P_Value FLOAT,
+            Conclusion VARCHAR(100)
+        )
+        """,
+    ],
+}
+
+
+def _sql_value(value):
+    """Convert NumPy scalars to plain Python values (NaN becomes NULL)."""
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def conclusion(p_value):
+    """Plain-language conclusion for an ANOVA p-value."""
+    if p_value < SIGNIFICANCE_LEVEL:
+        return "Significant returns variation by lunar phase"
+    return "No significant returns variation by lunar phase"
+
+
+def phase_return_rows(analysis_date, phase_stats, tickers):
+    """Rows for LunarPhaseReturns, ordered as key + value columns."""
+    groups = phase_stats.groups.loc[phase_stats.groups.index.get_level_values("ticker").isin(tickers)]
+    return [
+        (analysis_date, ticker, phase, _sql_value(mean), _sql_value(count))
+        for (ticker, phase), mean, count in zip(groups.index, groups["mean"], groups["count"])
+    ]
+
+
+def analysis_result_rows(analysis_date, phase_stats, volume_correlation, tickers):
+    """Rows for StockLunarAnalysisResults, ordered as key + value columns."""
+    rows = []
+    for ticker in tickers:
+        anova = phase_stats.anova.loc[ticker]
+        rows.append((ticker, analysis_date, _sql_value(volume_correlation[ticker]),
+                     _sql_value(anova["F"]), _sql_value(anova["p_value"]), conclusion(anova["p_value"])))
+    return rows
+
+
+def ensure_result_tables(conn):
+    """Create the result tables if they do not exist yet."""
+    cursor = conn.cursor()
+    try:
+        for statement in _CREATE_TABLES[detect_dialect(conn)]:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def write_results(conn, analysis_date, phase_stats, volume_correlation, tickers):
+    """Upsert per-phase returns and per-ticker ANOVA results in one transaction.
+
+    ``phase_stats`` is a ``phase_stats.PhaseStats`` and ``volume_correlation``
+    maps ticker to its volume/phase correlation. Returns a
+    ``ResultWriteSummary`` of the two ``UpsertResult`` counts.
+    """
+    ensure_result_tables(conn)
+    tickers = [ticker for ticker in tickers if ticker in phase_stats.anova.index]
+    try:
+        phase_returns = bulk_upsert(conn, "LunarPhaseReturns", PHASE_RETURNS_KEY, PHASE_RETURNS_VALUES,
+                                    phase_return_rows(analysis_date, phase_stats, tickers), commit=False)
+        analysis_results = bulk_upsert(conn, "StockLunarAnalysisResults", ANALYSIS_RESULTS_KEY,
+                                       ANALYSIS_RESULTS_VALUES,
+                                       analysis_result_rows(analysis_date, phase_stats, volume_correlation, tickers),
+                                       commit=False)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return ResultWriteSummary(phase_returns=phase_returns, analysis_results=analysis_results)
@@ -0,0 +1,80 @@
+"""Shard per-ticker work across a process pool and merge the results.
+
+Items (usually tickers) are split into contiguous shards, a few per worker so
+slow shards do not leave cores idle, and each shard is processed by one call
+in a worker process. Results come back in item order. Workers are forked
+where the platform allows it, so data already loaded in the parent is
+inherited. Where they are spawned (Windows, macOS) each worker re-imports
+the calling script, so scripts must call ``map_shards`` from under an
+``if __name__ == "__main__":`` guard.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
+import os
+
+# Shards per worker (smaller shards balance uneven per-ticker work)
+SHARDS_PER_WORKER = 4
+
+
+def split_shards(items, n_shards):
+    """Split a list into at most ``n_shards`` contiguous, near-equal shards."""
+    items = list(items)
+    n_shards = max(1, min(n_shards, len(items)))
+    size, extra = divmod(len(items), n_shards)
+    shards = []
+    start = 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+def default_workers():
+    """Worker processes to use: SHARD_MAX_WORKERS, or one per CPU."""
+    return int(os.getenv("SHARD_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+
+def pool_context():
+    """Prefer fork so workers inherit the parent's state instead of re-importing the calling script."""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def map_shards(shard_func, items, max_workers=None, n_shards=None):
+    """Call ``shard_func(shard)`` for each shard of ``items``; return results in shard order.
+
+    ``shard_func`` must be a module-level function (or a ``functools.partial``
+    of one). ``max_workers`` defaults to ``default_workers()``. Runs
+    in-process when only one worker is needed.
+    """
+    items = list(items)
+    if not items:
+        return []
+    workers = max(1, min(max_workers or default_workers(), len(items)))
+    if workers == 1:
+        return [shard_func(items)]
+
+    shards = split_shards(items, n_shards or workers * SHARDS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+        return list(pool.map(shard_func, shards))
+
+
+def _apply_each(func, shard):
+    return [func(item) for item in shard]
+
+
+def map_items(func, items, max_workers=None, n_shards=None):
+    """Call ``func(item)`` for every item across sharded workers; return results in item order."""
+    shard_results = map_shards(partial(_apply_each, func), items, max_workers, n_shards)
+    return [result for shard in shard_results for result in shard]
+
+
+def merge_dicts(dicts):
+    """Merge shard results of {key: value} into one dict, keeping shard order."""
+    merged = {}
+    for result in dicts:
+        merged.update(result)
+    return merged
@@ -0,0 +1,208 @@
+"""SQL pushdown of daily returns and per-phase aggregates.
+
+Instead of pulling every price row into pandas, the database joins each
+ticker's prices with the lunar phases, computes daily returns with ``LAG``
+and returns only per-(ticker, phase) sufficient statistics: the count, sum
+and sum of squares of the return, close and volume. The Python statistics
+layer (phase_stats.py) finishes means, standard deviations, ANOVA and the
+correlations with the phase from those, so a ticker costs 8 rows of
+transfer instead of one row per trading day.
+
+Runs on SQL Server and on SQLite (3.25+ for window functions), so the mode
+can be exercised against a local stand-in database:
+
+    python scripts/sql_pushdown.py --sqlite data/standin.db --build
+    python scripts/sql_pushdown.py --sqlite data/standin.db
+    python scripts/sql_pushdown.py --sqlite data/standin.db --create   # empty tables for the SQL uploads
+    python scripts/sql_pushdown.py --ddl        # index DDL for the registry tickers
+"""
+from collections import namedtuple
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from data_access import read_frame
+from lunar_phase_engine import MOON_PHASES
+from phase_stats import finish_stats, phase_codes, phase_correlation
+from sql_upsert import detect_dialect
+
+# Tickers aggregated per query (bounds the size of the UNION ALL)
+TICKERS_PER_QUERY = 100
+
+PUSHDOWN_FIELDS = ("Return", "Close", "Volume")
+
+PushdownStats = namedtuple("PushdownStats", ["phase_stats", "correlations", "rows"])
+
+
+def _date_expr(column, dialect):
+    return f"date({column})" if dialect == "sqlite" else f"CAST({column} AS DATE)"
+
+
+def pushdown_query(tickers, dialect="mssql"):
+    """Build the per-(ticker, phase) aggregate query for a batch of tickers."""
+    joined = "\n            UNION ALL\n".join(
+        f"""            SELECT '{ticker}' AS ticker, s.[Date] AS trade_date, l.[Phase] AS phase,
+                   CAST(s.[Close] AS FLOAT) AS close_price, CAST(s.[Volume] AS FLOAT) AS volume
+            FROM {ticker}_StockPrices s
+            JOIN LunarPhases l ON {_date_expr('s.[Date]', dialect)} = {_date_expr('l.[Date]', dialect)}"""
+        for ticker in tickers
+    )
+    return f"""
+        WITH joined AS (
+{joined}
+        ),
+        returns AS (
+            SELECT ticker, phase, close_price, volume,
+                   100.0 * (close_price / LAG(close_price) OVER (PARTITION BY ticker ORDER BY trade_date) - 1)
+                       AS daily_return
+            FROM joined
+        )
+        SELECT ticker, phase,
+               COUNT(daily_return) AS n_return, SUM(daily_return) AS sum_return,
+               SUM(daily_return * daily_return) AS sumsq_return,
+               COUNT(close_price) AS n_close, SUM(close_price) AS sum_close,
+               SUM(close_price * close_price) AS sumsq_close,
+               COUNT(volume) AS n_volume, SUM(volume) AS sum_volume,
+               SUM(volume * volume) AS sumsq_volume
+        FROM returns
+        GROUP BY ticker, phase
+    """
+
+
+def existing_tables(conn, dialect):
+    """Names of the tables in the database, upper-cased."""
+    query = ("SELECT name AS TABLE_NAME FROM sqlite_master WHERE type = 'table'" if dialect == "sqlite"
+             else "SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES")
+    return set(read_frame(conn, query)["TABLE_NAME"].str.upper())
+
+
+def fetch_phase_aggregates(conn, tickers, tickers_per_query=TICKERS_PER_QUERY):
+    """Run the pushdown query in ticker batches; return one DataFrame of aggregates.
+
+    Tickers without a {ticker}_StockPrices table are skipped, so one missing
+    table does not fail the whole UNION ALL batch.
+    """
+    dialect = detect_dialect(conn)
+    tables = existing_tables(conn, dialect)
+    tickers = [ticker for ticker in tickers if f"{ticker}_StockPrices".upper() in tables]
+    frames = []
+    for start in range(0, len(tickers), tickers_per_query):
+        batch = tickers[start:start + tickers_per_query]
+        frames.append(read_frame(conn, pushdown_query(batch, dialect)))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def aggregates_to_arrays(aggregates, tickers, field):
+    """Scatter one field's (n, sum, sum of squares) into (n_tickers, 8) arrays."""
+    shape = (len(tickers), len(MOON_PHASES))
+    count, total, total_sq = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    ticker_index = pd.Index(tickers).get_indexer(aggregates["ticker"])
+    codes = phase_codes(aggregates["Phase"].to_numpy(dtype=object)) if len(aggregates) else np.empty(0, int)
+    keep = (ticker_index >= 0) & (codes >= 0)
+
+    name = field.lower()
+    for target, column in ((count, f"n_{name}"), (total, f"sum_{name}"), (total_sq, f"sumsq_{name}")):
+        values = aggregates[column].to_numpy(dtype=np.float64)
+        np.add.at(target, (ticker_index[keep], codes[keep]), np.nan_to_num(values[keep]))
+    return count, total, total_sq
+
+
+def pushdown_stats(conn, tickers, tickers_per_query=TICKERS_PER_QUERY):
+    """Per-phase statistics, ANOVA and phase correlations computed from database aggregates.
+
+    Returns a ``PushdownStats`` of a ``PhaseStats`` for daily returns, a
+    DataFrame of correlations with the phase (ticker x Return/Close/Volume)
+    and the number of joined price rows per ticker.
+    """
+    aggregates = fetch_phase_aggregates(conn, tickers, tickers_per_query)
+    aggregates = aggregates.rename(columns={"phase": "Phase"})
+    tickers = [ticker for ticker in tickers if ticker in set(aggregates.get("ticker", []))]
+
+    sums = {field: aggregates_to_arrays(aggregates, tickers, field) for field in PUSHDOWN_FIELDS}
+    correlations = pd.DataFrame(
+        {field: phase_correlation(*sums[field]) for field in PUSHDOWN_FIELDS},
+        index=pd.Index(tickers, name="ticker"))
+    rows = pd.Series(sums["Close"][0].sum(axis=1).astype(np.int64), index=correlations.index)
+    return PushdownStats(phase_stats=finish_stats(tickers, *sums["Return"]),
+                         correlations=correlations, rows=rows)
+
+
+def index_ddl(tickers):
+    """Covering indexes for the pushdown scan (SQL Server)."""
+    statements = [
+        f"CREATE INDEX IX_{ticker}_StockPrices_Date_Covering ON {ticker}_StockPrices ([Date]) "
+        f"INCLUDE ([Close], [Volume]);"
+        for ticker in tickers
+    ]
+    statements.append("CREATE INDEX IX_LunarPhases_Date_Covering ON LunarPhases ([Date]) INCLUDE ([Phase]);")
+    return "\n".join(statements)
+
+
+def create_standin_tables(db_path, tickers):
+    """Create the (empty) Azure SQL price and phase tables in a SQLite stand-in, where missing."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS LunarPhases ([Date] TEXT NOT NULL, [Phase] TEXT)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS UX_LunarPhases_Date ON LunarPhases ([Date])")
+        for ticker in tickers:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {ticker}_StockPrices (
+                    [Date] TEXT NOT NULL, [Open] REAL, [High] REAL, [Low] REAL,
+                    [Close] REAL, [Adj_Close] REAL, [Volume] INTEGER)
+            """)
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS UX_{ticker}_StockPrices_Date "
+                         f"ON {ticker}_StockPrices ([Date])")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_sqlite_standin(db_path, tickers):
+    """Load the local CSVs into a SQLite database with the Azure SQL table layout."""
+    from analysis_backends import LUNAR_FILE_PATH, _latest_files
+
+    conn = sqlite3.connect(db_path)
+    try:
+        phases = pd.read_csv(LUNAR_FILE_PATH, usecols=["Date", "Phase"])
+        phases.to_sql("LunarPhases", conn, if_exists="replace", index=False)
+        conn.execute("CREATE UNIQUE INDEX UX_LunarPhases_Date ON LunarPhases ([Date])")
+        for ticker, path in _latest_files(tickers).items():
+            prices = pd.read_csv(path).rename(columns={"Adj Close": "Adj_Close"})
+            prices.to_sql(f"{ticker}_StockPrices", conn, if_exists="replace", index=False)
+            conn.execute(f"CREATE UNIQUE INDEX UX_{ticker}_StockPrices_Date ON {ticker}_StockPrices ([Date])")
+            print(f"✅ Loaded {len(prices)} rows into {ticker}_StockPrices")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    from ticker_registry import load_tickers
+
+    parser = argparse.ArgumentParser(description="Per-phase aggregates computed in the database.")
+    parser.add_argument("--sqlite", help="Run against a local SQLite stand-in database")
+    parser.add_argument("--build", action="store_true", help="(Re)build the SQLite stand-in from the local CSVs")
+    parser.add_argument("--create", action="store_true",
+                        help="Only create the empty tables of the SQLite stand-in (filled by the SQL uploads)")
+    parser.add_argument("--ddl", action="store_true", help="Print the index DDL for the registry tickers")
+    args = parser.parse_args()
+
+    tickers = load_tickers()
+    if args.ddl:
+        print(index_ddl(tickers))
+    elif args.sqlite and args.create:
+        create_standin_tables(args.sqlite, tickers)
+        print(f"✅ Stand-in tables ready in {args.sqlite}")
+    elif args.sqlite:
+        if args.build or not os.path.exists(args.sqlite):
+            build_sqlite_standin(args.sqlite, tickers)
+        conn = sqlite3.connect(args.sqlite)
+        result = pushdown_stats(conn, tickers)
+        conn.close()
+        print(result.phase_stats.anova)
+        print(result.correlations)
+    else:
+        parser.error("choose --sqlite or --ddl")
@@ -0,0 +1,152 @@
+"""Idempotent staged bulk upsert for the SQL upload scripts.
+
+Rows are streamed into a temporary staging table in batches, then merged into
+the target table on its key columns inside one transaction. Only new or
+changed rows are written, so rerunning an upload does not duplicate data.
+
+Works against Azure SQL / SQL Server (MERGE) and SQLite (UPDATE + INSERT),
+either through pyodbc or the built-in sqlite3 module, so uploads can be tested
+against a local SQLite database.
+"""
+from collections import namedtuple
+import sqlite3
+
+from instrumentation import span
+
+UpsertResult = namedtuple("UpsertResult", ["inserted", "updated", "unchanged"])
+
+STAGE_BATCH_SIZE = 5000
+
+
+def detect_dialect(conn):
+    """Return "sqlite" or "mssql" for a DB-API connection."""
+    if isinstance(conn, sqlite3.Connection):
+        return "sqlite"
+
+    import pyodbc
+    dbms_name = conn.getinfo(pyodbc.SQL_DBMS_NAME)
+    return "sqlite" if "sqlite" in dbms_name.lower() else "mssql"
+
+
+def _quote(column):
+    return f"[{column}]"
+
+
+def _stage_rows(cursor, stage_table, columns, rows, batch_size):
+    """Stream rows into the staging table in batches; return the row count."""
+    insert_sql = (f"INSERT INTO {stage_table} ({', '.join(map(_quote, columns))}) "
+                  f"VALUES ({', '.join('?' for _ in columns)})")
+    staged = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            with span("stage_batch", rows=len(batch)):
+                cursor.executemany(insert_sql, batch)
+            staged += len(batch)
+            batch = []
+    if batch:
+        with span("stage_batch", rows=len(batch)):
+            cursor.executemany(insert_sql, batch)
+        staged += len(batch)
+    return staged
+
+
+def _merge_mssql(cursor, target_table, stage_table, key_columns, value_columns):
+    """MERGE staged rows into the target; return (inserted, updated)."""
+    columns = key_columns + value_columns
+    on_clause = " AND ".join(f"t.{_quote(c)} = s.{_quote(c)}" for c in key_columns)
+    # EXCEPT gives a NULL-safe "any value differs" test
+    changed = (f"EXISTS (SELECT {', '.join('s.' + _quote(c) for c in value_columns)} "
+               f"EXCEPT SELECT {', '.join('t.' + _quote(c) for c in value_columns)})")
+    set_clause = ", ".join(f"t.{_quote(c)} = s.{_quote(c)}" for c in value_columns)
+    update_clause = f"WHEN MATCHED AND {changed} THEN UPDATE SET {set_clause}" if value_columns else ""
+
+    cursor.execute(f"""
+        SET NOCOUNT ON;
+        DECLARE @changes TABLE (action NVARCHAR(10));
+        MERGE {target_table} WITH (HOLDLOCK) AS t
+        USING {stage_table} AS s ON {on_clause}
+        {update_clause}
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT ({', '.join(map(_quote, columns))})
+            VALUES ({', '.join('s.' + _quote(c) for c in columns)})
+        OUTPUT $action INTO @changes;
+        SELECT
+            COALESCE(SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END), 0)
+        FROM @changes;
+    """)
+    inserted, updated = cursor.fetchone()
+    return int(inserted), int(updated)
+
+
+def _merge_sqlite(cursor, target_table, stage_table, key_columns, value_columns):
+    """UPDATE changed rows then INSERT new ones; return (inserted, updated)."""
+    columns = key_columns + value_columns
+    match = " AND ".join(f"s.{_quote(c)} = {target_table}.{_quote(c)}" for c in key_columns)
+
+    updated = 0
+    if value_columns:
+        changed = " OR ".join(f"s.{_quote(c)} IS NOT {target_table}.{_quote(c)}" for c in value_columns)
+        cursor.execute(f"""
+            UPDATE {target_table}
+            SET ({', '.join(map(_quote, value_columns))}) =
+                (SELECT {', '.join('s.' + _quote(c) for c in value_columns)} FROM {stage_table} s WHERE {match})
+            WHERE EXISTS (SELECT 1 FROM {stage_table} s WHERE {match} AND ({changed}))
+        """)
+        updated = cursor.rowcount
+
+    exists = " AND ".join(f"t.{_quote(c)} = s.{_quote(c)}" for c in key_columns)
+    cursor.execute(f"""
+        INSERT INTO {target_table} ({', '.join(map(_quote, columns))})
+        SELECT {', '.join('s.' + _quote(c) for c in columns)} FROM {stage_table} s
+        WHERE NOT EXISTS (SELECT 1 FROM {target_table} t WHERE {exists})
+    """)
+    return cursor.rowcount, updated
+
+
+def bulk_upsert(conn, target_table, key_columns, value_columns, rows, batch_size=STAGE_BATCH_SIZE,
+                commit=True):
+    """Stage ``rows`` and merge them into ``target_table`` in one transaction.
+
+    ``rows`` is an iterable of tuples ordered as ``key_columns + value_columns``
+    with unique keys. Returns an ``UpsertResult`` with the number of rows
+    inserted, updated and left unchanged. With ``commit=False`` the caller
+    owns the transaction, so several upserts can be committed together.
+    """
+    dialect = detect_dialect(conn)
+    columns = list(key_columns) + list(value_columns)
+    column_list = ", ".join(map(_quote, columns))
+    cursor = conn.cursor()
+    if dialect == "mssql":
+        cursor.fast_executemany = True
+        stage_table = "#StageUpsert"
+        drop_stage = f"IF OBJECT_ID('tempdb..{stage_table}') IS NOT NULL DROP TABLE {stage_table}"
+        create_stage = f"SELECT TOP 0 {column_list} INTO {stage_table} FROM {target_table}"
+        merge = _merge_mssql
+    else:
+        stage_table = "temp.StageUpsert"
+        drop_stage = f"DROP TABLE IF EXISTS {stage_table}"
+        create_stage = f"CREATE TEMP TABLE StageUpsert AS SELECT {column_list} FROM {target_table} WHERE 0"
+        merge = _merge_sqlite
+
+    try:
+        with span("upsert", table=target_table, dialect=dialect) as metrics:
+            cursor.execute(drop_stage)
+            cursor.execute(create_stage)
+            staged = _stage_rows(cursor, stage_table, columns, rows, batch_size)
+            with span("merge", table=target_table, rows=staged):
+                inserted, updated = merge(cursor, target_table, stage_table, list(key_columns), list(value_columns))
+            cursor.execute(f"DROP TABLE {stage_table}")
+            if commit:
+                conn.commit()
+            metrics.update(rows=staged, inserted=inserted, updated=updated)
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return UpsertResult(inserted=inserted, updated=updated, unchanged=staged - inserted - updated)
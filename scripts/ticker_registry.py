@@ -0,0 +1,52 @@
+"""Ticker universe shared by the extraction, upload and analysis scripts.
+
+Tickers are read from a CSV registry (``tickers.csv`` by default, override
+with TICKER_REGISTRY_PATH) with a ``Ticker`` column and an optional ``Name``
+column; lines starting with ``#`` are ignored. Symbols are upper-cased and
+de-duplicated, keeping file order. Without a registry file the four index
+ETFs are used.
+"""
+import os
+import re
+
+import pandas as pd
+
+DEFAULT_TICKERS = {
+    "SPY": "S&P 500",
+    "QQQ": "NASDAQ",
+    "DIA": "Dow Jones",
+    "IWM": "Russell 2000",
+}
+
+# Tickers end up in file names and SQL table names ({ticker}_StockPrices)
+TICKER_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9.\-]{0,14}$")
+
+
+def registry_path():
+    """Return the registry file path (TICKER_REGISTRY_PATH or tickers.csv)."""
+    return os.getenv("TICKER_REGISTRY_PATH", "tickers.csv")
+
+
+def load_registry(path=None):
+    """Return {ticker: name} from the registry file, in file order."""
+    path = path or registry_path()
+    if not os.path.exists(path):
+        return dict(DEFAULT_TICKERS)
+
+    table = pd.read_csv(path, dtype=str, comment="#", skipinitialspace=True).fillna("")
+    if "Ticker" not in table.columns:
+        raise ValueError(f"❌ Ticker registry {path} has no 'Ticker' column")
+    names = table["Name"] if "Name" in table.columns else table["Ticker"]
+
+    registry = {}
+    for ticker, name in zip(table["Ticker"].str.strip().str.upper(), names.str.strip()):
+        if not TICKER_PATTERN.match(ticker):
+            print(f"⚠️ Skipping invalid ticker '{ticker}' in {path}")
+            continue
+        registry.setdefault(ticker, name or ticker)
+    return registry
+
+
+def load_tickers(path=None):
+    """Return the list of registered tickers, in file order."""
+    return list(load_registry(path))
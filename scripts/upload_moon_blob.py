@@ -1,8 +1,9 @@
-from azure.storage.blob import BlobServiceClient
 from dotenv import load_dotenv
 import os
 import sys
 
+from blob_uploader import upload_files
+
 # Load environment variables
 load_dotenv()
 
@@ -12,23 +13,22 @@ AZURE_BLOB_SAS_URL = os.getenv("AZURE_BLOB_SAS_URL_LUNAR")
 AZURE_BLOB_CONTAINER = os.getenv("AZURE_BLOB_CONTAINER_LUNAR")
 LUNAR_FILE_PATH = "data/lunar_phases.csv"
 
+# Compress files on the fly before uploading
+BLOB_UPLOAD_GZIP = os.getenv("BLOB_UPLOAD_GZIP", "false").lower() == "true"
+
 try:
     if not os.path.exists(LUNAR_FILE_PATH):
         raise FileNotFoundError(f"❌ File {LUNAR_FILE_PATH} not found!")
 
     print(f"📤 Uploading {LUNAR_FILE_PATH} to {AZURE_BLOB_CONTAINER}...")
 
-    # Connect to Azure Blob Storage
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-    blob_client = blob_service_client.get_blob_client(
-        container=AZURE_BLOB_CONTAINER, blob=os.path.basename(LUNAR_FILE_PATH)
-    )
-
-    with open(LUNAR_FILE_PATH, "rb") as data:
-        blob_client.upload_blob(data, overwrite=True)
+    # Skipped if the stored blob already has the same content
+    counts = upload_files(AZURE_STORAGE_CONNECTION_STRING, AZURE_BLOB_CONTAINER, [LUNAR_FILE_PATH],
+                          compress=BLOB_UPLOAD_GZIP)
 
-    print(f"✅ Uploaded {LUNAR_FILE_PATH} to {AZURE_BLOB_CONTAINER}")
+    if counts["failed"]:
+        raise RuntimeError(f"{LUNAR_FILE_PATH} failed to upload")
 
 except Exception as e:
     print(f"❌ Error uploading lunar data: {e}")
-    sys.exit(1)
\ No newline at end of file
+    sys.exit(1)
@@ -1,9 +1,13 @@
 import pandas as pd
-import pyodbc
 from dotenv import load_dotenv
 import os
 import sys
 
+from data_access import connect_with_retry, connection_factory
+from frame_schema import read_phases_csv
+from instrumentation import span
+from sql_upsert import bulk_upsert
+
 # Load environment variables
 load_dotenv()
 
@@ -13,58 +17,62 @@ conn_str = os.getenv("SQL_ODBC_CONNECTION_STRING")
 # Batch size for inserting data in chunks
 BATCH_SIZE = 500
 
+# Read lunar data from the CSV ("csv") or the columnar store ("store")
+DATA_SOURCE = os.getenv("DATA_SOURCE", "csv")
+
 try:
-    # Read lunar data CSV
-    CSV_FILE = "data/lunar_phases.csv"
+    if DATA_SOURCE == "store":
+        from columnar_store import read_lunar_phases
+
+        print("📥 Processing lunar phases from the columnar store...")
+        with span("read_phases", source="store") as metrics:
+            df = read_lunar_phases(columns=["Date", "Phase"])
+            metrics["rows"] = len(df)
+        df["Phase"] = df["Phase"].astype(str)
+    else:
+        # Read lunar data CSV
+        CSV_FILE = "data/lunar_phases.csv"
 
-    if not os.path.exists(CSV_FILE):
-        raise FileNotFoundError(f"❌ File {CSV_FILE} not found!")
+        if not os.path.exists(CSV_FILE):
+            raise FileNotFoundError(f"❌ File {CSV_FILE} not found!")
 
-    print(f"📥 Processing {CSV_FILE}...")
+        print(f"📥 Processing {CSV_FILE}...")
 
-    # Read CSV into DataFrame
-    df = pd.read_csv(CSV_FILE)
+        # Read CSV into DataFrame (datetime Date, categorical Phase)
+        with span("read_phases", source="csv", bytes=os.path.getsize(CSV_FILE)) as metrics:
+            df = read_phases_csv(CSV_FILE)
+            metrics["rows"] = len(df)
 
     # Ensure required columns exist
     if "Date" not in df.columns or "Phase" not in df.columns:
         raise ValueError("❌ CSV file missing required columns: 'Date' and 'Phase'.")
 
-    # Convert "Date" column to datetime
+    # SQL parameters take plain dates
     df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
 
-    # Drop rows with invalid dates
-    df = df.dropna(subset=["Date"])
+    # Drop rows with invalid dates, one row per date
+    df = df.dropna(subset=["Date"]).drop_duplicates(subset=["Date"], keep="last")
 
     # Convert DataFrame to a list of tuples
-    data_tuples = list(df.itertuples(index=False, name=None))
+    data_tuples = list(df[["Date", "Phase"]].itertuples(index=False, name=None))
 
     if not data_tuples:
         raise ValueError("❌ No valid data to insert. Check CSV contents.")
 
     # Connect to Azure SQL
     print("🔗 Connecting to SQL Server...")
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
-    cursor.fast_executemany = True  # Enable fast bulk inserts
-
-    print(f"🔹 Preparing to insert {len(data_tuples)} rows into LunarPhases table...")
-
-    # Insert data in batches to prevent timeout issues
-    for i in range(0, len(data_tuples), BATCH_SIZE):
-        batch = data_tuples[i:i + BATCH_SIZE]
-        print(f"📤 Inserting batch {i // BATCH_SIZE + 1} ({len(batch)} rows)...")
+    conn = connect_with_retry(connection_factory(conn_str))
 
-        cursor.executemany("""
-            INSERT INTO LunarPhases (Date, Phase) VALUES (?, ?)
-        """, batch)
+    print(f"🔹 Preparing to upsert {len(data_tuples)} rows into LunarPhases table...")
 
-        conn.commit()
+    # Stage in batches to prevent timeout issues, then merge keyed on Date
+    result = bulk_upsert(conn, "LunarPhases", ["Date"], ["Phase"], data_tuples, batch_size=BATCH_SIZE)
 
     # Close connection
-    cursor.close()
     conn.close()
 
-    print(f"✅ Successfully uploaded {len(data_tuples)} lunar phase records to Azure SQL.")
+    print(f"✅ Successfully uploaded {len(data_tuples)} lunar phase records to Azure SQL: "
+          f"{result.inserted} inserted, {result.updated} updated, {result.unchanged} unchanged.")
 
 except Exception as e:
     print(f"❌ Error inserting lunar phases into SQL: {e}")
@@ -1,8 +1,9 @@
-from azure.storage.blob import BlobServiceClient
 from dotenv import load_dotenv
 import os
 import sys
 
+from blob_uploader import stock_blob_name, upload_files
+
 # Load environment variables
 load_dotenv()
 
@@ -12,6 +13,9 @@ AZURE_BLOB_SAS_URL = os.getenv("AZURE_BLOB_SAS_URL_STOCK")
 AZURE_BLOB_CONTAINER = os.getenv("AZURE_BLOB_CONTAINER_STOCK")
 LATEST_FILES_PATH = "latest_files.txt"
 
+# Compress files on the fly before uploading
+BLOB_UPLOAD_GZIP = os.getenv("BLOB_UPLOAD_GZIP", "false").lower() == "true"
+
 try:
     # Read all stock data file paths
     with open(LATEST_FILES_PATH, "r") as f:
@@ -20,27 +24,17 @@ try:
     if not FILE_PATHS:
         raise FileNotFoundError("❌ No stock files found!")
 
-    # Connect to Azure Blob Storage
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-
-    for file_path in FILE_PATHS:
-        if not os.path.exists(file_path):
-            print(f"⚠️ Skipping missing file: {file_path}")
-            continue
-
-        print(f"📤 Uploading {file_path} to {AZURE_BLOB_CONTAINER}...")
-
-        blob_client = blob_service_client.get_blob_client(
-            container=AZURE_BLOB_CONTAINER, blob=os.path.basename(file_path)
-        )
+    print(f"📤 Uploading {len(FILE_PATHS)} stock files to {AZURE_BLOB_CONTAINER}...")
 
-        with open(file_path, "rb") as data:
-            blob_client.upload_blob(data, overwrite=True)
+    # Upload concurrently to one blob per ticker, skipping files whose content is already stored
+    counts = upload_files(AZURE_STORAGE_CONNECTION_STRING, AZURE_BLOB_CONTAINER, FILE_PATHS,
+                          compress=BLOB_UPLOAD_GZIP, blob_name=stock_blob_name)
 
-        print(f"✅ Uploaded {file_path} to {AZURE_BLOB_CONTAINER}")
+    if counts["failed"]:
+        raise RuntimeError(f"{counts['failed']} file(s) failed to upload")
 
     print("🎉 All stock files uploaded successfully!")
 
 except Exception as e:
     print(f"❌ Error uploading stock data: {e}")
-    sys.exit(1)
\ No newline at end of file
+    sys.exit(1)
@@ -1,94 +1,129 @@
 import pandas as pd
-import pyodbc
 from dotenv import load_dotenv
 import os
 import sys
 
+from data_access import connect_with_retry, connection_factory
+from frame_schema import read_prices_csv, sql_rows
+from instrumentation import span
+from sharding import map_shards
+from sql_upsert import bulk_upsert
+from ticker_registry import load_tickers
+
 # Load environment variables
 load_dotenv()
 
 # Azure SQL Connection
 conn_str = os.getenv("SQL_ODBC_CONNECTION_STRING")
 
-try:
-    # Read all stock file paths
-    with open("latest_files.txt", "r") as f:
-        FILE_PATHS = [line.strip() for line in f.readlines()]
-
-    if not FILE_PATHS:
-        raise FileNotFoundError("❌ No stock files found!")
-
-    # Connect to Azure SQL
-    conn = pyodbc.connect(conn_str)
-    cursor = conn.cursor()
-    cursor.fast_executemany = True  # Optimize bulk inserts
-
-    # Define valid ETF tables
-    valid_etfs = {"SPY", "QQQ", "DIA", "IWM"}
-
-    for file_path in FILE_PATHS:
-        if not os.path.exists(file_path):
-            print(f"⚠️ Skipping missing file: {file_path}")
-            continue
-
-        print(f"📥 Processing {file_path}...")
-
-        try:
-            # Read CSV into DataFrame
-            df = pd.read_csv(file_path)
-
-            # Ensure expected columns exist
-            required_columns = {"Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"}
-            if not required_columns.issubset(set(df.columns)):
-                print(f"❌ Skipping {file_path}: Missing required columns!")
-                continue
-
-            # Convert Date column
-            df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
-
-            # Drop rows with invalid dates
-            df = df.dropna(subset=["Date"])
-
-            # Rename columns for SQL compatibility
-            df.rename(columns={"Adj Close": "Adj_Close"}, inplace=True)
-
-            # Extract ETF name from filename
-            etf_name = os.path.basename(file_path).split("_")[0]
-
-            # Ensure ETF is valid
-            if etf_name not in valid_etfs:
-                print(f"⚠️ Skipping {file_path}: ETF name '{etf_name}' is not recognized.")
-                continue
-
-            sql_table = f"{etf_name}_StockPrices"  # Map to correct SQL table
-
-            print(f"🔹 Inserting data into {sql_table}...")
-
-            # Convert DataFrame to tuples for SQL insertion
-            data_tuples = list(df[["Date", "Open", "High", "Low", "Close", "Adj_Close", "Volume"]].itertuples(index=False, name=None))
-
-            if not data_tuples:
-                print(f"⚠️ No valid data to insert for {file_path}. Skipping.")
-                continue
-
-            # Insert data into the respective SQL table
-            cursor.executemany(f"""
-                INSERT INTO {sql_table} (Date, [Open], High, Low, [Close], Adj_Close, Volume)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, data_tuples)
-
-            conn.commit()
-            print(f"✅ Uploaded {file_path} to {sql_table} successfully.")
-
-        except Exception as e:
-            print(f"❌ Error processing {file_path}: {e}")
-
-    # Close connection
-    cursor.close()
-    conn.close()
-
-    print("🎉 All stock files uploaded successfully!")
-
-except Exception as e:
-    print(f"❌ Fatal error inserting stock data into SQL: {e}")
-    sys.exit(1)
\ No newline at end of file
+# Read stock data from the dated CSVs ("csv") or the columnar store ("store")
+DATA_SOURCE = os.getenv("DATA_SOURCE", "csv")
+
+def read_stock_file(file_path):
+    """Read one ETF's prices from a CSV path or a "store:<ETF>" reference."""
+    # Uploads always keep full float64 precision, whatever PRICE_DTYPE the analysis uses
+    if file_path.startswith("store:"):
+        from columnar_store import read_prices
+        return read_prices([file_path.split(":", 1)[1]], dtype="float64").drop(columns="ticker")
+    return read_prices_csv(file_path, dtype="float64")
+
+def upload_stock_file(conn, file_path, valid_etfs):
+    """Upsert one ETF's prices into its {ETF}_StockPrices table."""
+    if not file_path.startswith("store:") and not os.path.exists(file_path):
+        print(f"⚠️ Skipping missing file: {file_path}")
+        return
+
+    print(f"📥 Processing {file_path}...")
+
+    try:
+        # Read prices into DataFrame
+        with span("read_prices", file=file_path) as metrics:
+            df = read_stock_file(file_path)
+            metrics["rows"] = len(df)
+            if not file_path.startswith("store:"):
+                metrics["bytes"] = os.path.getsize(file_path)
+
+        # Ensure expected columns exist
+        required_columns = {"Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"}
+        if not required_columns.issubset(set(df.columns)):
+            print(f"❌ Skipping {file_path}: Missing required columns!")
+            return
+
+        # SQL parameters take plain dates
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
+
+        # Drop rows with invalid dates
+        df = df.dropna(subset=["Date"])
+
+        # Rename columns for SQL compatibility
+        df.rename(columns={"Adj Close": "Adj_Close"}, inplace=True)
+
+        # Extract ETF name from filename (or store reference)
+        etf_name = os.path.basename(file_path).split("_")[0].replace("store:", "")
+
+        # Ensure ETF is valid
+        if etf_name not in valid_etfs:
+            print(f"⚠️ Skipping {file_path}: ETF name '{etf_name}' is not recognized.")
+            return
+
+        sql_table = f"{etf_name}_StockPrices"  # Map to correct SQL table
+
+        print(f"🔹 Upserting data into {sql_table}...")
+
+        # One row per date, so the merge key is unique
+        df = df.drop_duplicates(subset=["Date"], keep="last")
+
+        # Convert DataFrame to tuples for SQL insertion (missing values as NULL)
+        data_tuples = sql_rows(df, ["Date", "Open", "High", "Low", "Close", "Adj_Close", "Volume"])
+
+        if not data_tuples:
+            print(f"⚠️ No valid data to insert for {file_path}. Skipping.")
+            return
+
+        # Stage and merge into the respective SQL table, keyed on Date
+        result = bulk_upsert(conn, sql_table, ["Date"],
+                             ["Open", "High", "Low", "Close", "Adj_Close", "Volume"], data_tuples)
+
+        print(f"✅ Uploaded {file_path} to {sql_table}: {result.inserted} inserted, "
+              f"{result.updated} updated, {result.unchanged} unchanged.")
+
+    except Exception as e:
+        print(f"❌ Error processing {file_path}: {e}")
+
+def upload_shard(file_paths):
+    """Upload a shard of stock files over the worker's own connection."""
+    conn = connect_with_retry(connection_factory(conn_str))
+    try:
+        # Only tickers in the registry map to SQL tables
+        valid_etfs = set(load_tickers())
+        for file_path in file_paths:
+            upload_stock_file(conn, file_path, valid_etfs)
+    finally:
+        conn.close()
+    return len(file_paths)
+
+def main():
+    try:
+        if DATA_SOURCE == "store":
+            from columnar_store import list_tickers
+            file_paths = [f"store:{ticker}" for ticker in list_tickers()]
+        else:
+            # Read all stock file paths
+            with open("latest_files.txt", "r") as f:
+                file_paths = [line.strip() for line in f.readlines()]
+
+        if not file_paths:
+            raise FileNotFoundError("❌ No stock files found!")
+
+        # Shard the files across worker processes, each with its own connection
+        with span("upload_stock_files", files=len(file_paths)):
+            map_shards(upload_shard, file_paths)
+
+        print("🎉 All stock files uploaded successfully!")
+
+    except Exception as e:
+        print(f"❌ Fatal error inserting stock data into SQL: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -96,4 +96,67 @@ ORDER BY ETF;
 -- This is a conceptual query, actual implementation was done in Python
 SELECT ETF, Correlation_Volume
 FROM StockLunarAnalysisResults
-ORDER BY Correlation_Volume DESC; 
\ No newline at end of file
+ORDER BY Correlation_Volume DESC; 
+
+-- 12. One-time cleanup of duplicate rows left by earlier plain-INSERT uploads
+-- (keeps the first row per date; repeat for QQQ, DIA, IWM)
+WITH Ranked AS (
+    SELECT ID, ROW_NUMBER() OVER (PARTITION BY CAST([Date] AS DATE) ORDER BY ID) AS rn
+    FROM SPY_StockPrices
+)
+DELETE FROM Ranked WHERE rn > 1;
+
+WITH Ranked AS (
+    SELECT ID, ROW_NUMBER() OVER (PARTITION BY CAST([Date] AS DATE) ORDER BY ID) AS rn
+    FROM LunarPhases
+)
+DELETE FROM Ranked WHERE rn > 1;
+
+-- 13. Unique indexes on the upsert keys used by upload_stock_sql.py / upload_moon_sql.py
+CREATE UNIQUE INDEX UX_SPY_StockPrices_Date ON SPY_StockPrices ([Date]);
+CREATE UNIQUE INDEX UX_QQQ_StockPrices_Date ON QQQ_StockPrices ([Date]);
+CREATE UNIQUE INDEX UX_DIA_StockPrices_Date ON DIA_StockPrices ([Date]);
+CREATE UNIQUE INDEX UX_IWM_StockPrices_Date ON IWM_StockPrices ([Date]);
+CREATE UNIQUE INDEX UX_LunarPhases_Date ON LunarPhases ([Date]);
+
+-- 14. Unique keys for the batched result writes in azure_stock_lunar_analysis.py (result_writer.py)
+-- Remove duplicates left by earlier row-by-row inserts first (keeps the latest row per key)
+WITH Ranked AS (
+    SELECT ID, ROW_NUMBER() OVER (PARTITION BY AnalysisDate, ETF, LunarPhase ORDER BY ID DESC) AS rn
+    FROM LunarPhaseReturns
+)
+DELETE FROM Ranked WHERE rn > 1;
+
+WITH Ranked AS (
+    SELECT ID, ROW_NUMBER() OVER (PARTITION BY ETF ORDER BY ID DESC) AS rn
+    FROM StockLunarAnalysisResults
+)
+DELETE FROM Ranked WHERE rn > 1;
+
+CREATE UNIQUE INDEX UX_LunarPhaseReturns_Key ON LunarPhaseReturns (AnalysisDate, ETF, LunarPhase);
+CREATE UNIQUE INDEX UX_StockLunarAnalysisResults_ETF ON StockLunarAnalysisResults (ETF);
+
+-- 15. Pushdown aggregates (ANALYSIS_SQL_PUSHDOWN=true, scripts/sql_pushdown.py)
+-- Daily returns via LAG and per-phase n / sum / sum of squares, 8 rows per ETF
+-- (the script UNIONs up to 100 ETFs per query and also aggregates Close and Volume)
+WITH joined AS (
+    SELECT 'SPY' AS ticker, s.[Date] AS trade_date, l.[Phase] AS phase, CAST(s.[Close] AS FLOAT) AS close_price
+    FROM SPY_StockPrices s
+    JOIN LunarPhases l ON CAST(s.[Date] AS DATE) = CAST(l.[Date] AS DATE)
+),
+returns AS (
+    SELECT ticker, phase,
+           100.0 * (close_price / LAG(close_price) OVER (PARTITION BY ticker ORDER BY trade_date) - 1) AS daily_return
+    FROM joined
+)
+SELECT ticker, phase, COUNT(daily_return) AS n_return, SUM(daily_return) AS sum_return,
+       SUM(daily_return * daily_return) AS sumsq_return
+FROM returns
+GROUP BY ticker, phase;
+
+-- Covering indexes for the pushdown scan (python scripts/sql_pushdown.py --ddl prints them for every registry ticker)
+CREATE INDEX IX_SPY_StockPrices_Date_Covering ON SPY_StockPrices ([Date]) INCLUDE ([Close], [Volume]);
+CREATE INDEX IX_QQQ_StockPrices_Date_Covering ON QQQ_StockPrices ([Date]) INCLUDE ([Close], [Volume]);
+CREATE INDEX IX_DIA_StockPrices_Date_Covering ON DIA_StockPrices ([Date]) INCLUDE ([Close], [Volume]);
+CREATE INDEX IX_IWM_StockPrices_Date_Covering ON IWM_StockPrices ([Date]) INCLUDE ([Close], [Volume]);
+CREATE INDEX IX_LunarPhases_Date_Covering ON LunarPhases ([Date]) INCLUDE ([Phase]);
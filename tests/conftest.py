@@ -0,0 +1,35 @@
+"""Shared fixtures: the scripts on sys.path and a working directory with the committed data."""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(REPO_DIR, "scripts")
+sys.path.insert(0, SCRIPTS_DIR)
+
+TICKERS = ["SPY", "QQQ", "DIA", "IWM"]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """A temporary working directory holding the committed price CSVs, lunar phases and latest_files.txt."""
+    os.makedirs(tmp_path / "data")
+    shutil.copy(os.path.join(REPO_DIR, "data", "lunar_phases.csv"), tmp_path / "data")
+    with open(os.path.join(REPO_DIR, "latest_files.txt")) as f:
+        paths = f.read().split()
+    for path in paths:
+        shutil.copy(os.path.join(REPO_DIR, path), tmp_path / path)
+    shutil.copy(os.path.join(REPO_DIR, "latest_files.txt"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run_script(script, *args, cwd, **env):
+    """Run a script from scripts/ in a fresh interpreter; return the completed process (output captured)."""
+    environment = dict(os.environ, ANALYSIS_CACHE="false", METRICS_ENABLED="false", SQL_ODBC_CONNECTION_STRING="")
+    environment.update(env)
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script), *args], cwd=cwd, env=environment,
+                          capture_output=True, text=True, timeout=900)
@@ -0,0 +1,52 @@
+"""Blob uploads skip unchanged stock data even after the daily file rename."""
+import blob_uploader
+
+
+class FakeBlob:
+    def __init__(self, name, metadata):
+        self.name, self.metadata = name, metadata
+
+
+class FakeContainer:
+    """The parts of a ContainerClient the uploader uses, in memory."""
+
+    def __init__(self):
+        self.blobs, self.uploads = {}, []
+
+    def exists(self):
+        return True
+
+    def list_blobs(self, include=None):
+        return [FakeBlob(name, metadata) for name, (_, metadata) in self.blobs.items()]
+
+    def upload_blob(self, name, data, overwrite=False, metadata=None, **kwargs):
+        self.blobs[name] = (data.read(), metadata)
+        self.uploads.append(name)
+
+
+def test_renamed_stock_file_is_skipped(tmp_path, monkeypatch):
+    container = FakeContainer()
+
+    class FakeService:
+        def get_container_client(self, name):
+            return container
+
+    monkeypatch.setattr(blob_uploader.BlobServiceClient, "from_connection_string",
+                        staticmethod(lambda *args, **kwargs: FakeService()))
+
+    monday = tmp_path / "SPY_stock_2025-03-10.csv"
+    monday.write_text("Date,Close\n2025-03-10,1.0\n")
+    counts = blob_uploader.upload_files("", "stock", [str(monday)], blob_name=blob_uploader.stock_blob_name)
+    assert counts["uploaded"] == 1 and container.uploads == ["SPY_stock.csv"]
+    assert container.blobs["SPY_stock.csv"][1][blob_uploader.SOURCE_METADATA_KEY] == monday.name
+
+    # The incremental extraction renames the unchanged file to the new date
+    tuesday = monday.rename(tmp_path / "SPY_stock_2025-03-11.csv")
+    counts = blob_uploader.upload_files("", "stock", [str(tuesday)], blob_name=blob_uploader.stock_blob_name)
+    assert counts["skipped"] == 1 and container.uploads == ["SPY_stock.csv"]
+
+    # New rows change the content and overwrite the same blob
+    with open(tuesday, "a") as f:
+        f.write("2025-03-11,1.1\n")
+    counts = blob_uploader.upload_files("", "stock", [str(tuesday)], blob_name=blob_uploader.stock_blob_name)
+    assert counts["uploaded"] == 1 and list(container.blobs) == ["SPY_stock.csv"]
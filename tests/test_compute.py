@@ -0,0 +1,27 @@
+"""Correlation step: phase correlations from the panel, the quadratic matrix only for the heatmap."""
+import numpy as np
+
+import analysis_backends
+from conftest import TICKERS
+from lunar_analysis.compute import compute_correlations
+
+
+def _stock_data():
+    stock_data = analysis_backends.load_csv(TICKERS)
+    for data in stock_data.values():
+        data["Return"] = data["Close"].pct_change() * 100
+    return stock_data
+
+
+def test_lunar_correlations_match_the_matrix(workdir):
+    phase_correlation, lunar_correlations, matrix = compute_correlations(_stock_data(), None)
+    assert matrix.shape == (3 * len(TICKERS) + 1,) * 2
+    expected = matrix["PhaseNumeric"].drop("PhaseNumeric")
+    assert np.allclose(lunar_correlations, expected[lunar_correlations.index], rtol=0, atol=1e-12)
+    assert lunar_correlations["SPY_Volume"] == phase_correlation.loc["SPY", "Volume"]
+
+
+def test_matrix_skipped_when_too_wide_for_the_heatmap(workdir):
+    phase_correlation, lunar_correlations, matrix = compute_correlations(_stock_data(), None, max_columns=12)
+    assert matrix is None
+    assert len(lunar_correlations) == 3 * len(TICKERS)
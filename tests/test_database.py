@@ -0,0 +1,31 @@
+"""Results-table checks of the analysis against a SQLite stand-in."""
+from conftest import TICKERS
+
+from data_access import connection_factory
+from lunar_analysis.database import print_table_diagnostics, verify_results_table
+from result_writer import ensure_result_tables
+from sql_pushdown import build_sqlite_standin
+
+
+def test_verify_results_table_on_sqlite_standin(workdir, capsys):
+    build_sqlite_standin(str(workdir / "standin.db"), TICKERS)
+    conn = connection_factory(f"sqlite:{workdir / 'standin.db'}")()
+    try:
+        verify_results_table(conn)
+        assert "StockLunarAnalysisResults table does not exist." in capsys.readouterr().out
+
+        ensure_result_tables(conn)
+        conn.execute("INSERT INTO StockLunarAnalysisResults (AnalysisDate, ETF, Correlation_Volume, "
+                     "ANOVA_F_Statistic, ANOVA_P_Value, Conclusion) VALUES ('2025-03-11', 'SPY', 0.1, 0.6, 0.7, 'x')")
+        verify_results_table(conn)
+        out = capsys.readouterr().out
+        assert "Error executing query" not in out
+        assert "StockLunarAnalysisResults table exists." in out
+        assert "ANOVA_F_Statistic" in out and "SPY" in out
+
+        print_table_diagnostics(conn)
+        out = capsys.readouterr().out
+        assert "Error executing query" not in out
+        assert "SPY_StockPrices" in out and "COLUMN_NAME" in out
+    finally:
+        conn.close()
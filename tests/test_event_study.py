@@ -0,0 +1,29 @@
+"""Event instants of the event study against published new and full moon times."""
+import numpy as np
+import pandas as pd
+
+from event_study import event_instants, event_positions
+
+# USNO new and full moons (UTC), June-July 2020
+MOONS = [
+    ("2020-06-05T19:12", 4), ("2020-06-21T06:41", 0),
+    ("2020-07-05T04:44", 4), ("2020-07-20T17:33", 0),
+]
+
+
+def test_event_instants_are_the_exact_new_and_full_moons():
+    dates = pd.bdate_range("2020-06-01", "2020-07-31").to_numpy()
+    instants, codes = event_instants(dates)
+    expected = np.array([instant for instant, _ in MOONS], dtype="datetime64[s]")
+    assert list(codes) == [code for _, code in MOONS]
+    assert np.max(np.abs(instants - expected)) < np.timedelta64(10, "m")
+
+
+def test_day_zero_is_the_first_trading_day_on_or_after_the_event():
+    dates = pd.bdate_range("2020-05-01", "2020-08-31").to_numpy()
+    events, positions = event_positions(dates, window=2)
+    # 2020-07-05 is a Sunday, so that full moon's day 0 is Monday 2020-07-06
+    day_zero = dict(zip(events["instant"].dt.strftime("%Y-%m-%d"), events["date"].dt.strftime("%Y-%m-%d")))
+    assert day_zero["2020-06-05"] == "2020-06-05"
+    assert day_zero["2020-07-05"] == "2020-07-06"
+    assert np.array_equal(dates[positions], events["date"].to_numpy())
@@ -0,0 +1,41 @@
+"""Incremental extraction refills short gaps once and skips known closures."""
+import pandas as pd
+import pytest
+
+pytest.importorskip("yfinance")
+import extract_stock_data  # noqa: E402
+
+# Business days through 2024-02-09 except the 2024-01-15 market holiday
+DAYS = pd.bdate_range("2024-01-02", "2024-02-09").drop(pd.Timestamp("2024-01-15"))
+MARKET = pd.DataFrame({"Date": DAYS, "Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Adj Close": 1.0,
+                       "Volume": 10})
+
+
+def test_short_gaps_refilled_and_closures_requested_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    calls = []
+
+    def download_prices(etf, start, end):
+        calls.append((start, end))
+        return MARKET[(MARKET["Date"] >= start) & (MARKET["Date"] < end)].copy()
+
+    monkeypatch.setattr(extract_stock_data, "download_prices", download_prices)
+    monkeypatch.setattr(extract_stock_data, "END_DATE", "2024-02-10")
+
+    # Stored history is missing a single trading day (2024-01-10)
+    stored = MARKET[(MARKET["Date"] <= "2024-02-01") & (MARKET["Date"] != "2024-01-10")].copy()
+    stored["Date"] = stored["Date"].dt.strftime("%Y-%m-%d")
+    stored.to_csv("data/SPY_stock_2024-02-02.csv", index=False)
+    (tmp_path / "latest_files.txt").write_text("data/SPY_stock_2024-02-02.csv\n")
+
+    extract_stock_data.extract_incremental("SPY", "S&P 500")
+    assert calls == [("2024-01-10", "2024-01-16"), ("2024-02-02", "2024-02-10")]
+    refilled = pd.read_csv("data/SPY_stock_2024-02-10.csv")
+    assert refilled["Date"].tolist() == list(DAYS.strftime("%Y-%m-%d"))
+
+    # The holiday is inside a requested range, so only the tail is fetched again
+    calls.clear()
+    monkeypatch.setattr(extract_stock_data, "END_DATE", "2024-02-13")
+    extract_stock_data.extract_incremental("SPY", "S&P 500")
+    assert calls == [("2024-02-10", "2024-02-13")]
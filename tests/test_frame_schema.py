@@ -0,0 +1,46 @@
+"""Missing volumes stay missing through the compact schema and the SQL upload."""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from conftest import TICKERS, run_script
+from frame_schema import normalize_frame, read_prices_csv, sql_rows
+from sql_pushdown import create_standin_tables
+
+
+def _blank_volumes(path, rows):
+    prices = pd.read_csv(path)
+    prices["Volume"] = prices["Volume"].astype("Int64")
+    prices.loc[rows, "Volume"] = pd.NA
+    prices.to_csv(path, index=False)
+
+
+def test_missing_volume_is_not_zero(workdir):
+    path = "data/SPY_stock_2025-03-11.csv"
+    _blank_volumes(path, [3])
+    prices = read_prices_csv(path)
+    assert prices["Volume"].dtype == np.float64
+    assert prices["Volume"].isna().sum() == 1
+    assert (prices["Volume"] > 0).sum() == len(prices) - 1
+
+    rows = sql_rows(prices, ["Date", "Close", "Volume"])
+    assert rows[3][2] is None
+    assert isinstance(rows[4][2], int) and rows[4][2] == int(prices["Volume"][4])
+
+    complete = normalize_frame(pd.DataFrame({"Volume": ["10", "20"]}))
+    assert complete["Volume"].dtype == np.int64
+
+
+def test_upload_writes_missing_volume_as_null(workdir):
+    _blank_volumes("data/SPY_stock_2025-03-11.csv", [3, 10])
+    create_standin_tables(str(workdir / "standin.db"), TICKERS)
+    done = run_script("upload_stock_sql.py", cwd=workdir, SQL_ODBC_CONNECTION_STRING=f"sqlite:{workdir / 'standin.db'}")
+    assert done.returncode == 0, done.stdout + done.stderr
+
+    conn = sqlite3.connect(workdir / "standin.db")
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM SPY_StockPrices WHERE [Volume] IS NULL").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM SPY_StockPrices WHERE [Volume] = 0").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,54 @@
+"""Daily intraday ingests store each bar once and the stats pass reads it once."""
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import intraday
+
+BARS_PER_DAY = 10
+
+
+def synthetic_bars(start, end):
+    """BARS_PER_DAY one-minute bars at 15:00 UTC on each business day in [start, end)."""
+    days = pd.bdate_range(start, end, inclusive="left", tz="UTC") + pd.Timedelta(hours=15)
+    stamps = pd.DatetimeIndex([day + pd.Timedelta(minutes=minute) for day in days for minute in range(BARS_PER_DAY)])
+    close = 100 + pd.Series(range(len(stamps)), dtype=float) % 7
+    return pd.DataFrame({"Datetime": stamps.astype(str), "Open": close, "High": close, "Low": close,
+                         "Close": close, "Volume": 1000})
+
+
+def ingest_on(day, directory, monkeypatch):
+    """One daily ingest run on ``day`` with the default lookback; files get that day's mtime."""
+    before = set(os.listdir(directory / "SPY")) if (directory / "SPY").exists() else set()
+    monkeypatch.setattr(intraday, "download_window", lambda ticker, start, end, interval: synthetic_bars(start, end))
+    start = (pd.Timestamp(day) - pd.Timedelta(days=intraday.LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    intraday.ingest_ticker("SPY", start, day, "1m", str(directory))
+    written = datetime.strptime(day, "%Y-%m-%d").timestamp()
+    for name in os.listdir(directory / "SPY"):
+        if name not in before or os.path.getmtime(directory / "SPY" / name) > written:
+            os.utime(directory / "SPY" / name, (written, written))
+
+
+def test_consecutive_ingests_count_each_bar_once(tmp_path, monkeypatch):
+    ingest_on("2025-03-05", tmp_path, monkeypatch)
+    ingest_on("2025-03-06", tmp_path, monkeypatch)
+
+    # Both runs' lookbacks together cover 2025-02-04 .. 2025-03-05
+    expected = len(pd.bdate_range("2025-02-04", "2025-03-05")) * BARS_PER_DAY
+    phase_stats, bars = intraday.stream_phase_stats(["SPY"], str(tmp_path), chunk_rows=37, interval="1m")
+    assert bars["SPY"] == expected
+    # Every bar but the first of each session has a return
+    assert phase_stats.groups.loc["SPY", "count"].sum() == expected - expected // BARS_PER_DAY
+
+    # Overlapping files written with shifted windows by older runs are still read once
+    synthetic_bars("2025-02-05", "2025-02-12").to_csv(tmp_path / "SPY" / "2025-02-05_1m.csv", index=False)
+    assert intraday.stream_phase_stats(["SPY"], str(tmp_path), interval="1m")[1]["SPY"] == expected
+
+
+def test_windows_do_not_depend_on_start():
+    first = intraday.download_windows("2025-02-04", "2025-03-05")
+    second = intraday.download_windows("2025-02-05", "2025-03-06")
+    assert [window[:2] for window in first] == [window[:2] for window in second]
+    assert all(pd.Timestamp(window[0]).dayofweek == 0 for window in first + second)
+    assert first[0][2] == "2025-02-04" and second[-1][3] == "2025-03-06"
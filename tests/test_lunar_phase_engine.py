@@ -0,0 +1,39 @@
+"""Phase codes of the lunar phase engine on known principal phase dates."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import REPO_DIR
+from lunar_phase_engine import MOON_PHASES, compute_lunar_phases
+
+# Exact principal phases (UTC) from the published USNO tables
+PRINCIPAL_PHASES = [
+    ("2020-06-05T19:12", "Full Moon"),
+    ("2020-06-21T06:41", "New Moon"),
+    ("2021-01-28T19:16", "Full Moon"),
+    ("2022-12-23T10:17", "New Moon"),
+    ("2024-04-08T18:21", "New Moon"),
+    ("2024-09-18T02:34", "Full Moon"),
+    ("2025-03-14T06:55", "Full Moon"),
+    ("2025-03-29T10:58", "New Moon"),
+]
+
+
+@pytest.mark.parametrize("instant, phase", PRINCIPAL_PHASES)
+def test_principal_phase_days_carry_the_phase(instant, phase):
+    # Each phase is centred on its principal angle, so the midnights (UTC) either
+    # side of the event, less than a day away, are labelled with that phase
+    days = np.datetime64(instant, "D") + np.arange(2)
+    assert list(np.asarray(MOON_PHASES)[compute_lunar_phases(days).code]) == [phase] * 2
+
+    angle = compute_lunar_phases([np.datetime64(instant)]).angle[0]
+    principal = MOON_PHASES.index(phase) * 45.0
+    assert abs((angle - principal + 180) % 360 - 180) < 0.1
+
+
+def test_engine_agrees_with_the_stored_daily_table():
+    table = pd.read_csv(os.path.join(REPO_DIR, "data", "lunar_phases.csv"))
+    codes = compute_lunar_phases(np.array(table["Date"].tolist(), dtype="datetime64[D]")).code
+    assert np.mean(np.asarray(MOON_PHASES)[codes] == table["Phase"].to_numpy()) > 0.89
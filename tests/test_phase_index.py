@@ -0,0 +1,57 @@
+"""Day-level attribution from the phase interval index against the daily phase table."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import analysis_backends
+from conftest import TICKERS
+from extract_moon_data import generate_local_moon_data
+from lunar_phase_engine import phase_names
+from phase_index import get_phase_index, phase_on
+from phase_stats import compute_phase_stats
+
+
+def _phase_stats(monkeypatch, phase_source):
+    monkeypatch.setattr(analysis_backends, "PHASE_SOURCE", phase_source)
+    stock_data = analysis_backends.load_csv(TICKERS)
+    for data in stock_data.values():
+        data["Return"] = data["Close"].pct_change() * 100
+    return stock_data, compute_phase_stats(stock_data)
+
+
+def test_index_matches_an_engine_generated_table(workdir, monkeypatch):
+    # The daily table as the local fallback of extract_moon_data.py writes it
+    stored = pd.read_csv("data/lunar_phases.csv")
+    days = (pd.Timestamp(stored["Date"].max()) - pd.Timestamp(stored["Date"].min())).days + 1
+    pd.DataFrame(generate_local_moon_data(stored["Date"].min(), days)).to_csv("data/lunar_phases.csv", index=False)
+
+    table_data, table_stats = _phase_stats(monkeypatch, "table")
+    index_data, index_stats = _phase_stats(monkeypatch, "index")
+
+    for ticker in TICKERS:
+        assert np.array_equal(table_data[ticker]["Phase"].to_numpy(), index_data[ticker]["Phase"].to_numpy())
+    assert table_stats.groups.equals(index_stats.groups)
+    assert table_stats.anova.equals(index_stats.anova)
+
+
+def test_index_against_the_committed_table(workdir, monkeypatch):
+    # The committed table was not generated by the phase engine and differs
+    # from it on about a tenth of the days
+    table_data, _ = _phase_stats(monkeypatch, "table")
+    index_data, _ = _phase_stats(monkeypatch, "index")
+
+    for ticker in TICKERS:
+        table, index = table_data[ticker], index_data[ticker]
+        assert table["Date"].equals(index["Date"])
+        assert np.mean(table["Phase"].to_numpy() == index["Phase"].to_numpy()) > 0.89
+
+
+def test_generated_table_does_not_depend_on_the_time_of_day(workdir):
+    # A run at 10:12 UTC labels each date as of midnight, like phase_on
+    generated = pd.DataFrame(generate_local_moon_data(datetime(2020, 3, 11, 10, 12), 5 * 365))
+    assert generated["Date"].iloc[0] == "2020-03-11"
+    assert generated.equals(pd.DataFrame(generate_local_moon_data(datetime(2020, 3, 11), 5 * 365)))
+
+    dates = generated["Date"].to_numpy(dtype="datetime64[D]")
+    assert generated["Phase"].tolist() == list(phase_names(phase_on(get_phase_index(dates), dates)))
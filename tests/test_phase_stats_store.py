@@ -0,0 +1,49 @@
+"""The incremental per-phase statistics store against a full recompute."""
+import numpy as np
+
+import phase_stats_store
+from analysis_backends import load_stock_lunar
+from conftest import TICKERS
+from phase_stats import compute_phase_stats
+
+
+def _frames():
+    frames = load_stock_lunar(TICKERS, source="csv")
+    for frame in frames.values():
+        frame["Close"] = frame["Close"].astype(np.float64)
+    return frames
+
+
+def _full_stats(frames):
+    stock_data = {ticker: frame.assign(Return=frame["Close"].pct_change() * 100) for ticker, frame in frames.items()}
+    return compute_phase_stats(stock_data)
+
+
+def test_append_revise_and_verify(workdir):
+    root = str(workdir / "phase_stats")
+    frames = _frames()
+
+    # First update stores all but the last 20 bars; the second appends them
+    summaries = phase_stats_store.update({ticker: frame.iloc[:-20] for ticker, frame in frames.items()}, root)
+    assert all(summary.appended == len(frames[ticker]) - 20 for ticker, summary in summaries.items())
+    summaries = phase_stats_store.update({ticker: frame.iloc[-30:] for ticker, frame in frames.items()}, root)
+    assert {tuple(summary) for summary in summaries.values()} == {(20, 0, 10)}
+    assert phase_stats_store.verify(frames, root) == []
+
+    derived, _ = phase_stats_store.store_stats(phase_stats_store.load_state(root), TICKERS)
+    full = _full_stats(frames)
+    assert derived.groups.equals(full.groups)
+    assert derived.anova.equals(full.anova)
+
+    # A revised close in the middle of the history changes two returns; the ticker is replayed
+    revised = dict(frames)
+    revised["SPY"] = frames["SPY"].copy()
+    revised["SPY"].loc[revised["SPY"].index[500], "Close"] *= 1.01
+    summaries = phase_stats_store.update({"SPY": revised["SPY"].iloc[490:510]}, root)
+    assert tuple(summaries["SPY"]) == (0, 1, 19)
+
+    assert phase_stats_store.verify(revised, root) == []
+    assert phase_stats_store.verify(frames, root) == ["SPY"]
+    derived, _ = phase_stats_store.store_stats(phase_stats_store.load_state(root), TICKERS)
+    assert derived.groups.equals(_full_stats(revised).groups)
+    assert not derived.groups.equals(full.groups)
@@ -0,0 +1,32 @@
+"""The offline pipeline end to end against its SQLite stand-in."""
+import json
+import sqlite3
+
+from conftest import TICKERS, run_script
+
+
+def test_offline_pipeline_runs_the_sql_stages(workdir):
+    done = run_script("pipeline.py", "--offline", cwd=workdir, RESAMPLING_PERMUTATIONS="0",
+                      RENDER_TICKER_CHARTS="false")
+    assert done.returncode == 0, done.stdout + done.stderr
+
+    (run_dir,) = (workdir / "data" / "pipeline").iterdir()
+    with open(run_dir / "state.json") as f:
+        stages = {name: entry["status"] for name, entry in json.load(f)["stages"].items()}
+    # Only the blob uploads need the network
+    assert {name for name, status in stages.items() if status == "skipped"} == {"upload_stock_blob",
+                                                                             "upload_moon_blob"}
+    assert set(stages.values()) == {"succeeded", "skipped"}
+    # The statistics store used by write_db stays in the run directory
+    assert (run_dir / "phase_stats" / "state.npz").exists()
+    assert not (workdir / "data" / "phase_stats").exists()
+
+    conn = sqlite3.connect(run_dir / "standin.db")
+    try:
+        count = lambda table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        assert count("LunarPhases") > 0
+        assert all(count(f"{ticker}_StockPrices") > 0 for ticker in TICKERS)
+        assert count("StockLunarAnalysisResults") == len(TICKERS)
+        assert count("LunarPhaseReturns") == 8 * len(TICKERS)
+    finally:
+        conn.close()
@@ -0,0 +1,56 @@
+"""Per-ticker chart cache: a change to one ticker redraws only that ticker's charts."""
+import numpy as np
+
+from conftest import TICKERS
+from lunar_analysis import render
+from lunar_analysis.compute import compute
+from lunar_analysis.settings import load_settings
+
+
+def _rendered(monkeypatch, result, cache_dir):
+    """(kind, ticker) of the charts drawn (not copied from the cache) for ``result``."""
+    drawn = []
+    render_chart_jobs = render.render_chart_jobs
+
+    def record(jobs, max_workers=None):
+        drawn.extend((job.kind, job.ticker) for job in jobs)
+        return render_chart_jobs(jobs, max_workers)
+
+    monkeypatch.setattr(render, "render_chart_jobs", record)
+    render.render_ticker_charts(result, max_workers=1, cache_dir=cache_dir)
+    return sorted(drawn)
+
+
+def test_one_changed_ticker_only_redraws_its_charts(workdir, monkeypatch):
+    settings = load_settings()._replace(data_source="csv", sql_pushdown=False, n_permutations=0, cache_dir=None,
+                                        event_window=0)
+    result = compute(settings, TICKERS)
+    cache_dir = str(workdir / "cache")
+    assert len(_rendered(monkeypatch, result, cache_dir)) == 2 * len(TICKERS)
+    assert _rendered(monkeypatch, result, cache_dir) == []
+
+    # SPY's intervals become the widest of all tickers
+    groups = result.phase_stats.groups.copy()
+    groups.loc["SPY", ["mean", "std"]] = groups.loc["SPY", ["mean", "std"]].to_numpy() * 10
+    changed = result._replace(phase_stats=result.phase_stats._replace(groups=groups))
+    assert _rendered(monkeypatch, changed, cache_dir) == [("returns", "SPY")]
+
+
+def test_returns_chart_limits_are_per_ticker_steps():
+    data = {"mean": np.zeros(8), "low": np.full(8, -0.3), "high": np.array([0.42] + [0.1] * 7)}
+    assert render._returns_layout(data) == (-0.5, 0.5)
+    assert render._returns_layout({key: np.full(8, np.nan) for key in data}) == (-1.0, 1.0)
+
+
+def test_heatmap_only_drawn_up_to_the_column_cap(workdir, monkeypatch):
+    settings = load_settings()._replace(data_source="csv", sql_pushdown=False, n_permutations=0, cache_dir=None,
+                                        event_window=0)
+    result = compute(settings, TICKERS)
+    drawn = []
+    monkeypatch.setattr(render, "render_heatmap", lambda matrix, path=render.HEATMAP_PATH: drawn.append(len(matrix)))
+    render.render_charts(result, max_workers=1, ticker_charts=False)
+    assert drawn == [3 * len(TICKERS) + 1]
+
+    monkeypatch.setattr(render, "HEATMAP_MAX_COLUMNS", 3 * len(TICKERS))
+    render.render_charts(result, max_workers=1, ticker_charts=False)
+    assert drawn == [3 * len(TICKERS) + 1]
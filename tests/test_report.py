@@ -0,0 +1,40 @@
+"""The analysis and report cover the registry tickers that have data and skip the rest."""
+import re
+import sqlite3
+
+import pytest
+
+from conftest import run_script
+from sql_pushdown import build_sqlite_standin
+
+REPORT_PATH = "lunar_stock_analysis_report.md"
+
+ENV = dict(RESAMPLING_PERMUTATIONS="0", EVENT_WINDOW_DAYS="0", RENDER_TICKER_CHARTS="false")
+
+
+@pytest.mark.parametrize("source", ["csv", "sql", "sql_pushdown"])
+def test_registry_ticker_without_data(workdir, source):
+    (workdir / "tickers.csv").write_text("Ticker,Name\nSPY,S&P 500\nQQQ,Nasdaq 100\nXYZ,No Data Corp\n")
+    env = dict(ANALYSIS_DATA_SOURCE="csv")
+    if source != "csv":
+        build_sqlite_standin(str(workdir / "standin.db"), ["SPY", "QQQ"])
+        env = dict(ANALYSIS_DATA_SOURCE="sql", ANALYSIS_SQL_PUSHDOWN=str(source == "sql_pushdown").lower(),
+                   SQL_ODBC_CONNECTION_STRING=f"sqlite:{workdir / 'standin.db'}")
+
+    done = run_script("azure_stock_lunar_analysis.py", cwd=workdir, **ENV, **env)
+    assert done.returncode == 0, done.stdout + done.stderr
+    assert "Traceback" not in done.stdout + done.stderr
+
+    report = (workdir / REPORT_PATH).read_text()
+    assert "stock market behavior for 2 ETFs:\n- SPY (S&P 500)\n- QQQ (Nasdaq 100)\n" in report
+    assert "Registry tickers without data (left out of the analysis): XYZ\n" in report
+    assert re.search(r"\| Lunar Phase +\| +SPY \| +QQQ \| +Average \(All ETFs\) \|", report)
+    assert "### XYZ" not in report
+    assert "DIA" not in report
+
+    if source != "csv":
+        conn = sqlite3.connect(workdir / "standin.db")
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM StockLunarAnalysisResults").fetchone()[0] == 2
+        finally:
+            conn.close()
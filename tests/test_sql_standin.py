@@ -0,0 +1,37 @@
+"""The full analysis run against a SQLite stand-in of the Azure SQL tables."""
+import sqlite3
+
+import pytest
+
+from conftest import TICKERS, run_script
+from sql_pushdown import build_sqlite_standin
+
+REPORT_PATH = "lunar_stock_analysis_report.md"
+
+# Resampling and the event study need row-level data and are skipped in pushdown mode
+ENV = dict(RESAMPLING_PERMUTATIONS="0", EVENT_WINDOW_DAYS="0", RENDER_TICKER_CHARTS="false")
+
+
+def _report(workdir, **env):
+    done = run_script("azure_stock_lunar_analysis.py", cwd=workdir, **ENV, **env)
+    assert done.returncode == 0, done.stdout + done.stderr
+    assert "Traceback" not in done.stdout + done.stderr
+    with open(workdir / REPORT_PATH) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("pushdown", ["false", "true"])
+def test_run_on_sqlite_standin_matches_csv(workdir, pushdown):
+    expected = _report(workdir, ANALYSIS_DATA_SOURCE="csv")
+    build_sqlite_standin(str(workdir / "standin.db"), TICKERS)
+
+    report = _report(workdir, ANALYSIS_DATA_SOURCE="sql", ANALYSIS_SQL_PUSHDOWN=pushdown,
+                     SQL_ODBC_CONNECTION_STRING=f"sqlite:{workdir / 'standin.db'}")
+    assert report == expected
+
+    conn = sqlite3.connect(workdir / "standin.db")
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM StockLunarAnalysisResults").fetchone()[0] == len(TICKERS)
+        assert conn.execute("SELECT COUNT(*) FROM LunarPhaseReturns").fetchone()[0] == 8 * len(TICKERS)
+    finally:
+        conn.close()